@@ -5,25 +5,38 @@ from app.routers import occurrences, llm, agent, export, stats, ingest, meta, ad
 from app.services.db_maintenance import ensure_postgis_and_indexes
 import os
 import platform
+from contextlib import asynccontextmanager
 from uuid import uuid4
 
 import logging
 import time
 
 from fastapi import Request
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.services.request_context import set_request_id
+from app.services.metrics import metrics
+from app.services.llm_gateway import LLMBusyError
+from app.services.llm_service import warm_up_llm
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 ensure_postgis_and_indexes(engine)
 
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Load the Ollama model in the background so the first user request does not pay the model load.
+    warm_up_llm()
+    yield
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Geo_Cortex_Assistant API",
     description="API for geological occurrence data exploration and management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Basic structured-ish logging (stdout). Keep it simple for capstone/demo.
@@ -74,6 +87,16 @@ class AccessLogMiddleware(BaseHTTPMiddleware):
 
 app.add_middleware(AccessLogMiddleware)
 
+# LLM queue full with LLM_BUSY_MODE=reject -> fast 429 instead of waiting
+@app.exception_handler(LLMBusyError)
+async def llm_busy_handler(request: Request, exc: LLMBusyError):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": os.getenv("LLM_BUSY_RETRY_AFTER_SEC", "2")},
+    )
+
+
 # Include routers
 app.include_router(occurrences.router)
 app.include_router(llm.query_router)
@@ -121,3 +144,11 @@ async def version():
         "platform": platform.platform(),
         "git_sha": os.getenv("GIT_SHA"),
     }
+
+
+@app.get("/metrics")
+async def runtime_metrics():
+    """
+    In-process counters, timings and cache stats (JSON). Per worker process.
+    """
+    return metrics.snapshot()
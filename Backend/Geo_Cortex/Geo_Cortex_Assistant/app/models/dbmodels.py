@@ -78,3 +78,35 @@ class AgentSession(Base):
     messages = Column(JSON, default=list)
     # Arbitrary dict (AOI, last links, etc.)
     state = Column(JSON, default=dict)
+
+
+class OccurrenceRasterValue(Base):
+    """
+    Raster band value sampled at a MODS occurrence point (filled by the /rasters/{id}/sample-occurrences job).
+    One row per (occurrence, raster, band); value is NULL when the point is outside the raster or on nodata.
+    """
+
+    __tablename__ = "occurrence_raster_values"
+
+    occurrence_id = Column(Integer, primary_key=True, index=True)  # mods_occurrences.id
+    raster_id = Column(String, primary_key=True, index=True)
+    band = Column(Integer, primary_key=True, default=1)
+    value = Column(Float, index=True)
+    sampled_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ZonalStatsCache(Base):
+    """
+    Cached zonal statistics keyed by (raster_id, band, geometry hash).
+    `label` is set for precomputed admin_region hulls (e.g. "Makkah Region").
+    """
+
+    __tablename__ = "zonal_stats_cache"
+
+    raster_id = Column(String, primary_key=True, index=True)
+    band = Column(Integer, primary_key=True, default=1)
+    geom_hash = Column(String, primary_key=True)  # sha256 of canonical GeoJSON
+    label = Column(String, index=True)
+    geometry = Column(JSON)
+    stats = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
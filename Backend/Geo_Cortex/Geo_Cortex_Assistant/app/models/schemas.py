@@ -23,6 +23,7 @@ class OccurrenceInfo(BaseModel):
 
 class QueryRequest(BaseModel):
     query: str = Field(..., min_length=1)
+    use_cache: bool = True  # false: always call the LLM (skip the response cache)
 
 
 class QueryResponse(BaseModel):
@@ -34,6 +35,7 @@ class AgentRequest(BaseModel):
     query: str = Field(..., min_length=1)
     max_steps: int = Field(default=3, ge=1, le=8)
     session_id: Optional[str] = None
+    use_cache: bool = True
 
 
 class ToolTraceItem(BaseModel):
@@ -45,6 +47,12 @@ class ToolTraceItem(BaseModel):
     rows: Optional[int] = None
     bins: Optional[int] = None
     csv_bytes: Optional[int] = None
+    # Wall time of the workflow step / agent tool call that produced this item
+    elapsed_ms: Optional[float] = None
+    # True when the result came from the shared tool-result cache (no DB query)
+    cached: Optional[bool] = None
+    # Set when the rule-based query parser chose this call instead of the LLM: {intent, coverage}
+    parsed: Optional[Dict[str, Any]] = None
     # Error/debug
     error: Optional[str] = None
     raw: Optional[Dict[str, Any]] = None
@@ -143,6 +151,7 @@ class WorkflowRequest(BaseModel):
     max_steps: int = Field(default=6, ge=1, le=12)
     use_llm: bool = True
     session_id: Optional[str] = None
+    use_cache: bool = True
 
 
 class WorkflowResponse(BaseModel):
@@ -154,6 +163,17 @@ class WorkflowResponse(BaseModel):
     session_id: Optional[str] = None
 
 
+class RasterValueFilter(BaseModel):
+    """
+    Filter occurrences by a raster value previously sampled with /rasters/{raster_id}/sample-occurrences.
+    """
+
+    raster_id: str
+    band: int = Field(default=1, ge=1)
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+
+
 class AdvancedSearchRequest(BaseModel):
     """
     Advanced query interface (POST) for geospatial scientists and QGIS workflows.
@@ -176,6 +196,9 @@ class AdvancedSearchRequest(BaseModel):
     # GeoJSON geometry object (Polygon or MultiPolygon recommended)
     polygon: Optional[Dict[str, Any]] = None
 
+    # Sampled raster value filter (only occurrences with a stored value for this raster/band)
+    raster_value: Optional[RasterValueFilter] = None
+
     # Pagination
     limit: int = Field(default=500, ge=1, le=5000)
     offset: int = Field(default=0, ge=0, le=500000)
@@ -325,7 +348,9 @@ class SpatialJoinNearestResponse(BaseModel):
 
 
 class RasterZonalStatsRequest(BaseModel):
-    geometry: Dict[str, Any]
+    # GeoJSON geometry (EPSG:4326), or admin_region to use the convex hull of that region's occurrences
+    geometry: Optional[Dict[str, Any]] = None
+    admin_region: Optional[str] = None
     band: int = Field(default=1, ge=1)
 
 
@@ -333,3 +358,64 @@ class RasterZonalStatsResponse(BaseModel):
     raster_id: str
     band: int
     stats: Dict[str, Any]
+    admin_region: Optional[str] = None
+    # True when served from the zonal stats cache
+    cached: bool = False
+
+
+class RasterZonalPrewarmRequest(BaseModel):
+    band: int = Field(default=1, ge=1)
+    # defaults to every admin_region
+    regions: Optional[List[str]] = None
+
+
+class RasterTileExportRequest(BaseModel):
+    """
+    Pre-render a raster into an offline tile archive (background job).
+    """
+
+    # [min_lon, min_lat, max_lon, max_lat]; defaults to the raster footprint
+    bbox: Optional[List[float]] = None
+    min_zoom: int = Field(default=6, ge=0, le=22)
+    max_zoom: int = Field(default=10, ge=0, le=22)
+    band: int = Field(default=1, ge=1)
+    format: Literal["mbtiles", "pmtiles"] = "mbtiles"
+    workers: Optional[int] = Field(default=None, ge=1, le=32)
+
+
+class RasterSampleOccurrencesRequest(BaseModel):
+    """
+    Sample a raster band at every MODS occurrence and store the values (background job).
+    """
+
+    band: int = Field(default=1, ge=1)
+
+
+class RasterProfileRequest(BaseModel):
+    """
+    Sample a raster along a transect.
+    geometry: GeoJSON LineString (EPSG:4326), or a Feature/FeatureCollection containing one.
+    """
+
+    geometry: Dict[str, Any]
+    band: int = Field(default=1, ge=1)
+    spacing_m: float = Field(default=100.0, gt=0)
+    include_chart: bool = True
+
+
+class RasterClipRequest(BaseModel):
+    """
+    Clip a raster to an AOI and return it as a compressed GeoTIFF.
+    Provide either a GeoJSON geometry (EPSG:4326) or a session_id whose last uploaded AOI is used.
+    """
+
+    geometry: Optional[Dict[str, Any]] = None
+    session_id: Optional[str] = None
+    # 1-based band indexes; defaults to all bands
+    bands: Optional[List[int]] = None
+    # output pixel size in raster CRS units; defaults to native resolution
+    resolution: Optional[float] = Field(default=None, gt=0)
+    resampling: Literal["nearest", "bilinear", "cubic", "average"] = "nearest"
+    compress: Literal["deflate", "lzw", "zstd", "none"] = "deflate"
+    # set pixels outside the AOI (but inside its bbox) to nodata
+    mask: bool = True
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import json
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
@@ -10,7 +10,7 @@ from geoalchemy2 import Geometry
 from geoalchemy2.functions import ST_GeomFromGeoJSON, ST_SetSRID
 
 from app.database import SessionLocal
-from app.models.dbmodels import MODSOccurrence
+from app.models.dbmodels import MODSOccurrence, OccurrenceRasterValue
 from app.models.schemas import (
     AdvancedSearchRequest,
     AdvancedSearchResponse,
@@ -55,26 +55,32 @@ def _to_occurrence_info(occ: MODSOccurrence) -> OccurrenceInfo:
     )
 
 
-def _to_feature_collection(rows: List[MODSOccurrence]) -> GeoJSONFeatureCollection:
+def _to_feature_collection(
+    rows: List[MODSOccurrence],
+    raster_values: Optional[Dict[int, Optional[float]]] = None,
+) -> GeoJSONFeatureCollection:
     features = []
     for occ in rows:
         if occ.longitude is None or occ.latitude is None:
             continue
+        props = {
+            "id": occ.id,
+            "mods_id": occ.mods_id,
+            "english_name": occ.english_name,
+            "arabic_name": occ.arabic_name,
+            "major_commodity": occ.major_commodity,
+            "admin_region": occ.admin_region,
+            "occurrence_type": occ.occurrence_type,
+            "exploration_status": occ.exploration_status,
+            "occurrence_importance": occ.occurrence_importance,
+        }
+        if raster_values is not None:
+            props["raster_value"] = raster_values.get(occ.id)
         features.append(
             {
                 "type": "Feature",
                 "geometry": {"type": "Point", "coordinates": [occ.longitude, occ.latitude]},
-                "properties": {
-                    "id": occ.id,
-                    "mods_id": occ.mods_id,
-                    "english_name": occ.english_name,
-                    "arabic_name": occ.arabic_name,
-                    "major_commodity": occ.major_commodity,
-                    "admin_region": occ.admin_region,
-                    "occurrence_type": occ.occurrence_type,
-                    "exploration_status": occ.exploration_status,
-                    "occurrence_importance": occ.occurrence_importance,
-                },
+                "properties": props,
             }
         )
     return GeoJSONFeatureCollection.model_validate({"type": "FeatureCollection", "features": features})
@@ -151,11 +157,39 @@ async def advanced_search_mods(
         poly = ST_SetSRID(ST_GeomFromGeoJSON(json.dumps(req.polygon)), 4326)
         q = q.filter(func.ST_Within(pt_geom, poly))
 
+    # Sampled raster value filter (precomputed side table; no raster I/O at query time)
+    rv = req.raster_value
+    if rv is not None:
+        q = q.join(
+            OccurrenceRasterValue,
+            and_(
+                OccurrenceRasterValue.occurrence_id == MODSOccurrence.id,
+                OccurrenceRasterValue.raster_id == rv.raster_id,
+                OccurrenceRasterValue.band == int(rv.band),
+            ),
+        ).filter(OccurrenceRasterValue.value.isnot(None))
+        if rv.min_value is not None:
+            q = q.filter(OccurrenceRasterValue.value >= rv.min_value)
+        if rv.max_value is not None:
+            q = q.filter(OccurrenceRasterValue.value <= rv.max_value)
+
     total = q.count()
     rows = q.offset(req.offset).limit(req.limit).all()
 
+    raster_values: Optional[Dict[int, Optional[float]]] = None
+    if rv is not None and rows:
+        raster_values = dict(
+            db.query(OccurrenceRasterValue.occurrence_id, OccurrenceRasterValue.value)
+            .filter(
+                OccurrenceRasterValue.raster_id == rv.raster_id,
+                OccurrenceRasterValue.band == int(rv.band),
+                OccurrenceRasterValue.occurrence_id.in_([o.id for o in rows]),
+            )
+            .all()
+        )
+
     occs = [_to_occurrence_info(o) for o in rows]
-    geojson = _to_feature_collection(rows) if req.return_geojson else None
+    geojson = _to_feature_collection(rows, raster_values) if req.return_geojson else None
 
     audit_log(
         "advanced_search_mods",
@@ -13,7 +13,12 @@ from app.services.chat_store import (
     set_state_value_db,
 )
 from app.services.geofile_service import parse_geofile, featurecollection_to_union_geometry
-from app.services.request_context import set_uploaded_geometry, set_uploaded_feature_collection
+from app.services.request_context import (
+    set_llm_cache_enabled,
+    set_uploaded_geometry,
+    set_uploaded_feature_collection,
+)
+from app.services.sse import sse_response
 from uuid import uuid4
 
 router = APIRouter(prefix="/agent", tags=["agent"])
@@ -31,12 +36,13 @@ db_dependency = Annotated[Session, Depends(get_db)]
 
 
 @router.post("/", response_model=AgentResponse)
-async def agent_endpoint(request: AgentRequest, db: db_dependency):
+def agent_endpoint(request: AgentRequest, db: db_dependency):
     """
     Agentic RAG endpoint (public; no auth).
     The model can run small "processes" (search/count/nearby) before answering.
     """
     session_id = request.session_id or str(uuid4())
+    set_llm_cache_enabled(request.use_cache)
     history = get_history_db(db, session_id)
     append_message_db(db, session_id, "user", request.query)
 
@@ -54,12 +60,45 @@ async def agent_endpoint(request: AgentRequest, db: db_dependency):
     )
 
 
+@router.post("/stream")
+async def agent_stream(request: AgentRequest):
+    """
+    Streaming variant of POST /agent/ (server-sent events).
+    Events: `token` (answer text as it is generated), `tool` (each tool step), `artifact`,
+    then `result` (the AgentResponse) or `error`.
+    """
+    session_id = request.session_id or str(uuid4())
+    set_llm_cache_enabled(request.use_cache)
+
+    def _work() -> AgentResponse:
+        db = SessionLocal()
+        try:
+            history = get_history_db(db, session_id)
+            append_message_db(db, session_id, "user", request.query)
+            answer, trace, occs, artifacts = run_agent(
+                db, request.query, max_steps=request.max_steps, chat_history=history
+            )
+            append_message_db(db, session_id, "assistant", answer)
+            return AgentResponse(
+                response=answer,
+                tool_trace=trace,
+                occurrences=occs,
+                artifacts=AgentArtifacts(**(artifacts or {})),
+                session_id=session_id,
+            )
+        finally:
+            db.close()
+
+    return sse_response(_work)
+
+
 @router.post("/file", response_model=AgentResponse)
-async def agent_with_file(
+def agent_with_file(
     db: db_dependency,
     query: str = Form(...),
     max_steps: int = Form(3),
     session_id: str | None = Form(None),
+    use_cache: bool = Form(True),
     file: UploadFile = File(...),
 ):
     """
@@ -67,11 +106,12 @@ async def agent_with_file(
     The uploaded geometry is available to spatial tools via a request-scoped reference.
     """
     sid = session_id or str(uuid4())
+    set_llm_cache_enabled(use_cache)
     history = get_history_db(db, sid)
     append_message_db(db, sid, "user", query)
 
     try:
-        data = await file.read()
+        data = file.file.read()
         fc = parse_geofile(file.filename or "", file.content_type, data)
         union_geom = featurecollection_to_union_geometry(fc)
         set_uploaded_geometry(union_geom)
@@ -99,12 +139,13 @@ async def agent_with_file(
 
 
 @router.post("/workflow", response_model=WorkflowResponse)
-async def agent_workflow(request: WorkflowRequest, db: db_dependency):
+def agent_workflow(request: WorkflowRequest, db: db_dependency):
     """
     Workflow agent: returns an explicit plan and executes it.
     Uses session memory for last AOI if present.
     """
     session_id = request.session_id or str(uuid4())
+    set_llm_cache_enabled(request.use_cache)
     history = get_history_db(db, session_id)
     append_message_db(db, session_id, "user", request.query)
 
@@ -141,24 +182,79 @@ async def agent_workflow(request: WorkflowRequest, db: db_dependency):
     )
 
 
+@router.post("/workflow/stream")
+async def agent_workflow_stream(request: WorkflowRequest):
+    """
+    Streaming variant of POST /agent/workflow (server-sent events).
+    Events: `plan`, `tool` / `artifact` as each step completes, `token` (summary text as it is generated),
+    then `result` (the WorkflowResponse; its `response` is authoritative, since an unvalidated LLM summary
+    is replaced by the deterministic one) or `error`.
+    """
+    session_id = request.session_id or str(uuid4())
+    set_llm_cache_enabled(request.use_cache)
+
+    def _work() -> WorkflowResponse:
+        db = SessionLocal()
+        try:
+            history = get_history_db(db, session_id)
+            append_message_db(db, session_id, "user", request.query)
+
+            last_aoi = get_state_value_db(db, session_id, "last_aoi_geometry")
+            if isinstance(last_aoi, dict) and last_aoi.get("type"):
+                set_uploaded_geometry(last_aoi)
+            last_fc = get_state_value_db(db, session_id, "last_uploaded_fc")
+            if isinstance(last_fc, dict) and last_fc.get("type") == "FeatureCollection":
+                set_uploaded_feature_collection(last_fc)
+
+            answer, plan, trace, occs, artifacts = run_workflow(
+                db,
+                request.query,
+                max_steps=request.max_steps,
+                use_llm=request.use_llm,
+                chat_history=history,
+            )
+            append_message_db(db, session_id, "assistant", answer)
+
+            if artifacts and isinstance(artifacts.get("spatial_buffer_geometry"), dict):
+                set_state_value_db(db, session_id, "last_aoi_geometry", artifacts.get("spatial_buffer_geometry"))
+
+            plan_models = [
+                WorkflowStep(action=s.get("action", ""), args=s.get("args") or {}, why=s.get("why")) for s in (plan or [])
+            ]
+            return WorkflowResponse(
+                response=answer,
+                plan=plan_models,
+                tool_trace=trace,
+                occurrences=occs,
+                artifacts=AgentArtifacts(**(artifacts or {})),
+                session_id=session_id,
+            )
+        finally:
+            db.close()
+
+    return sse_response(_work)
+
+
 @router.post("/workflow/file", response_model=WorkflowResponse)
-async def agent_workflow_with_file(
+def agent_workflow_with_file(
     db: db_dependency,
     query: str = Form(...),
     max_steps: int = Form(6),
     use_llm: bool = Form(True),
     session_id: str | None = Form(None),
+    use_cache: bool = Form(True),
     file: UploadFile = File(...),
 ):
     """
     Workflow agent + file upload. Stores uploaded geometry into session memory and request context.
     """
     sid = session_id or str(uuid4())
+    set_llm_cache_enabled(use_cache)
     history = get_history_db(db, sid)
     append_message_db(db, sid, "user", query)
 
     try:
-        data = await file.read()
+        data = file.file.read()
         fc = parse_geofile(file.filename or "", file.content_type, data)
         union_geom = featurecollection_to_union_geometry(fc)
         set_uploaded_geometry(union_geom)
@@ -13,6 +13,8 @@ from geoalchemy2.elements import WKTElement
 
 from app.database import SessionLocal, engine, Base
 from app.models.dbmodels import MODSOccurrence
+from app.services.job_service import create_job, set_job_status
+from app.services.router_service import reload_mods_data
 
 load_dotenv()
 
@@ -121,15 +123,29 @@ def _build_occurrence_from_row(row: Dict[str, Any]) -> MODSOccurrence:
     )
 
 
-def _rebuild_vectorstore_background() -> None:
+def _rebuild_vectorstore_background(job_id: str, full: bool = False) -> None:
     # Rebuild uses scripts/build_vectorstore.py which reads BASE_DIR/MODS.csv
+    db = SessionLocal()
     try:
         from scripts.build_vectorstore import build_vectorstore
+        from app.vectorstores.loader import reload_vectorstores
 
-        build_vectorstore()
-    except Exception:
-        # swallow errors; user can check logs
-        return
+        last = {"pct": -1}
+
+        def _progress(pct: int, msg: str) -> None:
+            # One DB write per whole percent at most (embedding batches can be frequent).
+            pct = max(0, min(99, int(pct)))
+            if pct != last["pct"]:
+                last["pct"] = pct
+                set_job_status(db, job_id, "running", progress=pct, message=msg)
+
+        summary = build_vectorstore(full=full, progress_cb=_progress)
+        reload_vectorstores()
+        set_job_status(db, job_id, "succeeded", progress=100, message="Done", result=summary)
+    except Exception as e:
+        set_job_status(db, job_id, "failed", progress=100, message="Failed", error=str(e))
+    finally:
+        db.close()
 
 
 @router.post("/mods-csv")
@@ -140,6 +156,7 @@ async def ingest_mods_csv(
     replace_existing: bool = True,
     save_as_mods_csv: bool = True,
     rebuild_vectorstore: bool = False,
+    full_rebuild: bool = False,
     max_rows: int = 200000,
 ) -> Dict[str, Any]:
     """
@@ -172,6 +189,8 @@ async def ingest_mods_csv(
             df.to_csv(DEFAULT_MODS_CSV_PATH, index=False)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to save MODS.csv: {e}")
+        # In-memory MODS DataFrame + lookup index are rebuilt from the new file on next use.
+        reload_mods_data()
 
     # Ensure PostGIS and tables
     with engine.begin() as conn:
@@ -208,10 +227,15 @@ async def ingest_mods_csv(
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"DB insert failed: {e}")
+    # New data generation: cached agent tool results for the old rows stop matching.
+    reload_mods_data()
 
+    rebuild_job_id: Optional[str] = None
     if rebuild_vectorstore:
-        # Rebuild embeddings can take time; run in background.
-        background.add_task(_rebuild_vectorstore_background)
+        # Rebuild embeddings can take time; run in background (incremental unless full_rebuild).
+        job = create_job(db, "vectorstore_rebuild", message="Queued")
+        rebuild_job_id = job.id
+        background.add_task(_rebuild_vectorstore_background, job.id, bool(full_rebuild))
 
     try:
         from app.services.governance import audit_log
@@ -225,6 +249,7 @@ async def ingest_mods_csv(
                 "rows_in_csv": int(len(df)),
                 "rows_inserted": int(len(objs)),
                 "vectorstore_rebuild_started": bool(rebuild_vectorstore),
+                "vectorstore_rebuild_job_id": rebuild_job_id,
             },
         )
     except Exception:
@@ -237,5 +262,7 @@ async def ingest_mods_csv(
         "saved_mods_csv": bool(save_as_mods_csv),
         "mods_csv_path": str(DEFAULT_MODS_CSV_PATH) if save_as_mods_csv else None,
         "vectorstore_rebuild_started": bool(rebuild_vectorstore),
+        "vectorstore_rebuild_job_id": rebuild_job_id,
+        "vectorstore_rebuild_status_url": f"/jobs/{rebuild_job_id}" if rebuild_job_id else None,
     }
 
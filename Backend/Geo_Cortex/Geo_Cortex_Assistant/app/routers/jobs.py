@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+from pathlib import Path
 from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
 from app.database import SessionLocal
@@ -12,6 +14,9 @@ from app.services.governance import audit_log, feature_enabled
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
+# Job artifacts must live under the app data folder (never serve arbitrary paths from job results).
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+
 
 def get_db():
     try:
@@ -41,3 +46,25 @@ async def get_job(job_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
         "error": j.error,
     }
 
+
+
+@router.get("/{job_id}/download")
+async def download_job_artifact(job_id: str, db: Session = Depends(get_db)) -> FileResponse:
+    """
+    Download the file produced by a finished job (e.g. a raster tile archive).
+    """
+    if not feature_enabled("jobs"):
+        raise HTTPException(status_code=403, detail="Jobs API is disabled by data governance policy.")
+    j: Optional[Job] = db.query(Job).filter(Job.id == job_id).first()
+    if not j:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if j.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is not finished (status={j.status})")
+    artifact = (j.result or {}).get("artifact_path") if isinstance(j.result, dict) else None
+    if not artifact:
+        raise HTTPException(status_code=404, detail="Job has no downloadable artifact")
+    path = Path(artifact).resolve()
+    if DATA_DIR.resolve() not in path.parents or not path.is_file():
+        raise HTTPException(status_code=404, detail="Job artifact missing")
+    audit_log("jobs_download", {"job_id": job_id, "filename": path.name, "bytes": path.stat().st_size})
+    return FileResponse(str(path), filename=path.name)
@@ -1,16 +1,22 @@
 from fastapi import APIRouter, HTTPException, status
 from app.models.schemas import QueryRequest, QueryResponse
+from app.services.llm_gateway import LLMBusyError
 from app.services.router_service import handle_query
+from app.services.request_context import set_llm_cache_enabled
+from app.services.sse import sse_response
 
 query_router = APIRouter(prefix="/query", tags=["llm"])
 
 
 @query_router.post("/", response_model=QueryResponse)
-async def query_llm(request: QueryRequest):
+def query_llm(request: QueryRequest):
     """RAG-style answer (public; no auth)."""
+    set_llm_cache_enabled(request.use_cache)
     try:
         response_text, occurrences = handle_query(request.query)
         return QueryResponse(response=response_text, occurrences=occurrences)
+    except LLMBusyError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -19,13 +25,31 @@ async def query_llm(request: QueryRequest):
 
 
 @query_router.post("/rag", response_model=QueryResponse)
-async def query_rag(request: QueryRequest):
+def query_rag(request: QueryRequest):
     """RAG query with occurrence extraction (public; no auth)."""
+    set_llm_cache_enabled(request.use_cache)
     try:
         response_text, occurrences = handle_query(request.query)
         return QueryResponse(response=response_text, occurrences=occurrences)
+    except LLMBusyError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing query: {str(e)}"
         )
+
+
+@query_router.post("/rag/stream")
+async def query_rag_stream(request: QueryRequest):
+    """
+    Streaming variant of /query/rag (server-sent events, public; no auth).
+    Events: `token` (answer text as it is generated), then `result` (the QueryResponse) or `error`.
+    """
+    set_llm_cache_enabled(request.use_cache)
+
+    def _work() -> QueryResponse:
+        response_text, occurrences = handle_query(request.query)
+        return QueryResponse(response=response_text, occurrences=occurrences)
+
+    return sse_response(_work)
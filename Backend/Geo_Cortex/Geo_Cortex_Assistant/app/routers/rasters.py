@@ -1,23 +1,51 @@
 from __future__ import annotations
 
+import os
+import tempfile
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile, Query
 from fastapi.responses import FileResponse, Response
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
 
 from app.database import SessionLocal
-from app.models.schemas import RasterZonalStatsRequest, RasterZonalStatsResponse
+from app.models.dbmodels import MODSOccurrence, OccurrenceRasterValue
+from app.models.schemas import (
+    RasterZonalStatsRequest,
+    RasterZonalStatsResponse,
+    RasterTileExportRequest,
+    RasterClipRequest,
+    RasterSampleOccurrencesRequest,
+    RasterProfileRequest,
+    RasterZonalPrewarmRequest,
+)
+from app.services.chat_store import get_state_value_db
 from app.services.governance import audit_log, feature_enabled
 from app.services.job_service import create_job, set_job_status
+from app.services.zonal_cache import admin_region_hull, admin_region_hulls, cached_region_stats, get_zonal_stats
 from app.services.raster_service import (
     save_raster_bytes,
     read_raster_metadata,
     sample_raster_value,
     render_tile_png,
     rasterio_available,
+    find_raster_path,
+    raster_bounds_4326,
+    tile_ranges_for_bbox,
+    count_tiles,
+    export_tile_archive,
+    clip_raster_to_geotiff,
+    sample_raster_points,
+    line_coords_from_geojson,
+    line_length_m,
+    densify_line_4326,
+    build_profile_chart,
     RASTERS_DIR,
+    EXPORTS_DIR,
 )
 
 
@@ -44,6 +72,86 @@ def _job_background_compute_metadata(job_id: str, raster_path: Path) -> None:
         db.close()
 
 
+def _job_background_export_tiles(job_id: str, raster_path: Path, out_path: Path, params: Dict[str, Any]) -> None:
+    db = SessionLocal()
+    try:
+        set_job_status(db, job_id, "running", progress=0, message="Rendering tiles...")
+        last = {"t": 0.0, "pct": -1}
+
+        def _progress(done: int, total: int) -> None:
+            # Throttle DB writes: at most ~1/sec or per whole percent.
+            pct = int(done * 99 / total) if total else 0
+            now = time.time()
+            if pct != last["pct"] and (now - last["t"] >= 1.0 or done == total):
+                last["t"], last["pct"] = now, pct
+                set_job_status(db, job_id, "running", progress=pct, message=f"Rendered {done}/{total} tiles")
+
+        summary = export_tile_archive(
+            raster_path,
+            out_path,
+            bbox=tuple(params["bbox"]),
+            min_zoom=params["min_zoom"],
+            max_zoom=params["max_zoom"],
+            band=params["band"],
+            fmt=params["format"],
+            workers=params["workers"],
+            progress_cb=_progress,
+        )
+        result = dict(summary)
+        result["raster_id"] = params["raster_id"]
+        result["artifact_path"] = str(out_path)
+        result["download_url"] = f"/jobs/{job_id}/download"
+        set_job_status(db, job_id, "succeeded", progress=100, message="Done", result=result)
+    except Exception as e:
+        set_job_status(db, job_id, "failed", progress=100, message="Failed", error=str(e))
+    finally:
+        db.close()
+
+
+def _job_background_sample_occurrences(job_id: str, raster_id: str, raster_path: Path, band: int) -> None:
+    db = SessionLocal()
+    try:
+        set_job_status(db, job_id, "running", progress=5, message="Loading occurrence points...")
+        pts = (
+            db.query(MODSOccurrence.id, MODSOccurrence.longitude, MODSOccurrence.latitude)
+            .filter(MODSOccurrence.longitude.isnot(None), MODSOccurrence.latitude.isnot(None))
+            .all()
+        )
+        ids = [int(p[0]) for p in pts]
+        set_job_status(db, job_id, "running", progress=10, message=f"Sampling {len(ids)} points...")
+        values = sample_raster_points(raster_path, [float(p[1]) for p in pts], [float(p[2]) for p in pts], band=band)
+
+        set_job_status(db, job_id, "running", progress=80, message="Storing values...")
+        db.query(OccurrenceRasterValue).filter(
+            OccurrenceRasterValue.raster_id == raster_id,
+            OccurrenceRasterValue.band == band,
+        ).delete(synchronize_session=False)
+        now = datetime.utcnow()
+        rows = [
+            {"occurrence_id": oid, "raster_id": raster_id, "band": band, "value": v, "sampled_at": now}
+            for oid, v in zip(ids, values)
+        ]
+        chunk = 5000
+        for i in range(0, len(rows), chunk):
+            db.bulk_insert_mappings(OccurrenceRasterValue, rows[i : i + chunk])
+        db.commit()
+
+        with_value = sum(1 for v in values if v is not None)
+        set_job_status(
+            db,
+            job_id,
+            "succeeded",
+            progress=100,
+            message="Done",
+            result={"raster_id": raster_id, "band": band, "points": len(ids), "with_value": with_value},
+        )
+    except Exception as e:
+        db.rollback()
+        set_job_status(db, job_id, "failed", progress=100, message="Failed", error=str(e))
+    finally:
+        db.close()
+
+
 @router.get("/formats")
 async def raster_formats() -> Dict[str, Any]:
     return {
@@ -143,79 +251,337 @@ async def raster_tile(
     return Response(content=png, media_type="image/png")
 
 
+@router.post("/{raster_id}/export-tiles")
+async def export_raster_tiles(
+    raster_id: str,
+    req: RasterTileExportRequest,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    Pre-render a raster for a bbox + zoom range into one MBTiles/PMTiles archive (background job).
+    Poll /jobs/{job_id}; when it succeeds, download the archive from /jobs/{job_id}/download.
+    """
+    if not feature_enabled("rasters"):
+        raise HTTPException(status_code=403, detail="Raster endpoints are disabled by data governance policy.")
+
+    path = find_raster_path(raster_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Raster not found")
+    if req.max_zoom < req.min_zoom:
+        raise HTTPException(status_code=400, detail="max_zoom must be >= min_zoom")
+
+    try:
+        footprint = raster_bounds_4326(path)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if req.bbox is not None:
+        if len(req.bbox) != 4:
+            raise HTTPException(status_code=400, detail="bbox must be [min_lon, min_lat, max_lon, max_lat]")
+        # Only tiles that can contain raster pixels are worth rendering.
+        bbox = (
+            max(req.bbox[0], footprint[0]),
+            max(req.bbox[1], footprint[1]),
+            min(req.bbox[2], footprint[2]),
+            min(req.bbox[3], footprint[3]),
+        )
+        if bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+            raise HTTPException(status_code=400, detail="bbox does not intersect the raster footprint")
+    else:
+        bbox = footprint
+
+    total = count_tiles(tile_ranges_for_bbox(bbox, req.min_zoom, req.max_zoom))
+    max_tiles = int(os.getenv("RASTER_EXPORT_MAX_TILES", "50000"))
+    if total > max_tiles:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Export would render {total} tiles (max {max_tiles}). Reduce bbox or max_zoom.",
+        )
+
+    workers = int(req.workers or os.getenv("RASTER_EXPORT_WORKERS", "4"))
+    job = create_job(db, "raster_tile_export", message=f"{req.format} z{req.min_zoom}-{req.max_zoom}: {total} tiles")
+    out_path = EXPORTS_DIR / job.id / f"{raster_id}.{req.format}"
+    params = {
+        "raster_id": raster_id,
+        "bbox": list(bbox),
+        "min_zoom": int(req.min_zoom),
+        "max_zoom": int(req.max_zoom),
+        "band": int(req.band),
+        "format": req.format,
+        "workers": workers,
+    }
+    background.add_task(_job_background_export_tiles, job.id, path, out_path, params)
+
+    audit_log("rasters_export_tiles", {"raster_id": raster_id, "job_id": job.id, "tiles": total, **params})
+    return {
+        "job_id": job.id,
+        "status_url": f"/jobs/{job.id}",
+        "download_url": f"/jobs/{job.id}/download",
+        "tiles": total,
+        "bbox": list(bbox),
+    }
+
+
+@router.post("/{raster_id}/profile")
+def raster_profile(
+    raster_id: str,
+    req: RasterProfileRequest,
+) -> Dict[str, Any]:
+    """
+    Elevation/value profile along a LineString, densified every `spacing_m` meters.
+    Returns distance + value arrays and a Vega-Lite line chart.
+    """
+    if not feature_enabled("rasters"):
+        raise HTTPException(status_code=403, detail="Raster endpoints are disabled by data governance policy.")
+
+    path = find_raster_path(raster_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Raster not found")
+
+    try:
+        coords = line_coords_from_geojson(req.geometry)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    max_samples = int(os.getenv("RASTER_PROFILE_MAX_SAMPLES", "20000"))
+    length = line_length_m(coords)
+    spacing = float(req.spacing_m)
+    if length / spacing + len(coords) > max_samples:
+        # Coarsen instead of failing: keep the whole transect within the sample budget.
+        spacing = length / max(1, max_samples - len(coords))
+    lons, lats, dist = densify_line_4326(coords, spacing)
+
+    try:
+        values = sample_raster_points(path, lons, lats, band=int(req.band))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    audit_log(
+        "rasters_profile",
+        {"raster_id": raster_id, "band": int(req.band), "samples": len(values), "length_m": round(length, 1)},
+    )
+    out: Dict[str, Any] = {
+        "raster_id": raster_id,
+        "band": int(req.band),
+        "length_m": length,
+        "spacing_m": spacing,
+        "samples": len(values),
+        "distance_m": dist,
+        "values": values,
+        "lon": lons,
+        "lat": lats,
+    }
+    if req.include_chart:
+        out["chart"] = build_profile_chart(dist, values, band=int(req.band))
+    return out
+
+
+@router.post("/{raster_id}/sample-occurrences")
+async def sample_occurrences(
+    raster_id: str,
+    req: RasterSampleOccurrencesRequest,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    Sample a raster band at every MODS occurrence (background job) and store the values.
+    The stored values can then be used in /advanced/mods (raster_value filter) and /stats/raster-values.
+    """
+    if not feature_enabled("rasters"):
+        raise HTTPException(status_code=403, detail="Raster endpoints are disabled by data governance policy.")
+
+    path = find_raster_path(raster_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Raster not found")
+
+    job = create_job(db, "raster_sample_occurrences", message=f"Sample band {req.band} at occurrences")
+    background.add_task(_job_background_sample_occurrences, job.id, raster_id, path, int(req.band))
+
+    audit_log("rasters_sample_occurrences", {"raster_id": raster_id, "job_id": job.id, "band": int(req.band)})
+    return {"job_id": job.id, "status_url": f"/jobs/{job.id}"}
+
+
+def _unlink_quietly(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+@router.post("/{raster_id}/clip")
+def clip_raster(
+    raster_id: str,
+    req: RasterClipRequest,
+    db: Session = Depends(get_db),
+) -> FileResponse:
+    """
+    Clip/crop a raster to an AOI and stream the result as a tiled, compressed GeoTIFF.
+    Only the window intersecting the AOI is read (strip by strip), so large rasters are never loaded whole.
+    Requires optional raster dependencies (rasterio + numpy).
+    """
+    if not feature_enabled("rasters"):
+        raise HTTPException(status_code=403, detail="Raster endpoints are disabled by data governance policy.")
+
+    path = find_raster_path(raster_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Raster not found")
+
+    geometry = req.geometry
+    if geometry is None and req.session_id:
+        geometry = get_state_value_db(db, req.session_id, "last_aoi_geometry")
+        if not geometry:
+            raise HTTPException(status_code=400, detail="No AOI uploaded for this session. Upload one via /agent/file or /agent/workflow/file.")
+    if not isinstance(geometry, dict) or "type" not in geometry:
+        raise HTTPException(status_code=400, detail="Provide geometry (GeoJSON geometry object) or session_id with an uploaded AOI")
+
+    fd, tmp_name = tempfile.mkstemp(prefix=f"clip_{raster_id}_", suffix=".tif")
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        summary = clip_raster_to_geotiff(
+            path,
+            geometry,
+            tmp_path,
+            bands=req.bands,
+            resolution=req.resolution,
+            resampling=req.resampling,
+            compress=req.compress,
+            mask=req.mask,
+            max_pixels=int(os.getenv("RASTER_CLIP_MAX_PIXELS", "200000000")),
+        )
+    except Exception as e:
+        _unlink_quietly(tmp_path)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    audit_log(
+        "rasters_clip",
+        {
+            "raster_id": raster_id,
+            "session_id": req.session_id,
+            "width": summary["width"],
+            "height": summary["height"],
+            "bands": summary["bands"],
+            "bytes": summary["bytes"],
+        },
+    )
+    return FileResponse(
+        str(tmp_path),
+        media_type="image/tiff",
+        filename=f"{path.stem}_clip.tif",
+        background=BackgroundTask(_unlink_quietly, tmp_path),
+    )
+
+
+def _job_background_prewarm_zonal(job_id: str, raster_id: str, raster_path: Path, band: int, regions: Optional[List[str]]) -> None:
+    db = SessionLocal()
+    try:
+        set_job_status(db, job_id, "running", progress=5, message="Building admin_region hulls...")
+        hulls = admin_region_hulls(db, regions)
+        computed = 0
+        failed: Dict[str, str] = {}
+        for i, (region, geom) in enumerate(hulls, start=1):
+            try:
+                _, cached = get_zonal_stats(db, raster_id, raster_path, geom, band, label=region)
+                computed += 0 if cached else 1
+            except Exception as e:
+                db.rollback()
+                failed[region] = str(e)
+            set_job_status(db, job_id, "running", progress=5 + int(i * 94 / max(1, len(hulls))), message=f"{i}/{len(hulls)} regions")
+        set_job_status(
+            db,
+            job_id,
+            "succeeded",
+            progress=100,
+            message="Done",
+            result={"raster_id": raster_id, "band": band, "regions": len(hulls), "computed": computed, "failed": failed},
+        )
+    except Exception as e:
+        set_job_status(db, job_id, "failed", progress=100, message="Failed", error=str(e))
+    finally:
+        db.close()
+
+
 @router.post("/{raster_id}/zonal-stats", response_model=RasterZonalStatsResponse)
-async def raster_zonal_stats(
+def raster_zonal_stats(
     raster_id: str,
     req: RasterZonalStatsRequest,
+    db: Session = Depends(get_db),
 ):
     """
-    Zonal statistics for a polygon/geometry over a raster.
+    Zonal statistics for a polygon/geometry (or an admin_region's occurrence hull) over a raster.
     Geometry is assumed EPSG:4326 and will be reprojected to the raster CRS if needed.
+    Results are cached per (raster_id, band, geometry), so repeated requests are served without raster I/O.
     Requires optional raster dependencies (rasterio + numpy).
     """
     if not feature_enabled("rasters"):
         raise HTTPException(status_code=403, detail="Raster endpoints are disabled by data governance policy.")
 
-    d = RASTERS_DIR / raster_id
-    files = [p for p in d.iterdir() if p.is_file()] if d.exists() else []
-    if not files:
+    path = find_raster_path(raster_id)
+    if path is None:
         raise HTTPException(status_code=404, detail="Raster not found")
-    path = files[0]
 
-    if not isinstance(req.geometry, dict) or "type" not in req.geometry:
-        raise HTTPException(status_code=400, detail="geometry must be a GeoJSON geometry object")
+    region: Optional[str] = None
+    geometry = req.geometry
+    if geometry is None and req.admin_region:
+        hit = admin_region_hull(db, req.admin_region)
+        if hit is None:
+            raise HTTPException(status_code=404, detail=f"No occurrence hull for admin_region={req.admin_region!r}")
+        region, geometry = hit
+    if not isinstance(geometry, dict) or "type" not in geometry:
+        raise HTTPException(status_code=400, detail="geometry must be a GeoJSON geometry object (or pass admin_region)")
 
     try:
-        import numpy as np
-        import rasterio
-        from rasterio.mask import mask
-        from rasterio.warp import transform_geom
+        stats, cached = get_zonal_stats(db, raster_id, path, geometry, int(req.band), label=region)
     except Exception as e:
-        raise HTTPException(
-            status_code=400,
-            detail=(
-                "Zonal stats require raster dependencies. Install with: pip install -r requirements-raster.txt "
-                "(on Windows, Conda is often easiest)."
-            ),
-        ) from e
-
-    with rasterio.open(path) as ds:
-        geom = req.geometry
-        if ds.crs and str(ds.crs).upper() not in ("EPSG:4326", "WGS84"):
-            try:
-                geom = transform_geom("EPSG:4326", ds.crs, geom, precision=6)
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Failed to reproject geometry to raster CRS: {e}")
-
-        try:
-            out, _ = mask(ds, [geom], crop=True, filled=False)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Failed to mask raster: {e}")
-
-        b = int(req.band)
-        if b < 1 or b > ds.count:
-            raise HTTPException(status_code=400, detail=f"Invalid band={b}. Raster has {ds.count} band(s).")
-
-        arr = out[b - 1]
-        # arr is a masked array if filled=False; handle robustly
-        try:
-            data = np.asarray(arr)
-            mask_arr = np.ma.getmaskarray(arr)
-            valid = data[~mask_arr]
-        except Exception:
-            valid = np.array([])
-
-        if valid.size == 0:
-            stats: Dict[str, Any] = {"count": 0, "min": None, "max": None, "mean": None, "std": None}
-        else:
-            stats = {
-                "count": int(valid.size),
-                "min": float(np.min(valid)),
-                "max": float(np.max(valid)),
-                "mean": float(np.mean(valid)),
-                "std": float(np.std(valid)),
-            }
-
-    audit_log("rasters_zonal_stats", {"raster_id": raster_id, "band": int(req.band), "count": stats.get("count")})
-    return RasterZonalStatsResponse(raster_id=raster_id, band=int(req.band), stats=stats)
+        raise HTTPException(status_code=400, detail=f"Failed to compute zonal stats: {e}")
+
+    audit_log(
+        "rasters_zonal_stats",
+        {"raster_id": raster_id, "band": int(req.band), "count": stats.get("count"), "admin_region": region, "cached": cached},
+    )
+    return RasterZonalStatsResponse(raster_id=raster_id, band=int(req.band), stats=stats, admin_region=region, cached=cached)
+
+
+@router.post("/{raster_id}/zonal-stats/prewarm-regions")
+async def prewarm_region_zonal_stats(
+    raster_id: str,
+    req: RasterZonalPrewarmRequest,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    Precompute zonal stats for every admin_region occurrence hull (background job).
+    Afterwards /rasters/{raster_id}/zonal-stats/regions answers region dashboards from the cache.
+    """
+    if not feature_enabled("rasters"):
+        raise HTTPException(status_code=403, detail="Raster endpoints are disabled by data governance policy.")
+
+    path = find_raster_path(raster_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Raster not found")
+
+    job = create_job(db, "raster_zonal_prewarm", message=f"Zonal stats per admin_region (band {req.band})")
+    background.add_task(_job_background_prewarm_zonal, job.id, raster_id, path, int(req.band), req.regions)
+
+    audit_log("rasters_zonal_prewarm", {"raster_id": raster_id, "job_id": job.id, "band": int(req.band)})
+    return {"job_id": job.id, "status_url": f"/jobs/{job.id}"}
+
+
+@router.get("/{raster_id}/zonal-stats/regions")
+def region_zonal_stats(
+    raster_id: str,
+    band: int = Query(1, ge=1),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """
+    Cached per-admin_region zonal stats (see /zonal-stats/prewarm-regions).
+    """
+    if not feature_enabled("rasters"):
+        raise HTTPException(status_code=403, detail="Raster endpoints are disabled by data governance policy.")
+
+    if find_raster_path(raster_id) is None:
+        raise HTTPException(status_code=404, detail="Raster not found")
 
+    rows = cached_region_stats(db, raster_id, band)
+    audit_log("rasters_zonal_regions", {"raster_id": raster_id, "band": band, "regions": len(rows)})
+    return {"raster_id": raster_id, "band": band, "regions": rows}
@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import Optional, List, Dict, Any
-from sqlalchemy import or_
+from sqlalchemy import and_, or_
 
 from app.database import SessionLocal
-from app.models.dbmodels import MODSOccurrence
+from app.models.dbmodels import MODSOccurrence, OccurrenceRasterValue
 
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
+_RASTER_GROUP_COLUMNS = {
+    "admin_region": MODSOccurrence.admin_region,
+    "major_commodity": MODSOccurrence.major_commodity,
+    "occurrence_type": MODSOccurrence.occurrence_type,
+    "exploration_status": MODSOccurrence.exploration_status,
+    "occurrence_importance": MODSOccurrence.occurrence_importance,
+}
+
 _IGNORE_OCCURRENCE_TYPE_VALUES = {"occurrence", "occurrences", "all", "any", "none", "null"}
 
 
@@ -125,3 +133,60 @@ async def heatmap_bins(
     rows = q.all()
     return [{"lon": float(lon), "lat": float(lat), "count": int(c)} for lon, lat, c in rows]
 
+
+
+@router.get("/raster-values")
+async def raster_value_stats(
+    raster_id: str,
+    db: Session = Depends(get_db),
+    band: int = 1,
+    group_by: str = "admin_region",
+    commodity: Optional[str] = None,
+    region: Optional[str] = None,
+    occurrence_type: Optional[str] = None,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """
+    Summary of a sampled raster value (see /rasters/{raster_id}/sample-occurrences) grouped by an occurrence attribute.
+    Returns count/min/max/mean per group, computed from the stored values.
+    """
+    col = _RASTER_GROUP_COLUMNS.get(group_by)
+    if col is None:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(sorted(_RASTER_GROUP_COLUMNS))}")
+
+    value = OccurrenceRasterValue.value
+    q = db.query(
+        col.label("group"),
+        func.count(value).label("count"),
+        func.min(value).label("min"),
+        func.max(value).label("max"),
+        func.avg(value).label("mean"),
+    ).join(
+        OccurrenceRasterValue,
+        and_(
+            OccurrenceRasterValue.occurrence_id == MODSOccurrence.id,
+            OccurrenceRasterValue.raster_id == raster_id,
+            OccurrenceRasterValue.band == band,
+        ),
+    ).filter(value.isnot(None))
+    if commodity:
+        q = q.filter(MODSOccurrence.major_commodity.ilike(f"%{commodity}%"))
+    if region:
+        v = region.replace(" and ", ",").replace(" AND ", ",")
+        regions = [p.strip() for p in v.split(",") if p.strip()]
+        if regions:
+            q = q.filter(or_(*[MODSOccurrence.admin_region.ilike(f"%{r}%") for r in regions]))
+    occurrence_type = _normalize_occurrence_type(occurrence_type)
+    if occurrence_type:
+        q = q.filter(MODSOccurrence.occurrence_type.ilike(f"%{occurrence_type}%"))
+    q = q.group_by(col).order_by(func.count(value).desc())
+    return [
+        {
+            group_by: g,
+            "count": int(c),
+            "min": float(mn) if mn is not None else None,
+            "max": float(mx) if mx is not None else None,
+            "mean": float(mean) if mean is not None else None,
+        }
+        for g, c, mn, mx, mean in q.limit(limit).all()
+    ]
@@ -1,5 +1,8 @@
+import functools
 import json
-from typing import Any, Dict, List, Optional, Tuple
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 import os
 import re
 
@@ -9,12 +12,27 @@ from sqlalchemy import or_
 
 from geoalchemy2.functions import ST_DWithin, ST_GeogFromText, ST_Distance
 
+from app.database import SessionLocal
 from app.models.dbmodels import MODSOccurrence
 from app.models.schemas import OccurrenceInfo, NearestResult
-from app.services.llm_service import generate_response
-from app.services.router_service import handle_query, rag_retrieve
+from app.services.llm_service import generate_response, is_llm_failure, json_parse_stats, structured_format
+from app.services.metrics import metrics
+from app.services.gazetteer import get_gazetteer
+from app.services.query_parser import ParsedQuery, parse_query, parser_stats
+from app.services.router_service import handle_query, prefetch_rag, rag_retrieve
+from app.services.tool_cache import cached_tool, tool_cache_note
+from app.services.workflow_executor import run_steps, step_timeout_s
 from app.services.chat_store import ChatMessage
 from app.services.governance import audit_log, sanitize_text, feature_enabled
+from app.services.request_context import emit_event, request_memo, token_emitter
+from app.services.prompt_builder import (
+    PromptBudget,
+    compact_tool_results,
+    count_tokens,
+    fit_history,
+    fit_rag_context,
+    record_prompt_size,
+)
 
 from shapely.geometry import shape as shapely_shape, mapping as shapely_mapping
 from shapely.ops import unary_union
@@ -29,6 +47,9 @@ You can either:
 TOOL CALL FORMAT (respond with JSON ONLY):
 {"action": "<tool_name>", "args": { ... }}
 
+To call several independent tools in one step (they run at the same time, up to 4):
+{"actions": [{"action": "<tool_name>", "args": { ... }}, {"action": "<tool_name>", "args": { ... }}]}
+
 When you are ready to answer:
 {"action": "final", "answer": "<your answer>"}
 
@@ -56,7 +77,7 @@ Available tools:
 - spatial_dissolve: args {feature_collection?: object, feature_collection_ref?: 'uploaded', by_property: str}
 - spatial_join_mods_counts: args {feature_collection?: object, feature_collection_ref?: 'uploaded', predicate?: 'intersects'|'contains', id_property?: str}
 - spatial_join_mods_nearest: args {feature_collection?: object, feature_collection_ref?: 'uploaded', id_property?: str}
-- rasters_zonal_stats: args {raster_id: str, geometry?: object, geometry_ref?: 'uploaded', band?: int}
+- rasters_zonal_stats: args {raster_id: str, geometry?: object, geometry_ref?: 'uploaded', admin_region?: str, band?: int}
 - For file-based workflows: you may pass geometry_ref="uploaded" instead of geometry, when using /agent/file.
 - rag: args {query: str}
 
@@ -64,6 +85,8 @@ Rules:
 - If the user asks for data (counts, lists, nearby, filters), call a tool first.
 - Keep limits small by default (<= 25) unless user explicitly asks.
 - If you call a tool, you must use its results in your final answer.
+- If the question needs several tools whose inputs do not depend on each other (e.g. a search, a breakdown and
+  the nearest sites), request them together with "actions" instead of one per step.
 
 Notes:
 - The field `occurrence_type` in MODS is typically values like: "Metallic", "Non Metallic", "Metallic and Non Metallic".
@@ -78,6 +101,9 @@ You speak naturally and conversationally. You ask 1 short clarifying question ON
 When you provide lists, keep them compact and structured.
 Always ground answers in the provided RAG context and/or tool outputs. If context is insufficient, say so."""
 
+# Static system prefix for agent calls: identical on every call so Ollama can reuse its prompt cache.
+_AGENT_SYSTEM_PROMPT = _MUHANNED_PERSONA + "\n\n" + _AGENT_INSTRUCTIONS
+
 
 _IGNORE_OCCURRENCE_TYPE_VALUES = {"occurrence", "occurrences", "all", "any", "none", "null"}
 
@@ -99,8 +125,8 @@ def _split_multi(value: Optional[str]) -> List[str]:
     v = value.strip()
     if not v:
         return []
-    v = v.replace(" and ", ",").replace(" AND ", ",")
-    parts = [p.strip() for p in v.split(",")]
+    # Case-insensitive, like the ilike filters (the tool cache folds case in its keys).
+    parts = [p.strip() for p in re.split(r",|\s+and\s+", v, flags=re.IGNORECASE)]
     return [p for p in parts if p]
 
 
@@ -163,6 +189,7 @@ def _to_occurrence_info(occ: MODSOccurrence) -> OccurrenceInfo:
     )
 
 
+@cached_tool("search_mods")
 def _tool_search_mods(
     db: Session,
     commodity: Optional[str] = None,
@@ -185,6 +212,7 @@ def _tool_search_mods(
     return [_to_occurrence_info(o) for o in q.limit(limit).all()]
 
 
+@cached_tool("nearby_mods")
 def _tool_nearby_mods(
     db: Session,
     lat: float,
@@ -201,6 +229,7 @@ def _tool_nearby_mods(
     return [_to_occurrence_info(o) for o in q.limit(limit).all()]
 
 
+@cached_tool("commodity_stats")
 def _tool_commodity_stats(
     db: Session,
     region: Optional[str] = None,
@@ -216,6 +245,7 @@ def _tool_commodity_stats(
     return [{"major_commodity": mc, "count": int(c)} for mc, c in q.limit(limit).all()]
 
 
+@cached_tool("bbox_mods")
 def _tool_bbox_mods(
     db: Session,
     min_lat: float,
@@ -239,6 +269,7 @@ def _tool_bbox_mods(
     return [_to_occurrence_info(o) for o in q.limit(limit).all()]
 
 
+@cached_tool("nearest_mods")
 def _tool_nearest_mods(
     db: Session,
     lat: float,
@@ -263,6 +294,7 @@ def _tool_nearest_mods(
     return out
 
 
+@cached_tool("geojson_export")
 def _tool_geojson_export(
     db: Session,
     commodity: Optional[str] = None,
@@ -312,6 +344,7 @@ def _tool_geojson_export(
         )
     return {"type": "FeatureCollection", "features": features}
 
+@cached_tool("csv_export")
 def _tool_csv_export(
     db: Session,
     commodity: Optional[str] = None,
@@ -354,6 +387,7 @@ def _tool_csv_export(
     return buf.getvalue()
 
 
+@cached_tool("stats_by_region")
 def _tool_stats_by_region(
     db: Session,
     commodity: Optional[str] = None,
@@ -370,6 +404,7 @@ def _tool_stats_by_region(
     return [{"admin_region": r, "count": int(c)} for r, c in q.all()]
 
 
+@cached_tool("importance_breakdown")
 def _tool_importance_breakdown(
     db: Session,
     commodity: Optional[str] = None,
@@ -393,6 +428,7 @@ def _tool_importance_breakdown(
     return [{"occurrence_importance": imp, "count": int(c)} for imp, c in q.all()]
 
 
+@cached_tool("heatmap_bins")
 def _tool_heatmap_bins(
     db: Session,
     commodity: Optional[str] = None,
@@ -421,6 +457,7 @@ def _tool_heatmap_bins(
     return [{"lon": float(lon), "lat": float(lat), "count": int(c)} for lon, lat, c in q.all()]
 
 
+@cached_tool("qc_summary")
 def _tool_qc_summary(db: Session) -> Dict[str, Any]:
     total = int(db.query(func.count(MODSOccurrence.id)).scalar() or 0)
     null_lon = int(db.query(func.count(MODSOccurrence.id)).filter(MODSOccurrence.longitude.is_(None)).scalar() or 0)
@@ -787,6 +824,180 @@ def _tool_spatial_nearest(
     return out
 
 
+def _set_statement_timeout(db: Session, timeout_s: float) -> None:
+    """Let PostgreSQL cancel a workflow step's queries at its deadline (for the current transaction only)."""
+    try:
+        from sqlalchemy import text as sql_text
+
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(sql_text(f"SET LOCAL statement_timeout = {max(1, int(timeout_s * 1000))}"))
+    except Exception:
+        pass
+
+
+def _clamp_agent_args(action: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """Guard rails for a model-emitted tool call: normalize + hard-cap its arguments (ValueError if unusable)."""
+    # Normalize region values (string/list)
+    if "region" in args:
+        args["region"] = _normalize_region_value(args.get("region"))
+
+    # Normalize occurrence_type placeholders
+    if "occurrence_type" in args:
+        args["occurrence_type"] = _normalize_occurrence_type(args.get("occurrence_type"))
+
+    # Normalize exploration_status empty strings
+    if "exploration_status" in args:
+        v = args.get("exploration_status")
+        if v is not None:
+            vv = str(v).strip()
+            args["exploration_status"] = vv or None
+
+    # Clamp limits per tool
+    if action in ("search_mods", "nearby_mods", "bbox_mods", "nearest_mods"):
+        args["limit"] = _clamp_int(args.get("limit"), 1, 200, 25)
+    if action in ("geojson_export",):
+        args["limit"] = _clamp_int(args.get("limit"), 1, 2000, 200)
+    if action in ("csv_export",):
+        args["limit"] = _clamp_int(args.get("limit"), 1, 5000, 2000)
+    if action in ("stats_by_region", "commodity_stats"):
+        args["limit"] = _clamp_int(args.get("limit"), 1, 200, 25)
+    if action in ("heatmap_bins",):
+        args["limit"] = _clamp_int(args.get("limit"), 1, 500, 200)
+        args["bin_km"] = _clamp_float(args.get("bin_km", 25.0), 1.0, 250.0, 25.0)
+    if action in ("qc_duplicates_mods_id", "qc_duplicates_coords", "qc_outliers"):
+        args["limit"] = _clamp_int(args.get("limit"), 1, 5000, 200)
+    if action in ("spatial_query",):
+        args["limit"] = _clamp_int(args.get("limit"), 1, 5000, 500)
+        args["offset"] = _clamp_int(args.get("offset"), 0, 500000, 0)
+        if args.get("op") == "dwithin":
+            args["distance_m"] = _clamp_float(args.get("distance_m"), 0.0, 2_000_000.0, 50_000.0)
+    if action in ("spatial_buffer",):
+        args["distance_m"] = _clamp_float(args.get("distance_m"), 0.0, 2_000_000.0, 50_000.0)
+    if action in ("spatial_nearest",):
+        args["limit"] = _clamp_int(args.get("limit"), 1, 500, 25)
+
+    # Clamp geo inputs
+    if action in ("nearby_mods",):
+        la, lo = _validate_lat_lon(args.get("lat"), args.get("lon"))
+        if la is None or lo is None:
+            raise ValueError("Invalid lat/lon")
+        args["lat"], args["lon"] = la, lo
+        args["radius_km"] = _clamp_float(args.get("radius_km"), 0.1, 1000.0, 50.0)
+
+    if action in ("nearest_mods",):
+        la, lo = _validate_lat_lon(args.get("lat"), args.get("lon"))
+        if la is None or lo is None:
+            raise ValueError("Invalid lat/lon")
+        args["lat"], args["lon"] = la, lo
+
+    if action in ("bbox_mods",):
+        args["min_lat"] = _clamp_float(args.get("min_lat"), -90.0, 90.0, -90.0)
+        args["max_lat"] = _clamp_float(args.get("max_lat"), -90.0, 90.0, 90.0)
+        args["min_lon"] = _clamp_float(args.get("min_lon"), -180.0, 180.0, -180.0)
+        args["max_lon"] = _clamp_float(args.get("max_lon"), -180.0, 180.0, 180.0)
+
+    return args
+
+
+# Artifact each agent tool produces; a second call for the same artifact is redundant.
+_AGENT_TOOL_OUTPUTS: Dict[str, str] = {
+    "heatmap_bins": "heatmap_bins",
+    "stats_by_region": "stats_by_region",
+    "importance_breakdown": "importance_breakdown",
+    "geojson_export": "geojson",
+    "csv_export": "csv",
+    "nearest_mods": "nearest_results",
+    "qc_summary": "qc_summary",
+    "qc_duplicates_mods_id": "qc_duplicates_mods_id",
+    "qc_duplicates_coords": "qc_duplicates_coords",
+    "qc_outliers": "qc_outliers",
+    "ogc_items_link": "ogc_items_url",
+    "publish_layer_instructions": "qgis_instructions",
+    "spatial_query": "spatial_geojson",
+    "spatial_buffer": "spatial_buffer_geometry",
+    "spatial_nearest": "spatial_nearest",
+}
+
+
+def _agent_tool_calls(action_obj: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The calls in one agent step: {"action", "args"} or {"actions": [{"action", "args"}, ...]}."""
+    if not action_obj:
+        return []
+    if isinstance(action_obj.get("actions"), list):
+        return [c for c in action_obj["actions"] if isinstance(c, dict) and c.get("action")]
+    return [action_obj] if action_obj.get("action") else []
+
+
+# Structured output (Ollama `format`) for the agent step, the forced final answer and the workflow planner,
+# so every reply is a parseable action instead of prose with braces to scrape.
+_AGENT_TOOL_NAMES = sorted(set(_AGENT_TOOL_OUTPUTS) | {"search_mods", "nearby_mods", "bbox_mods", "commodity_stats", "rag"})
+_WORKFLOW_ACTION_NAMES = sorted(
+    (set(_AGENT_TOOL_NAMES) - {"rag"})
+    | {"spatial_overlay", "spatial_dissolve", "spatial_join_mods_counts", "spatial_join_mods_nearest", "rasters_zonal_stats"}
+)
+_TOOL_CALL_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {"action": {"type": "string", "enum": _AGENT_TOOL_NAMES}, "args": {"type": "object"}},
+    "required": ["action", "args"],
+}
+_FINAL_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {"action": {"type": "string", "enum": ["final"]}, "answer": {"type": "string"}},
+    "required": ["action", "answer"],
+}
+_AGENT_STEP_SCHEMA: Dict[str, Any] = {
+    "anyOf": [
+        _TOOL_CALL_SCHEMA,
+        {
+            "type": "object",
+            "properties": {"actions": {"type": "array", "items": _TOOL_CALL_SCHEMA, "minItems": 1}},
+            "required": ["actions"],
+        },
+        _FINAL_SCHEMA,
+    ]
+}
+_WORKFLOW_PLAN_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "plan": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "action": {"type": "string", "enum": _WORKFLOW_ACTION_NAMES},
+                    "args": {"type": "object"},
+                    "why": {"type": "string"},
+                },
+                "required": ["action", "args"],
+            },
+        }
+    },
+    "required": ["plan"],
+}
+
+
+def _parse_llm_json(
+    site: str, model_out: str, extract: Callable[[str], Optional[Dict[str, Any]]]
+) -> Optional[Dict[str, Any]]:
+    """Parse a reply that should be JSON, counting parse failures per call site (GET /metrics → llm_json)."""
+    if is_llm_failure(model_out) or str(model_out).startswith("LLM is disabled"):
+        json_parse_stats.record(site, "llm_failures")
+        return None
+    obj = extract(model_out)
+    json_parse_stats.record(site, "parsed" if obj is not None else "parse_failures")
+    return obj
+
+
+@dataclass
+class _ToolCallResult:
+    trace: List[Dict[str, Any]] = field(default_factory=list)
+    artifacts: Dict[str, Any] = field(default_factory=dict)
+    scratch: List[str] = field(default_factory=list)
+    occurrences: Optional[List[Any]] = None
+    rag_context: Optional[str] = None
+    unknown: bool = False
+
+
 def _extract_json_object(text: str) -> Optional[Dict[str, Any]]:
     """
     Best-effort extraction of a JSON object from model output.
@@ -796,6 +1007,10 @@ def _extract_json_object(text: str) -> Optional[Dict[str, Any]]:
     end = text.rfind("}")
     if start == -1 or end == -1 or end <= start:
         return None
+    try:
+        return json.loads(text[start : end + 1])
+    except Exception:
+        return None
 
 
 def _extract_json_object_loose(text: str) -> Optional[Dict[str, Any]]:
@@ -996,6 +1211,114 @@ def _build_vega_charts(artifacts: Dict[str, Any]) -> List[Dict[str, Any]]:
     return charts
 
 
+class _StreamedTrace(list):
+    """tool_trace that also sends each step to the request's event stream (SSE endpoints) as it completes."""
+
+    def append(self, item: Any) -> None:
+        super().append(item)
+        emit_event("tool", item)
+
+
+class _StreamedArtifacts(dict):
+    """artifacts dict that also sends each artifact to the request's event stream as it is produced."""
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super().__setitem__(key, value)
+        emit_event("artifact", {"name": key, "value": value})
+
+
+_ANSWER_FIELD_RE = re.compile(r'"answer"\s*:\s*"')
+_JSON_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+
+class _AnswerTokenFilter:
+    """
+    Token callback for the agent loop, whose model output is either plain text or tool JSON.
+    Plain text is forwarded as-is; for JSON only the decoded "answer" string is forwarded,
+    so tool calls never reach the user.
+    """
+
+    def __init__(self, emit):
+        self.emit = emit
+        self.buf = ""
+        self.mode: Optional[str] = None  # "text" | "json"
+        self.pos: Optional[int] = None  # start of the unread part of the answer string
+        self.done = False
+
+    def __call__(self, chunk: str) -> None:
+        if self.mode == "text":
+            self.emit(chunk)
+            return
+        self.buf += chunk
+        if self.mode is None:
+            head = self.buf.lstrip()
+            if not head:
+                return
+            if head[0] not in "{`":
+                self.mode = "text"
+                self.emit(self.buf)
+                return
+            self.mode = "json"
+        if self.done:
+            return
+        if self.pos is None:
+            m = _ANSWER_FIELD_RE.search(self.buf)
+            if not m:
+                return
+            self.pos = m.end()
+        self._drain()
+
+    def _drain(self) -> None:
+        b, i, out = self.buf, self.pos, []
+        while i < len(b):
+            c = b[i]
+            if c == "\\":
+                if i + 1 >= len(b):
+                    break
+                e = b[i + 1]
+                if e == "u":
+                    if i + 6 > len(b):
+                        break
+                    try:
+                        out.append(chr(int(b[i + 2 : i + 6], 16)))
+                    except ValueError:
+                        pass
+                    i += 6
+                    continue
+                out.append(_JSON_ESCAPES.get(e, e))
+                i += 2
+                continue
+            if c == '"':
+                self.done = True
+                i += 1
+                break
+            out.append(c)
+            i += 1
+        self.pos = i
+        if out:
+            self.emit("".join(out))
+
+
+def _agent_token_filter() -> Optional[_AnswerTokenFilter]:
+    emit = token_emitter()
+    return _AnswerTokenFilter(emit) if emit is not None else None
+
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+def _with_request_memo(fn: _F) -> _F:
+    """Run an agent entry point inside a request memo, so repeated retrievals for the same query are shared."""
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with request_memo():
+            return fn(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+@_with_request_memo
 def run_workflow(
     db: Session,
     user_query: str,
@@ -1007,10 +1330,14 @@ def run_workflow(
     Workflow agent: produce an explicit plan, execute steps, then answer.
     Returns: (final_answer, plan_steps, tool_trace, last_occurrences, artifacts)
     """
-    tool_trace: List[Dict[str, Any]] = []
+    tool_trace: List[Dict[str, Any]] = _StreamedTrace()
     plan_steps: List[Dict[str, Any]] = []
     last_occurrences: Optional[List[OccurrenceInfo]] = None
-    artifacts: Dict[str, Any] = {}
+    artifacts: Dict[str, Any] = _StreamedArtifacts()
+
+    # The final answer is always grounded in RAG for the user query (and the LLM planner uses it too):
+    # start retrieval now so it overlaps planning and plan execution; both uses share the one result.
+    prefetch_rag(user_query, k=6)
 
     # If there is an uploaded AOI geometry and user asks for common ops, plan deterministically.
     try:
@@ -1072,35 +1399,36 @@ def run_workflow(
 
     # If no deterministic plan, ask LLM to propose one.
     if not plan_steps and use_llm:
-        rag_context, _ = rag_retrieve(user_query, k=6)
-        history_block = ""
-        if chat_history:
-            lines = []
-            for m in chat_history[-10:]:
-                role = "User" if m.role == "user" else "Muhanned"
-                lines.append(f"{role}: {m.content}")
-            history_block = "\n".join(lines)
-
-        planning_prompt = (
-            _MUHANNED_PERSONA
-            + "\n\nYou are a workflow planner. Produce ONLY JSON.\n"
+        planner_instructions = (
+            "You are a workflow planner. Produce ONLY JSON.\n"
             + "Return a JSON object: {\"plan\": [{\"action\": \"tool\", \"args\": {...}, \"why\": \"...\"}, ...]}\n"
             + f"Max steps: {max_steps}. Use only the available tools.\n"
             + "If the user refers to an uploaded file geometry, use geometry_ref=\"uploaded\" and omit geometry.\n"
+            + "To query around a buffer from an earlier spatial_buffer step, use geometry_ref=\"buffer\" and omit geometry "
+            + "(for spatial_overlay the buffer is geometry a).\n"
             + "\nAvailable tools: search_mods, nearby_mods, bbox_mods, nearest_mods, geojson_export, csv_export, "
             + "stats_by_region, importance_breakdown, heatmap_bins, commodity_stats, "
             + "qc_summary, qc_duplicates_mods_id, qc_duplicates_coords, qc_outliers, "
             + "ogc_items_link, publish_layer_instructions, "
             + "spatial_query, spatial_buffer, spatial_nearest.\n"
+        )
+        alloc = PromptBudget().allocate(_MUHANNED_PERSONA, planner_instructions, user_query)
+        history_block = fit_history(chat_history, alloc["history"], max_turns=10)
+        rag_context, _ = rag_retrieve(user_query, k=6)
+        planning_prompt = (
+            planner_instructions
             + "\nConversation so far:\n"
             + (history_block or "(none)")
             + "\n\nRAG context (optional):\n"
-            + (rag_context or "(none)")
+            + (fit_rag_context(rag_context, alloc["rag"]) or "(none)")
             + "\n\nUser query:\n"
             + user_query
         )
-        model_out = generate_response(planning_prompt)
-        obj = _extract_json_object_loose(model_out) or {}
+        record_prompt_size("workflow_plan", planning_prompt, _MUHANNED_PERSONA)
+        model_out = generate_response(
+            planning_prompt, system=_MUHANNED_PERSONA, response_format=structured_format(_WORKFLOW_PLAN_SCHEMA)
+        )
+        obj = _parse_llm_json("workflow_plan", model_out, _extract_json_object_loose) or {}
         plan = obj.get("plan")
         if isinstance(plan, list):
             for step in plan[:max_steps]:
@@ -1109,9 +1437,12 @@ def run_workflow(
                         {"action": step.get("action"), "args": step.get("args") or {}, "why": step.get("why")}
                     )
 
-    # Execute the plan
-    def _exec(action: str, args: Dict[str, Any]) -> None:
-        nonlocal last_occurrences, artifacts
+    # Execute the plan. A step runs on its own DB session and records into its own trace/outputs,
+    # which are published to tool_trace/artifacts when it completes (see _step_done).
+    def _exec(
+        action: str, args: Dict[str, Any], db: Session, trace: List[Dict[str, Any]], out: Dict[str, Any]
+    ) -> Optional[List[OccurrenceInfo]]:
+        occurrences: Optional[List[OccurrenceInfo]] = None
 
         # normalize + caps (reuse run_agent clamps for critical parts)
         if "region" in args:
@@ -1143,6 +1474,15 @@ def run_workflow(
         if action.startswith("rasters_") and not feature_enabled("rasters"):
             raise ValueError("Raster endpoints are disabled by data governance policy.")
 
+        # geometry_ref="buffer": the geometry produced by an earlier spatial_buffer step (a plan dependency).
+        if args.get("geometry_ref") == "buffer":
+            buffered = artifacts.get("spatial_buffer_geometry")
+            if not isinstance(buffered, dict):
+                raise ValueError("geometry_ref='buffer' requires an earlier spatial_buffer step.")
+            args["geometry"] = buffered
+            if action in ("spatial_buffer", "spatial_nearest"):
+                args.pop("geometry_ref", None)
+
         def _resolve_uploaded_fc() -> Optional[Dict[str, Any]]:
             try:
                 from app.services.request_context import get_uploaded_feature_collection
@@ -1161,39 +1501,41 @@ def run_workflow(
 
         if action == "qc_summary":
             rep = _tool_qc_summary(db)
-            artifacts["qc_summary"] = rep
-            tool_trace.append({"tool": action, "args": {}, "keys": list(rep.keys())})
+            out["qc_summary"] = rep
+            trace.append({"tool": action, "args": {}, "keys": list(rep.keys()), **tool_cache_note()})
         elif action == "qc_duplicates_mods_id":
             rows = _tool_qc_duplicates_mods_id(db, **args)
-            artifacts["qc_duplicates_mods_id"] = rows
-            tool_trace.append({"tool": action, "args": args, "groups": len(rows)})
+            out["qc_duplicates_mods_id"] = rows
+            trace.append({"tool": action, "args": args, "groups": len(rows)})
         elif action == "qc_duplicates_coords":
             rows = _tool_qc_duplicates_coords(db, **args)
-            artifacts["qc_duplicates_coords"] = rows
-            tool_trace.append({"tool": action, "args": args, "groups": len(rows)})
+            out["qc_duplicates_coords"] = rows
+            trace.append({"tool": action, "args": args, "groups": len(rows)})
         elif action == "qc_outliers":
             rep = _tool_qc_outliers(db, **args)
-            artifacts["qc_outliers"] = rep
-            tool_trace.append({"tool": action, "args": args, "returned": len((rep or {}).get("sample") or [])})
+            out["qc_outliers"] = rep
+            trace.append({"tool": action, "args": args, "returned": len((rep or {}).get("sample") or [])})
         elif action == "spatial_query":
             rep = _tool_spatial_query(db, **args)
-            artifacts["spatial_total"] = int(rep.get("total") or 0)
-            artifacts["spatial_geojson"] = rep.get("geojson")
-            tool_trace.append({"tool": action, "args": args, "features_count": len((rep.get("geojson") or {}).get("features", []))})
+            out["spatial_total"] = int(rep.get("total") or 0)
+            out["spatial_geojson"] = rep.get("geojson")
+            trace.append({"tool": action, "args": args, "features_count": len((rep.get("geojson") or {}).get("features", []))})
         elif action == "spatial_buffer":
             rep = _tool_spatial_buffer(db, **args)
-            artifacts["spatial_buffer_geometry"] = rep.get("geometry")
-            tool_trace.append({"tool": action, "args": args})
+            out["spatial_buffer_geometry"] = rep.get("geometry")
+            trace.append({"tool": action, "args": args})
         elif action == "spatial_nearest":
             rows = _tool_spatial_nearest(db, **args)
-            artifacts["spatial_nearest"] = rows
-            tool_trace.append({"tool": action, "args": args, "results_count": len(rows)})
+            out["spatial_nearest"] = rows
+            trace.append({"tool": action, "args": args, "results_count": len(rows)})
         elif action == "spatial_overlay":
             fc = None
             if args.get("feature_collection_ref") == "uploaded":
                 fc = _resolve_uploaded_fc()
             a = args.get("a")
             b = args.get("b")
+            if a is None and args.get("geometry_ref") == "buffer":
+                a = args.get("geometry")  # the earlier spatial_buffer step's geometry
             if (a is None or b is None) and isinstance(fc, dict):
                 feats = fc.get("features") if isinstance(fc.get("features"), list) else []
                 ai = _clamp_int(args.get("a_index"), 0, 999999, 0)
@@ -1210,17 +1552,17 @@ def run_workflow(
             ga = shapely_shape(a)
             gb = shapely_shape(b)
             if op == "union":
-                out = ga.union(gb)
+                geom_out = ga.union(gb)
             elif op == "intersection":
-                out = ga.intersection(gb)
+                geom_out = ga.intersection(gb)
             elif op == "difference":
-                out = ga.difference(gb)
+                geom_out = ga.difference(gb)
             elif op == "symmetric_difference":
-                out = ga.symmetric_difference(gb)
+                geom_out = ga.symmetric_difference(gb)
             else:
                 raise ValueError(f"Unsupported overlay op: {op}")
-            artifacts["overlay_geometry"] = shapely_mapping(out)
-            tool_trace.append({"tool": action, "args": args})
+            out["overlay_geometry"] = shapely_mapping(geom_out)
+            trace.append({"tool": action, "args": args})
         elif action == "spatial_dissolve":
             fc = args.get("feature_collection")
             if args.get("feature_collection_ref") == "uploaded":
@@ -1251,8 +1593,8 @@ def run_workflow(
                     continue
                 merged = unary_union(shapes)
                 out_features.append({"type": "Feature", "geometry": shapely_mapping(merged), "properties": {by_prop: k, "feature_count": len(shapes)}})
-            artifacts["dissolved_feature_collection"] = {"type": "FeatureCollection", "features": out_features}
-            tool_trace.append({"tool": action, "args": {"by_property": by_prop}, "features_count": len(out_features)})
+            out["dissolved_feature_collection"] = {"type": "FeatureCollection", "features": out_features}
+            trace.append({"tool": action, "args": {"by_property": by_prop}, "features_count": len(out_features)})
         elif action == "spatial_join_mods_counts":
             fc = args.get("feature_collection")
             if args.get("feature_collection_ref") == "uploaded":
@@ -1282,8 +1624,8 @@ def run_workflow(
                 props_out["mods_count"] = count_val
                 props_out.setdefault(id_prop, props.get(id_prop))
                 out_feats.append({"type": "Feature", "geometry": geom, "properties": props_out})
-            artifacts["join_counts_feature_collection"] = {"type": "FeatureCollection", "features": out_feats}
-            tool_trace.append({"tool": action, "args": {"predicate": predicate}, "features_count": len(out_feats)})
+            out["join_counts_feature_collection"] = {"type": "FeatureCollection", "features": out_feats}
+            trace.append({"tool": action, "args": {"predicate": predicate}, "features_count": len(out_feats)})
         elif action == "spatial_join_mods_nearest":
             fc = args.get("feature_collection")
             if args.get("feature_collection_ref") == "uploaded":
@@ -1312,52 +1654,41 @@ def run_workflow(
                     continue
                 occ, d = row
                 out_rows.append({"feature_id": fid, "distance_m": float(d) if d is not None else None, "nearest": _to_occurrence_info(occ).model_dump()})
-            artifacts["join_nearest_results"] = out_rows
-            tool_trace.append({"tool": action, "args": {"id_property": id_prop}, "results_count": len(out_rows)})
+            out["join_nearest_results"] = out_rows
+            trace.append({"tool": action, "args": {"id_property": id_prop}, "results_count": len(out_rows)})
         elif action == "rasters_zonal_stats":
             raster_id = str(args.get("raster_id") or "").strip()
             if not raster_id:
                 raise ValueError("rasters_zonal_stats requires raster_id")
             geom = args.get("geometry")
+            region = None
             if args.get("geometry_ref") == "uploaded":
                 geom = _resolve_uploaded_geom()
+            elif not isinstance(geom, dict) and args.get("admin_region"):
+                from app.services.zonal_cache import admin_region_hull
+
+                hit = admin_region_hull(db, str(args.get("admin_region")))
+                if hit is not None:
+                    region, geom = hit
             if not isinstance(geom, dict) or "type" not in geom:
-                raise ValueError("rasters_zonal_stats requires a GeoJSON geometry (or geometry_ref='uploaded').")
+                raise ValueError("rasters_zonal_stats requires a GeoJSON geometry (or geometry_ref='uploaded' / admin_region).")
             band = _clamp_int(args.get("band"), 1, 1000, 1)
-            # Call same logic as rasters router (inline, to avoid HTTP hop)
-            from app.services.raster_service import RASTERS_DIR
-            import numpy as np
-            import rasterio
-            from rasterio.mask import mask
-            from rasterio.warp import transform_geom
-
-            d = RASTERS_DIR / raster_id
-            files = [p for p in d.iterdir() if p.is_file()] if d.exists() else []
-            if not files:
+            # Same cached path as the rasters router (inline, to avoid HTTP hop)
+            from app.services.raster_service import find_raster_path
+            from app.services.zonal_cache import get_zonal_stats
+
+            path = find_raster_path(raster_id)
+            if path is None:
                 raise ValueError("Raster not found")
-            path = files[0]
-            with rasterio.open(path) as ds:
-                g2 = geom
-                if ds.crs and str(ds.crs).upper() not in ("EPSG:4326", "WGS84"):
-                    g2 = transform_geom("EPSG:4326", ds.crs, g2, precision=6)
-                out, _ = mask(ds, [g2], crop=True, filled=False)
-                if band < 1 or band > ds.count:
-                    raise ValueError(f"Invalid band={band}. Raster has {ds.count} band(s).")
-                arr = out[band - 1]
-                data = np.asarray(arr)
-                mask_arr = np.ma.getmaskarray(arr)
-                valid = data[~mask_arr]
-                if valid.size == 0:
-                    stats: Dict[str, Any] = {"count": 0, "min": None, "max": None, "mean": None, "std": None}
-                else:
-                    stats = {"count": int(valid.size), "min": float(np.min(valid)), "max": float(np.max(valid)), "mean": float(np.mean(valid)), "std": float(np.std(valid))}
-            artifacts.setdefault("zonal_stats", [])
-            artifacts["zonal_stats"].append({"raster_id": raster_id, "band": band, "stats": stats})
-            tool_trace.append({"tool": action, "args": {"raster_id": raster_id, "band": band}, "raw": {"stats": stats}})
+            stats, cached = get_zonal_stats(db, raster_id, path, geom, band, label=region)
+            out.setdefault("zonal_stats", []).append({"raster_id": raster_id, "band": band, "admin_region": region, "stats": stats})
+            trace.append(
+                {"tool": action, "args": {"raster_id": raster_id, "band": band, "admin_region": region}, "raw": {"stats": stats, "cached": cached}}
+            )
         elif action == "ogc_items_link":
             url = _tool_ogc_items_link(args)
-            artifacts["ogc_items_url"] = url
-            tool_trace.append({"tool": action, "args": args, "url": url})
+            out["ogc_items_url"] = url
+            trace.append({"tool": action, "args": args, "url": url})
         elif action == "publish_layer_instructions":
             url = str(args.get("ogc_items_url") or artifacts.get("ogc_items_url") or "").strip() or _tool_ogc_items_link({})
             instructions = (
@@ -1367,63 +1698,89 @@ def run_workflow(
                 f"3) New connection → URL: {url}\n"
                 "4) Connect → choose 'mods_occurrences' → Add\n"
             )
-            artifacts["qgis_instructions"] = instructions
-            tool_trace.append({"tool": action, "args": {"ogc_items_url": url}, "chars": len(instructions)})
+            out["qgis_instructions"] = instructions
+            trace.append({"tool": action, "args": {"ogc_items_url": url}, "chars": len(instructions)})
         elif action == "geojson_export":
             geojson = _tool_geojson_export(db, **args)
-            artifacts["geojson"] = geojson
-            tool_trace.append({"tool": action, "args": args, "features_count": len(geojson.get("features", []))})
+            out["geojson"] = geojson
+            trace.append({"tool": action, "args": args, "features_count": len(geojson.get("features", [])), **tool_cache_note()})
         elif action == "csv_export":
             csv_text = _tool_csv_export(db, **args)
-            artifacts["csv"] = csv_text
-            tool_trace.append({"tool": action, "args": args, "csv_bytes": len(csv_text.encode("utf-8"))})
+            out["csv"] = csv_text
+            trace.append({"tool": action, "args": args, "csv_bytes": len(csv_text.encode("utf-8")), **tool_cache_note()})
         elif action == "search_mods":
             results = _tool_search_mods(db, **args)
-            last_occurrences = results
-            tool_trace.append({"tool": action, "args": args, "results_count": len(results)})
+            occurrences = results
+            trace.append({"tool": action, "args": args, "results_count": len(results), **tool_cache_note()})
         elif action == "nearby_mods":
             results = _tool_nearby_mods(db, **args)
-            last_occurrences = results
-            tool_trace.append({"tool": action, "args": args, "results_count": len(results)})
+            occurrences = results
+            trace.append({"tool": action, "args": args, "results_count": len(results), **tool_cache_note()})
         elif action == "bbox_mods":
             results = _tool_bbox_mods(db, **args)
-            last_occurrences = results
-            tool_trace.append({"tool": action, "args": args, "results_count": len(results)})
+            occurrences = results
+            trace.append({"tool": action, "args": args, "results_count": len(results), **tool_cache_note()})
         elif action == "nearest_mods":
             results = _tool_nearest_mods(db, **args)
-            artifacts["nearest_results"] = results
-            tool_trace.append({"tool": action, "args": args, "results_count": len(results)})
+            out["nearest_results"] = results
+            trace.append({"tool": action, "args": args, "results_count": len(results), **tool_cache_note()})
         elif action == "stats_by_region":
             rows = _tool_stats_by_region(db, **args)
-            artifacts["stats_by_region"] = rows
-            tool_trace.append({"tool": action, "args": args, "rows": len(rows)})
+            out["stats_by_region"] = rows
+            trace.append({"tool": action, "args": args, "rows": len(rows), **tool_cache_note()})
         elif action == "importance_breakdown":
             rows = _tool_importance_breakdown(db, **args)
-            artifacts["importance_breakdown"] = rows
-            tool_trace.append({"tool": action, "args": args, "rows": len(rows)})
+            out["importance_breakdown"] = rows
+            trace.append({"tool": action, "args": args, "rows": len(rows), **tool_cache_note()})
         elif action == "heatmap_bins":
             rows = _tool_heatmap_bins(db, **args)
-            artifacts["heatmap_bins"] = rows
-            tool_trace.append({"tool": action, "args": args, "bins": len(rows)})
+            out["heatmap_bins"] = rows
+            trace.append({"tool": action, "args": args, "bins": len(rows), **tool_cache_note()})
         elif action == "commodity_stats":
             rows = _tool_commodity_stats(db, **args)
-            artifacts["commodity_stats"] = rows
-            tool_trace.append({"tool": action, "args": args, "rows": len(rows)})
+            out["commodity_stats"] = rows
+            trace.append({"tool": action, "args": args, "rows": len(rows), **tool_cache_note()})
         else:
-            tool_trace.append({"tool": "unknown_step", "raw": {"action": action, "args": args}})
+            trace.append({"tool": "unknown_step", "raw": {"action": action, "args": args}})
+        return occurrences
 
-    audit_log("workflow_plan", {"query": user_query, "steps": len(plan_steps)})
-    for step in plan_steps[:max_steps]:
-        action = str(step.get("action") or "")
-        args = step.get("args") or {}
-        if not action:
-            continue
+    def _run_step(step: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any], Optional[List[OccurrenceInfo]]]:
+        step_db = SessionLocal()
         try:
-            _exec(action, dict(args))
-            audit_log("workflow_step", {"action": action})
-        except Exception as e:
-            tool_trace.append({"tool": action, "args": args, "error": str(e)})
-            audit_log("workflow_step_error", {"action": action, "error": str(e)})
+            _set_statement_timeout(step_db, step_timeout_s())
+            trace: List[Dict[str, Any]] = []
+            out: Dict[str, Any] = {}
+            occs = _exec(str(step["action"]), dict(step.get("args") or {}), step_db, trace, out)
+            return trace, out, occs
+        finally:
+            step_db.close()
+
+    def _step_done(i: int, result: Any, error: Optional[BaseException], elapsed_ms: float) -> None:
+        nonlocal last_occurrences
+        action = str(steps[i]["action"])
+        elapsed_ms = round(elapsed_ms, 1)
+        if error is not None:
+            tool_trace.append({"tool": action, "args": steps[i].get("args") or {}, "error": str(error), "elapsed_ms": elapsed_ms})
+            audit_log("workflow_step_error", {"action": action, "error": str(error)})
+            return
+        trace, out, occs = result
+        for key, value in out.items():
+            if key == "zonal_stats":
+                artifacts[key] = (artifacts.get(key) or []) + value
+            else:
+                artifacts[key] = value
+        if occs is not None:
+            last_occurrences = occs
+        for item in trace:
+            item["elapsed_ms"] = elapsed_ms
+            tool_trace.append(item)
+        audit_log("workflow_step", {"action": action, "elapsed_ms": elapsed_ms})
+
+    audit_log("workflow_plan", {"query": user_query, "steps": len(plan_steps)})
+    emit_event("plan", plan_steps[:max_steps])
+    # Independent steps run in parallel; see workflow_executor for the dependency rules.
+    steps = [s for s in plan_steps[:max_steps] if str(s.get("action") or "")]
+    run_steps(steps, _run_step, _step_done)
 
     # Produce final answer (conversational) grounded in tool results
     rag_context, rag_occs = rag_retrieve(user_query, k=6)
@@ -1442,23 +1799,29 @@ def run_workflow(
         artifacts["summary_validated"] = True
         artifacts["summary_violations"] = []
     else:
-        artifacts_preview = {
-            "qc_summary": _truncate_for_llm(artifacts.get("qc_summary")),
-            "qc_outliers": _truncate_for_llm(artifacts.get("qc_outliers")),
-            "stats_by_region": _truncate_for_llm(artifacts.get("stats_by_region")),
-            "commodity_stats": _truncate_for_llm(artifacts.get("commodity_stats")),
-            "importance_breakdown": _truncate_for_llm(artifacts.get("importance_breakdown")),
-            "spatial_total": artifacts.get("spatial_total"),
-            "ogc_items_url": artifacts.get("ogc_items_url"),
-            "charts": _truncate_for_llm(artifacts.get("charts"), max_list=6),
-        }
-        scratch = json.dumps({"plan": plan_steps, "tool_outputs": artifacts_preview}, ensure_ascii=False)
+        alloc = PromptBudget().allocate(_MUHANNED_PERSONA, user_query)
+        # Shrink list/string caps until the tool-output summary fits its share of the budget.
+        for max_list, max_str in ((25, 4000), (10, 1000), (5, 300), (2, 120)):
+            artifacts_preview = {
+                "qc_summary": _truncate_for_llm(artifacts.get("qc_summary"), max_list=max_list, max_str=max_str),
+                "qc_outliers": _truncate_for_llm(artifacts.get("qc_outliers"), max_list=max_list, max_str=max_str),
+                "stats_by_region": _truncate_for_llm(artifacts.get("stats_by_region"), max_list=max_list, max_str=max_str),
+                "commodity_stats": _truncate_for_llm(artifacts.get("commodity_stats"), max_list=max_list, max_str=max_str),
+                "importance_breakdown": _truncate_for_llm(
+                    artifacts.get("importance_breakdown"), max_list=max_list, max_str=max_str
+                ),
+                "spatial_total": artifacts.get("spatial_total"),
+                "ogc_items_url": artifacts.get("ogc_items_url"),
+                "charts": _truncate_for_llm(artifacts.get("charts"), max_list=min(6, max_list), max_str=max_str),
+            }
+            scratch = json.dumps({"plan": plan_steps, "tool_outputs": artifacts_preview}, ensure_ascii=False)
+            if count_tokens(scratch) <= alloc["tools"]:
+                break
         final_prompt = (
-            _MUHANNED_PERSONA
-            + "\n\nUser query:\n"
+            "User query:\n"
             + user_query
             + "\n\nRAG context (from MODS):\n"
-            + (rag_context or "(none)")
+            + (fit_rag_context(rag_context, alloc["rag"]) or "(none)")
             + "\n\nWorkflow plan + tool outputs summary:\n"
             + scratch
             + "\n\nWrite a brief, high-level summary for a geospatial specialist.\n"
@@ -1468,8 +1831,9 @@ def run_workflow(
             + "- Keep it short (6-10 lines).\n"
             + "- If charts exist, describe what they show.\n"
         )
-        answer = generate_response(final_prompt)
-        if isinstance(answer, str) and (answer.startswith("LLM call timed out") or answer.startswith("LLM error")):
+        record_prompt_size("workflow_summary", final_prompt, _MUHANNED_PERSONA)
+        answer = generate_response(final_prompt, on_token=token_emitter(), system=_MUHANNED_PERSONA)
+        if is_llm_failure(answer):
             answer, meta = _build_deterministic_summary(artifacts)
             artifacts["summary_source"] = "fallback"
             artifacts["summary_validated"] = True
@@ -1499,12 +1863,88 @@ def run_workflow(
                 artifacts["summary_violations"] = violations
     audit_log("workflow_final", {"query": user_query})
     return sanitize_text(answer), plan_steps, tool_trace, last_occurrences, artifacts
-    try:
-        return json.loads(text[start : end + 1])
-    except Exception:
-        return None
 
 
+def _describe_filters(args: Dict[str, Any]) -> str:
+    what = f"{args['commodity']} occurrences" if args.get("commodity") else "occurrences"
+    if args.get("occurrence_type"):
+        what = f"{args['occurrence_type']} {what}"
+    if args.get("region"):
+        what += f" in {args['region']}"
+    if args.get("exploration_status"):
+        what += f" with exploration status '{args['exploration_status']}'"
+    return what
+
+
+def _occurrence_lines(occs: List[OccurrenceInfo], n: int = 5) -> str:
+    return "".join(f"\n- {o.english_name} ({o.mods_id}), {o.major_commodity}, {o.admin_region or 'unknown region'}" for o in occs[:n])
+
+
+def _answer_parsed_query(
+    db: Session, parsed: ParsedQuery, tool_trace: List[Dict[str, Any]], artifacts: Dict[str, Any]
+) -> Tuple[str, Optional[List[OccurrenceInfo]]]:
+    """Run the parser's tool call and fill the answer template. Returns (answer, occurrences)."""
+    tool, args = parsed.tool, dict(parsed.args)
+    what = _describe_filters(args)
+    parse_note = {"parsed": {"intent": parsed.intent, "coverage": parsed.coverage}}
+    if tool == "importance_breakdown":
+        rows = _tool_importance_breakdown(db, **args)
+        artifacts["importance_breakdown"] = rows
+        tool_trace.append({"tool": tool, "args": args, "rows": len(rows), **tool_cache_note(), **parse_note})
+        levels = parsed.entities.get("importance")
+        if levels:
+            wanted = {lvl.lower() for lvl in levels}
+            total = sum(int(r["count"]) for r in rows if str(r["occurrence_importance"] or "").lower() in wanted)
+            return f"There are {total} {what} of {' or '.join(levels)} importance.", None
+        total = sum(int(r["count"]) for r in rows)
+        parts = ", ".join(f"{r['occurrence_importance'] or 'unspecified'}: {r['count']}" for r in rows)
+        return f"There are {total} {what}." + (f" By importance: {parts}." if parts else ""), None
+    if tool in ("search_mods", "nearby_mods"):
+        args["limit"] = _clamp_int(args.get("limit"), 1, 200, 25)
+        if tool == "nearby_mods":
+            args["radius_km"] = _clamp_float(args.get("radius_km"), 0.1, 1000.0, 50.0)
+            results = _tool_nearby_mods(db, **args)
+            what += f" within {args['radius_km']:g} km of ({args['lat']:g}, {args['lon']:g})"
+        else:
+            results = _tool_search_mods(db, **args)
+        tool_trace.append({"tool": tool, "args": args, "results_count": len(results), **tool_cache_note(), **parse_note})
+        if not results:
+            return f"No {what} were found.", results
+        if len(results) >= args["limit"]:
+            # The limit was reached: the total is unknown, so do not present the page size as a count.
+            return f"Showing the first {len(results)} matching {what} (there may be more):" + _occurrence_lines(results), results
+        return f"Found {len(results)} {what}:" + _occurrence_lines(results), results
+    if tool == "nearest_mods":
+        args["limit"] = _clamp_int(args.get("limit"), 1, 200, 10)
+        results = _tool_nearest_mods(db, **args)
+        artifacts["nearest_results"] = results
+        tool_trace.append({"tool": tool, "args": args, "results_count": len(results), **tool_cache_note(), **parse_note})
+        if not results:
+            return f"No {what} were found near ({args['lat']:g}, {args['lon']:g}).", None
+        lines = "".join(
+            f"\n- {r.occurrence.english_name} ({r.occurrence.mods_id}), {r.occurrence.major_commodity}, "
+            f"{(r.distance_m or 0.0) / 1000.0:.1f} km"
+            for r in results[:5]
+        )
+        return f"The {len(results)} nearest {what} to ({args['lat']:g}, {args['lon']:g}):" + lines, [r.occurrence for r in results]
+    if tool == "geojson_export":
+        args["limit"] = _clamp_int(args.get("limit"), 1, 2000, 400)
+        geojson = _tool_geojson_export(db, **args)
+        artifacts["geojson"] = geojson
+        n = len(geojson.get("features", []))
+        tool_trace.append({"tool": tool, "args": args, "features_count": n, **tool_cache_note(), **parse_note})
+        return f"Exported {n} {what} as GeoJSON (see `artifacts.geojson`; shown on the map).", None
+    if tool == "csv_export":
+        args["limit"] = _clamp_int(args.get("limit"), 1, 5000, 5000)
+        csv_text = _tool_csv_export(db, **args)
+        artifacts["csv"] = csv_text
+        tool_trace.append({"tool": tool, "args": args, "csv_bytes": len(csv_text.encode("utf-8")), **tool_cache_note(), **parse_note})
+        rows = max(0, len(csv_text.strip().splitlines()) - 1)
+        return f"Exported {rows} {what} as CSV (see `artifacts.csv`).", None
+    raise ValueError(f"Unsupported parsed tool: {tool}")
+
+
+@_with_request_memo
 def run_agent(
     db: Session,
     user_query: str,
@@ -1515,80 +1955,42 @@ def run_agent(
     Simple JSON-tool-loop agent.
     Returns (final_answer, tool_trace, occurrences_if_any).
     """
-    tool_trace: List[Dict[str, Any]] = []
+    tool_trace: List[Dict[str, Any]] = _StreamedTrace()
     last_occurrences: Optional[List[OccurrenceInfo]] = None
-    artifacts: Dict[str, Any] = {}
+    artifacts: Dict[str, Any] = _StreamedArtifacts()
     seen_calls: set[str] = set()
     debug_trace = os.getenv("AGENT_DEBUG_TRACE", "0").lower() in ("1", "true", "yes")
 
-    def _infer_regions_from_query() -> List[str]:
-        # Use actual DB region names; match if the base token appears in the query.
-        try:
-            rows = db.query(MODSOccurrence.admin_region).distinct().all()
-            regions = [r[0] for r in rows if r and r[0]]
-        except Exception:
-            regions = []
-        q = user_query.lower()
-        out: List[str] = []
-        for reg in regions:
-            base = reg.lower()
-            base = base.replace(" region", "").replace(" province", "").strip()
-            # allow common spelling: madinah/medina
-            if base == "madinah":
-                tokens = {"madinah", "medina"}
-            else:
-                tokens = {base}
-            if any(t in q for t in tokens):
-                out.append(reg)
-        # de-dupe, keep order
-        seen = set()
-        final = []
-        for r in out:
-            if r in seen:
-                continue
-            seen.add(r)
-            final.append(r)
-        return final
-
-    def _infer_commodity_from_query() -> Optional[str]:
-        q = user_query.lower()
-        # small high-signal set; can expand later
-        if "gold" in q:
-            return "Gold"
-        if "copper" in q:
-            return "Copper"
-        if "zinc" in q:
-            return "Zinc"
-        if "silver" in q:
-            return "Silver"
-        return None
-
-    # Pragmatic: "show/map ... mines in <regions>" should ALWAYS visualize correctly.
-    # This avoids local model tool-use glitches and makes the UI feel reliable.
+    # Pragmatic: "show/map <commodity> mines|quarries|... in <regions>" should ALWAYS visualize correctly.
+    # This avoids local model tool-use glitches and makes the UI feel reliable. Entities come from the
+    # gazetteer (MODS vocabularies + English/Arabic variants), so no DB lookup or LLM call is needed.
     ql = user_query.lower()
-    if ("show" in ql or "map" in ql) and ("mine" in ql):
-        regions = _infer_regions_from_query()
-        commodity = _infer_commodity_from_query()
-        if regions and commodity:
+    if any(w in ql for w in ("show", "map", "display", "plot", "اعرض", "اظهر", "أظهر", "خريطة", "خريطه")):
+        entities = get_gazetteer(db).extract(user_query)
+        regions = entities["region"]
+        commodity = (entities["commodity"] or [None])[0]
+        status = (entities["exploration_status"] or [None])[0]
+        if regions and commodity and status:
             region_guess = ", ".join(regions)
             geojson = _tool_geojson_export(
                 db,
                 commodity=commodity,
                 region=region_guess,
-                exploration_status="mine",
+                exploration_status=status,
                 limit=400,
             )
             artifacts["geojson"] = geojson
             tool_trace.append(
                 {
                     "tool": "auto_geojson_export",
-                    "args": {"commodity": commodity, "region": region_guess, "exploration_status": "mine", "limit": 400},
+                    "args": {"commodity": commodity, "region": region_guess, "exploration_status": status, "limit": 400},
                     "features_count": len(geojson.get("features", [])),
+                    **tool_cache_note(),
                 }
             )
             answer = (
-                f"I mapped {commodity} mine locations in {region_guess} "
-                f"(filtered by exploration_status containing 'mine'). "
+                f"I mapped {commodity} {status.lower()} locations in {region_guess} "
+                f"(filtered by exploration_status containing '{status}'). "
                 f"Showing {len(geojson.get('features', []))} points on the map."
             )
             audit_log(
@@ -1597,9 +1999,11 @@ def run_agent(
                     "query": user_query,
                     "commodity": commodity,
                     "region": region_guess,
+                    "exploration_status": status,
                     "features": len(geojson.get("features", [])),
                 },
             )
+            parser_stats.record("map")
             return sanitize_text(answer), tool_trace, last_occurrences, artifacts
 
     # Pragmatic file-geometry fast paths (avoid LLM dependency for common GIS ops)
@@ -1633,6 +2037,18 @@ def run_agent(
                 artifacts,
             )
 
+    # Plain filter questions ("count copper mines in Asir", "nearest gold to 24.7, 46.7") are parsed into one
+    # tool call and answered from a template; only the rest goes through RAG + the LLM tool loop.
+    parsed = None if os.getenv("QUERY_PARSER_DISABLE", "0") == "1" else parse_query(user_query, get_gazetteer(db))
+    parser_stats.record(parsed.intent if parsed else None)
+    if parsed is not None:
+        answer, occs = _answer_parsed_query(db, parsed, tool_trace, artifacts)
+        audit_log(
+            "agent_parsed_query",
+            {"query": user_query, "intent": parsed.intent, "tool": parsed.tool, "args": parsed.args, "coverage": parsed.coverage},
+        )
+        return sanitize_text(answer), tool_trace, occs if occs is not None else last_occurrences, artifacts
+
     # Always do RAG retrieval up-front so the agent is grounded in MODS.
     rag_context, rag_occs = rag_retrieve(user_query, k=6)
     if rag_occs:
@@ -1640,284 +2056,291 @@ def run_agent(
     scratchpad = ""
     scratchpad += f"\n- RAG retrieved {len(rag_occs)} occurrences; context chars: {len(rag_context)}\n"
 
-    history_block = ""
-    if chat_history:
-        lines = []
-        for m in chat_history[-12:]:
-            role = "User" if m.role == "user" else "Muhanned"
-            lines.append(f"{role}: {m.content}")
-        history_block = "\n".join(lines)
+    # Every step's prompt is assembled under one token budget, so it does not grow with the number of steps.
+    alloc = PromptBudget().allocate(_AGENT_SYSTEM_PROMPT, user_query)
+    history_block = fit_history(chat_history, alloc["history"], max_turns=12)
 
-    for _ in range(max_steps):
+    def _agent_prompt(footer: str = "") -> str:
         prompt = (
-            _MUHANNED_PERSONA
-            + "\n\n"
-            + _AGENT_INSTRUCTIONS
-            + "\n\nConversation so far:\n"
+            "Conversation so far:\n"
             + (history_block or "(none)")
             + "\n\nRAG context (from MODS):\n"
-            + (rag_context or "(none)")
+            + (fit_rag_context(rag_context, alloc["rag"]) or "(none)")
             + "\n\nUser query:\n"
             + user_query
             + "\n\nTool results so far:\n"
-            + (scratchpad or "(none)")
+            + (compact_tool_results(scratchpad, alloc["tools"]) or "(none)")
+            + footer
         )
-        model_out = generate_response(prompt)
-        action_obj = _extract_json_object(model_out)
+        record_prompt_size("agent_step", prompt, _AGENT_SYSTEM_PROMPT)
+        return prompt
+
+    def _call_tool(action: str, args: Dict[str, Any], call_db: Session) -> _ToolCallResult:
+        """Run one tool call; results go to the returned record and are merged by the caller."""
+        res = _ToolCallResult()
+        trace, out = res.trace, res.artifacts
+        if action == "search_mods":
+            results = _tool_search_mods(call_db, **args)
+            res.occurrences = results
+            trace.append({"tool": action, "args": args, "results_count": len(results), **tool_cache_note()})
+            res.scratch.append(f"\n- search_mods returned {len(results)} rows\n")
+        elif action == "nearby_mods":
+            results = _tool_nearby_mods(call_db, **args)
+            res.occurrences = results
+            trace.append({"tool": action, "args": args, "results_count": len(results), **tool_cache_note()})
+            res.scratch.append(f"\n- nearby_mods returned {len(results)} rows\n")
+        elif action == "commodity_stats":
+            stats = _tool_commodity_stats(call_db, **args)
+            trace.append({"tool": action, "args": args, "results_preview": stats[:5], **tool_cache_note()})
+            res.scratch.append(f"\n- commodity_stats top5: {stats[:5]}\n")
+        elif action == "bbox_mods":
+            results = _tool_bbox_mods(call_db, **args)
+            res.occurrences = results
+            trace.append({"tool": action, "args": args, "results_count": len(results), **tool_cache_note()})
+            res.scratch.append(f"\n- bbox_mods returned {len(results)} rows\n")
+        elif action == "nearest_mods":
+            results = _tool_nearest_mods(call_db, **args)
+            trace.append({"tool": action, "args": args, "results_count": len(results), **tool_cache_note()})
+            out["nearest_results"] = results
+            # Provide a small preview so the model can summarize.
+            preview = [r.model_dump() for r in results[:5]]
+            res.scratch.append(f"\n- nearest_mods returned {len(results)} rows; preview: {preview}\n")
+        elif action == "geojson_export":
+            geojson = _tool_geojson_export(call_db, **args)
+            out["geojson"] = geojson
+            trace.append({"tool": action, "args": args, "features_count": len(geojson.get('features', [])), **tool_cache_note()})
+            res.scratch.append(f"\n- geojson_export produced {len(geojson.get('features', []))} features\n")
+        elif action == "csv_export":
+            csv_text = _tool_csv_export(call_db, **args)
+            out["csv"] = csv_text
+            trace.append({"tool": action, "args": args, "csv_bytes": len(csv_text.encode('utf-8')), **tool_cache_note()})
+            res.scratch.append(f"\n- csv_export produced {len(csv_text)} characters of CSV\n")
+        elif action == "stats_by_region":
+            rows = _tool_stats_by_region(call_db, **args)
+            out["stats_by_region"] = rows
+            trace.append({"tool": action, "args": args, "rows": len(rows), **tool_cache_note()})
+            res.scratch.append(f"\n- stats_by_region top5: {rows[:5]}\n")
+        elif action == "importance_breakdown":
+            rows = _tool_importance_breakdown(call_db, **args)
+            out["importance_breakdown"] = rows
+            trace.append({"tool": action, "args": args, "rows": len(rows), **tool_cache_note()})
+            res.scratch.append(f"\n- importance_breakdown: {rows}\n")
+        elif action == "heatmap_bins":
+            rows = _tool_heatmap_bins(call_db, **args)
+            out["heatmap_bins"] = rows
+            trace.append({"tool": action, "args": args, "bins": len(rows), **tool_cache_note()})
+            res.scratch.append(f"\n- heatmap_bins top5: {rows[:5]}\n")
+        elif action == "qc_summary":
+            if not feature_enabled("qc"):
+                raise ValueError("QC is disabled by data governance policy.")
+            rep = _tool_qc_summary(call_db)
+            out["qc_summary"] = rep
+            trace.append({"tool": action, "args": {}, "keys": list(rep.keys()), **tool_cache_note()})
+            res.scratch.append(f"\n- qc_summary: {rep}\n")
+        elif action == "qc_duplicates_mods_id":
+            if not feature_enabled("qc"):
+                raise ValueError("QC is disabled by data governance policy.")
+            rows = _tool_qc_duplicates_mods_id(call_db, **args)
+            out["qc_duplicates_mods_id"] = rows
+            trace.append({"tool": action, "args": args, "groups": len(rows)})
+            res.scratch.append(f"\n- qc_duplicates_mods_id groups: {rows[:5]}\n")
+        elif action == "qc_duplicates_coords":
+            if not feature_enabled("qc"):
+                raise ValueError("QC is disabled by data governance policy.")
+            rows = _tool_qc_duplicates_coords(call_db, **args)
+            out["qc_duplicates_coords"] = rows
+            trace.append({"tool": action, "args": args, "groups": len(rows)})
+            res.scratch.append(f"\n- qc_duplicates_coords groups: {rows[:5]}\n")
+        elif action == "qc_outliers":
+            if not feature_enabled("qc"):
+                raise ValueError("QC is disabled by data governance policy.")
+            rep = _tool_qc_outliers(call_db, **args)
+            out["qc_outliers"] = rep
+            trace.append({"tool": action, "args": args, "returned": len((rep or {}).get('sample') or [])})
+            res.scratch.append(f"\n- qc_outliers counts: {(rep or {}).get('counts')}\n")
+        elif action == "ogc_items_link":
+            if not feature_enabled("ogc"):
+                raise ValueError("OGC API Features is disabled by data governance policy.")
+            url = _tool_ogc_items_link(args)
+            out["ogc_items_url"] = url
+            trace.append({"tool": action, "args": args, "url": url})
+            res.scratch.append(f"\n- ogc_items_link: {url}\n")
+        elif action == "publish_layer_instructions":
+            if not feature_enabled("ogc"):
+                raise ValueError("OGC API Features is disabled by data governance policy.")
+            url = str(args.get("ogc_items_url") or artifacts.get("ogc_items_url") or "").strip()
+            if not url:
+                url = _tool_ogc_items_link({})
+            instructions = (
+                "QGIS (OGC API Features) quick add:\n"
+                "1) Open QGIS → Data Source Manager\n"
+                "2) Find 'OGC API - Features' (or 'WFS/OGC API Features' depending on QGIS version)\n"
+                f"3) New connection → URL: {url}\n"
+                "4) Connect → choose 'mods_occurrences' → Add\n"
+            )
+            out["qgis_instructions"] = instructions
+            trace.append({"tool": action, "args": {"ogc_items_url": url}, "chars": len(instructions)})
+            res.scratch.append(f"\n- publish_layer_instructions generated {len(instructions)} chars\n")
+        elif action == "spatial_query":
+            if not feature_enabled("spatial"):
+                raise ValueError("Spatial operations are disabled by data governance policy.")
+            rep = _tool_spatial_query(call_db, **args)
+            out["spatial_total"] = int(rep.get("total") or 0)
+            out["spatial_geojson"] = rep.get("geojson")
+            trace.append(
+                {
+                    "tool": action,
+                    "args": args,
+                    "features_count": len((rep.get("geojson") or {}).get("features", [])),
+                }
+            )
+            res.scratch.append(f"\n- spatial_query total={rep.get('total')} features={len((rep.get('geojson') or {}).get('features', []))}\n")
+        elif action == "spatial_buffer":
+            if not feature_enabled("spatial"):
+                raise ValueError("Spatial operations are disabled by data governance policy.")
+            rep = _tool_spatial_buffer(call_db, geometry=args.get("geometry"), distance_m=float(args.get("distance_m")))
+            out["spatial_buffer_geometry"] = rep.get("geometry")
+            trace.append({"tool": action, "args": args})
+            res.scratch.append("\n- spatial_buffer produced a buffer geometry\n")
+        elif action == "spatial_nearest":
+            if not feature_enabled("spatial"):
+                raise ValueError("Spatial operations are disabled by data governance policy.")
+            rows = _tool_spatial_nearest(call_db, **args)
+            out["spatial_nearest"] = rows
+            trace.append({"tool": action, "args": args, "results_count": len(rows)})
+            res.scratch.append(f"\n- spatial_nearest returned {len(rows)} rows\n")
+        elif action == "rag":
+            # For Muhanned: rag tool is retrieval-only; LLM response is generated at the end.
+            q = str(args.get("query") or user_query)
+            ctx, occs = rag_retrieve(q, k=6)
+            res.rag_context = ctx
+            if occs:
+                res.occurrences = occs
+            trace.append({"tool": "rag", "args": {"query": q}, "results_count": len(occs)})
+            res.scratch.append(f"\n- rag_retrieve refreshed context; occs: {len(occs)}\n")
+        else:
+            # Unknown tool => recorded; the step stops when every call in it is unknown
+            trace.append({"tool": "unknown", "raw": {"action": action, "args": args}})
+            res.unknown = True
+        return res
+
+    def _run_call(call: Dict[str, Any]) -> _ToolCallResult:
+        # Calls of one step run concurrently, each with its own session.
+        call_db = SessionLocal()
+        try:
+            _set_statement_timeout(call_db, step_timeout_s())
+            return _call_tool(call["action"], call["args"], call_db)
+        finally:
+            call_db.close()
+
+    batch: List[Dict[str, Any]] = []
+    unknown_calls = 0
+
+    def _call_done(i: int, res: Optional[_ToolCallResult], error: Optional[BaseException], elapsed_ms: float) -> None:
+        nonlocal scratchpad, rag_context, last_occurrences, unknown_calls
+        action, args = batch[i]["action"], batch[i]["args"]
+        elapsed_ms = round(elapsed_ms, 1)
+        if error is not None or res is None:
+            tool_trace.append({"tool": action, "args": args, "error": str(error), "elapsed_ms": elapsed_ms})
+            scratchpad += f"\n- tool {action} errored: {error}\n"
+            return
+        for k, v in res.artifacts.items():
+            artifacts[k] = v
+        for item in res.trace:
+            item.setdefault("elapsed_ms", elapsed_ms)
+            tool_trace.append(item)
+        scratchpad += "".join(res.scratch)
+        if res.occurrences is not None:
+            last_occurrences = res.occurrences
+        if res.rag_context:
+            rag_context = res.rag_context
+        if res.unknown:
+            unknown_calls += 1
+            audit_log("agent_unknown_tool", {"query": user_query, "raw": batch[i]})
+
+    max_calls = max(1, int(os.getenv("AGENT_MAX_TOOL_CALLS", "4")))
+    metrics.incr("agent.llm_loops")
+    for _ in range(max_steps):
+        prompt = _agent_prompt()
+        model_out = generate_response(
+            prompt,
+            on_token=_agent_token_filter(),
+            system=_AGENT_SYSTEM_PROMPT,
+            response_format=structured_format(_AGENT_STEP_SCHEMA),
+        )
+        metrics.incr("agent.llm_steps")
+        action_obj = _parse_llm_json("agent_step", model_out, _extract_json_object)
+        calls = _agent_tool_calls(action_obj)
 
         # If the model didn't follow the tool JSON format:
         # - If we already ran tools, force a final answer using gathered results.
         # - Otherwise, treat the raw model output as the answer.
-        if not action_obj or "action" not in action_obj:
+        if not calls:
             if tool_trace:
                 break
             audit_log("agent_raw_answer", {"query": user_query})
             return sanitize_text(model_out), tool_trace, last_occurrences, artifacts
 
-        action = action_obj.get("action")
-        if action == "final":
-            return str(action_obj.get("answer", "")), tool_trace, last_occurrences, artifacts
-
-        args = action_obj.get("args") or {}
-        # --- Guard rails: normalize + hard-cap tool arguments ---
-        # Normalize region values (string/list)
-        if "region" in args:
-            args["region"] = _normalize_region_value(args.get("region"))
-
-        # Normalize occurrence_type placeholders
-        if "occurrence_type" in args:
-            args["occurrence_type"] = _normalize_occurrence_type(args.get("occurrence_type"))
-
-        # Normalize exploration_status empty strings
-        if "exploration_status" in args:
-            v = args.get("exploration_status")
-            if v is not None:
-                vv = str(v).strip()
-                args["exploration_status"] = vv or None
+        # A final answer emitted next to tool calls was written without their results: run the tools instead.
+        if len(calls) == 1 and calls[0].get("action") == "final":
+            return str(calls[0].get("answer", "")), tool_trace, last_occurrences, artifacts
+        calls = [c for c in calls if c.get("action") != "final"][:max_calls]
 
-        # Clamp limits per tool
-        if action in ("search_mods", "nearby_mods", "bbox_mods", "nearest_mods"):
-            args["limit"] = _clamp_int(args.get("limit"), 1, 200, 25)
-        if action in ("geojson_export",):
-            args["limit"] = _clamp_int(args.get("limit"), 1, 2000, 200)
-        if action in ("csv_export",):
-            args["limit"] = _clamp_int(args.get("limit"), 1, 5000, 2000)
-        if action in ("stats_by_region", "commodity_stats"):
-            args["limit"] = _clamp_int(args.get("limit"), 1, 200, 25)
-        if action in ("heatmap_bins",):
-            args["limit"] = _clamp_int(args.get("limit"), 1, 500, 200)
-            args["bin_km"] = _clamp_float(args.get("bin_km", 25.0), 1.0, 250.0, 25.0)
-        if action in ("qc_duplicates_mods_id", "qc_duplicates_coords", "qc_outliers"):
-            args["limit"] = _clamp_int(args.get("limit"), 1, 5000, 200)
-        if action in ("spatial_query",):
-            args["limit"] = _clamp_int(args.get("limit"), 1, 5000, 500)
-            args["offset"] = _clamp_int(args.get("offset"), 0, 500000, 0)
-            if args.get("op") == "dwithin":
-                args["distance_m"] = _clamp_float(args.get("distance_m"), 0.0, 2_000_000.0, 50_000.0)
-        if action in ("spatial_buffer",):
-            args["distance_m"] = _clamp_float(args.get("distance_m"), 0.0, 2_000_000.0, 50_000.0)
-        if action in ("spatial_nearest",):
-            args["limit"] = _clamp_int(args.get("limit"), 1, 500, 25)
-
-        # Clamp geo inputs
-        if action in ("nearby_mods",):
-            la, lo = _validate_lat_lon(args.get("lat"), args.get("lon"))
-            if la is None or lo is None:
-                raise ValueError("Invalid lat/lon")
-            args["lat"], args["lon"] = la, lo
-            args["radius_km"] = _clamp_float(args.get("radius_km"), 0.1, 1000.0, 50.0)
+        batch = []
+        batch_outputs: set[str] = set()
+        skipped = False
+        for call in calls:
+            action = str(call.get("action") or "")
+            try:
+                args = _clamp_agent_args(action, dict(call.get("args") or {}))
+            except Exception as e:
+                tool_trace.append({"tool": action, "args": call.get("args") or {}, "error": str(e)})
+                scratchpad += f"\n- tool {action} errored: {e}\n"
+                continue
 
-        if action in ("nearest_mods",):
-            la, lo = _validate_lat_lon(args.get("lat"), args.get("lon"))
-            if la is None or lo is None:
-                raise ValueError("Invalid lat/lon")
-            args["lat"], args["lon"] = la, lo
-
-        if action in ("bbox_mods",):
-            args["min_lat"] = _clamp_float(args.get("min_lat"), -90.0, 90.0, -90.0)
-            args["max_lat"] = _clamp_float(args.get("max_lat"), -90.0, 90.0, 90.0)
-            args["min_lon"] = _clamp_float(args.get("min_lon"), -180.0, 180.0, -180.0)
-            args["max_lon"] = _clamp_float(args.get("max_lon"), -180.0, 180.0, 180.0)
-
-        # If we've already produced the artifact for this tool, stop (prevents multi-tool spam).
-        already = (
-            (action == "heatmap_bins" and "heatmap_bins" in artifacts)
-            or (action == "stats_by_region" and "stats_by_region" in artifacts)
-            or (action == "importance_breakdown" and "importance_breakdown" in artifacts)
-            or (action == "geojson_export" and "geojson" in artifacts)
-            or (action == "csv_export" and "csv" in artifacts)
-            or (action == "nearest_mods" and "nearest_results" in artifacts)
-            or (action == "qc_summary" and "qc_summary" in artifacts)
-            or (action == "qc_duplicates_mods_id" and "qc_duplicates_mods_id" in artifacts)
-            or (action == "qc_duplicates_coords" and "qc_duplicates_coords" in artifacts)
-            or (action == "qc_outliers" and "qc_outliers" in artifacts)
-            or (action == "ogc_items_link" and "ogc_items_url" in artifacts)
-            or (action == "publish_layer_instructions" and "qgis_instructions" in artifacts)
-            or (action == "spatial_query" and "spatial_geojson" in artifacts)
-            or (action == "spatial_buffer" and "spatial_buffer_geometry" in artifacts)
-            or (action == "spatial_nearest" and "spatial_nearest" in artifacts)
-        )
-        if already:
-            if debug_trace:
-                tool_trace.append({"tool": "redundant_tool_call", "raw": action_obj})
-            break
+            # If we've already produced the artifact for this tool (earlier or in this step), skip it
+            # (prevents multi-tool spam).
+            output = _AGENT_TOOL_OUTPUTS.get(action)
+            if output and (output in artifacts or output in batch_outputs):
+                if debug_trace:
+                    tool_trace.append({"tool": "redundant_tool_call", "raw": call})
+                skipped = True
+                continue
 
-        call_key = f"{action}:{json.dumps(args, sort_keys=True, ensure_ascii=False)}"
-        if call_key in seen_calls:
-            # Model is looping on the same tool call; stop and force a final answer.
-            if debug_trace:
-                tool_trace.append({"tool": "loop_detected", "raw": action_obj})
-            break
-        seen_calls.add(call_key)
+            call_key = f"{action}:{json.dumps(args, sort_keys=True, ensure_ascii=False)}"
+            if call_key in seen_calls:
+                # Model is looping on the same tool call.
+                if debug_trace:
+                    tool_trace.append({"tool": "loop_detected", "raw": call})
+                skipped = True
+                continue
+            seen_calls.add(call_key)
+            if output:
+                batch_outputs.add(output)
+            batch.append({"action": action, "args": args})
+
+        if not batch:
+            if skipped:
+                # Nothing new to run: stop and force a final answer.
+                break
+            continue
 
-        try:
-            if action == "search_mods":
-                results = _tool_search_mods(db, **args)
-                last_occurrences = results
-                tool_trace.append({"tool": action, "args": args, "results_count": len(results)})
-                scratchpad += f"\n- search_mods returned {len(results)} rows\n"
-            elif action == "nearby_mods":
-                results = _tool_nearby_mods(db, **args)
-                last_occurrences = results
-                tool_trace.append({"tool": action, "args": args, "results_count": len(results)})
-                scratchpad += f"\n- nearby_mods returned {len(results)} rows\n"
-            elif action == "commodity_stats":
-                stats = _tool_commodity_stats(db, **args)
-                tool_trace.append({"tool": action, "args": args, "results_preview": stats[:5]})
-                scratchpad += f"\n- commodity_stats top5: {stats[:5]}\n"
-            elif action == "bbox_mods":
-                results = _tool_bbox_mods(db, **args)
-                last_occurrences = results
-                tool_trace.append({"tool": action, "args": args, "results_count": len(results)})
-                scratchpad += f"\n- bbox_mods returned {len(results)} rows\n"
-            elif action == "nearest_mods":
-                results = _tool_nearest_mods(db, **args)
-                tool_trace.append({"tool": action, "args": args, "results_count": len(results)})
-                artifacts["nearest_results"] = results
-                # Provide a small preview so the model can summarize.
-                preview = [r.model_dump() for r in results[:5]]
-                scratchpad += f"\n- nearest_mods returned {len(results)} rows; preview: {preview}\n"
-            elif action == "geojson_export":
-                geojson = _tool_geojson_export(db, **args)
-                artifacts["geojson"] = geojson
-                tool_trace.append({"tool": action, "args": args, "features_count": len(geojson.get('features', []))})
-                scratchpad += f"\n- geojson_export produced {len(geojson.get('features', []))} features\n"
-            elif action == "csv_export":
-                csv_text = _tool_csv_export(db, **args)
-                artifacts["csv"] = csv_text
-                tool_trace.append({"tool": action, "args": args, "csv_bytes": len(csv_text.encode('utf-8'))})
-                scratchpad += f"\n- csv_export produced {len(csv_text)} characters of CSV\n"
-            elif action == "stats_by_region":
-                rows = _tool_stats_by_region(db, **args)
-                artifacts["stats_by_region"] = rows
-                tool_trace.append({"tool": action, "args": args, "rows": len(rows)})
-                scratchpad += f"\n- stats_by_region top5: {rows[:5]}\n"
-            elif action == "importance_breakdown":
-                rows = _tool_importance_breakdown(db, **args)
-                artifacts["importance_breakdown"] = rows
-                tool_trace.append({"tool": action, "args": args, "rows": len(rows)})
-                scratchpad += f"\n- importance_breakdown: {rows}\n"
-            elif action == "heatmap_bins":
-                rows = _tool_heatmap_bins(db, **args)
-                artifacts["heatmap_bins"] = rows
-                tool_trace.append({"tool": action, "args": args, "bins": len(rows)})
-                scratchpad += f"\n- heatmap_bins top5: {rows[:5]}\n"
-            elif action == "qc_summary":
-                if not feature_enabled("qc"):
-                    raise ValueError("QC is disabled by data governance policy.")
-                rep = _tool_qc_summary(db)
-                artifacts["qc_summary"] = rep
-                tool_trace.append({"tool": action, "args": {}, "keys": list(rep.keys())})
-                scratchpad += f"\n- qc_summary: {rep}\n"
-            elif action == "qc_duplicates_mods_id":
-                if not feature_enabled("qc"):
-                    raise ValueError("QC is disabled by data governance policy.")
-                rows = _tool_qc_duplicates_mods_id(db, **args)
-                artifacts["qc_duplicates_mods_id"] = rows
-                tool_trace.append({"tool": action, "args": args, "groups": len(rows)})
-                scratchpad += f"\n- qc_duplicates_mods_id groups: {rows[:5]}\n"
-            elif action == "qc_duplicates_coords":
-                if not feature_enabled("qc"):
-                    raise ValueError("QC is disabled by data governance policy.")
-                rows = _tool_qc_duplicates_coords(db, **args)
-                artifacts["qc_duplicates_coords"] = rows
-                tool_trace.append({"tool": action, "args": args, "groups": len(rows)})
-                scratchpad += f"\n- qc_duplicates_coords groups: {rows[:5]}\n"
-            elif action == "qc_outliers":
-                if not feature_enabled("qc"):
-                    raise ValueError("QC is disabled by data governance policy.")
-                rep = _tool_qc_outliers(db, **args)
-                artifacts["qc_outliers"] = rep
-                tool_trace.append({"tool": action, "args": args, "returned": len((rep or {}).get('sample') or [])})
-                scratchpad += f"\n- qc_outliers counts: {(rep or {}).get('counts')}\n"
-            elif action == "ogc_items_link":
-                if not feature_enabled("ogc"):
-                    raise ValueError("OGC API Features is disabled by data governance policy.")
-                url = _tool_ogc_items_link(args)
-                artifacts["ogc_items_url"] = url
-                tool_trace.append({"tool": action, "args": args, "url": url})
-                scratchpad += f"\n- ogc_items_link: {url}\n"
-            elif action == "publish_layer_instructions":
-                if not feature_enabled("ogc"):
-                    raise ValueError("OGC API Features is disabled by data governance policy.")
-                url = str(args.get("ogc_items_url") or artifacts.get("ogc_items_url") or "").strip()
-                if not url:
-                    url = _tool_ogc_items_link({})
-                instructions = (
-                    "QGIS (OGC API Features) quick add:\n"
-                    "1) Open QGIS → Data Source Manager\n"
-                    "2) Find 'OGC API - Features' (or 'WFS/OGC API Features' depending on QGIS version)\n"
-                    f"3) New connection → URL: {url}\n"
-                    "4) Connect → choose 'mods_occurrences' → Add\n"
-                )
-                artifacts["qgis_instructions"] = instructions
-                tool_trace.append({"tool": action, "args": {"ogc_items_url": url}, "chars": len(instructions)})
-                scratchpad += f"\n- publish_layer_instructions generated {len(instructions)} chars\n"
-            elif action == "spatial_query":
-                if not feature_enabled("spatial"):
-                    raise ValueError("Spatial operations are disabled by data governance policy.")
-                rep = _tool_spatial_query(db, **args)
-                artifacts["spatial_total"] = int(rep.get("total") or 0)
-                artifacts["spatial_geojson"] = rep.get("geojson")
-                tool_trace.append(
-                    {
-                        "tool": action,
-                        "args": args,
-                        "features_count": len((rep.get("geojson") or {}).get("features", [])),
-                    }
-                )
-                scratchpad += f"\n- spatial_query total={rep.get('total')} features={len((rep.get('geojson') or {}).get('features', []))}\n"
-            elif action == "spatial_buffer":
-                if not feature_enabled("spatial"):
-                    raise ValueError("Spatial operations are disabled by data governance policy.")
-                rep = _tool_spatial_buffer(db, geometry=args.get("geometry"), distance_m=float(args.get("distance_m")))
-                artifacts["spatial_buffer_geometry"] = rep.get("geometry")
-                tool_trace.append({"tool": action, "args": args})
-                scratchpad += "\n- spatial_buffer produced a buffer geometry\n"
-            elif action == "spatial_nearest":
-                if not feature_enabled("spatial"):
-                    raise ValueError("Spatial operations are disabled by data governance policy.")
-                rows = _tool_spatial_nearest(db, **args)
-                artifacts["spatial_nearest"] = rows
-                tool_trace.append({"tool": action, "args": args, "results_count": len(rows)})
-                scratchpad += f"\n- spatial_nearest returned {len(rows)} rows\n"
-            elif action == "rag":
-                # For Muhanned: rag tool is retrieval-only; LLM response is generated at the end.
-                q = str(args.get("query") or user_query)
-                ctx, occs = rag_retrieve(q, k=6)
-                rag_context = ctx or rag_context
-                if occs:
-                    last_occurrences = occs
-                tool_trace.append({"tool": "rag", "args": {"query": q}, "results_count": len(occs)})
-                scratchpad += f"\n- rag_retrieve refreshed context; occs: {len(occs)}\n"
-            else:
-                # Unknown tool => stop
-                tool_trace.append({"tool": "unknown", "raw": action_obj})
-            audit_log("agent_unknown_tool", {"query": user_query, "raw": action_obj})
+        metrics.incr("agent.tool_calls", len(batch))
+        unknown_calls = 0
+        if len(batch) == 1:
+            t0 = time.perf_counter()
+            try:
+                res, err = _call_tool(batch[0]["action"], batch[0]["args"], db), None
+            except Exception as e:
+                res, err = None, e
+            _call_done(0, res, err, (time.perf_counter() - t0) * 1000.0)
+        else:
+            metrics.incr("agent.multi_tool_steps")
+            # Same dependency rules as workflow steps (e.g. two occurrence searches keep their order).
+            run_steps(batch, _run_call, _call_done, max_parallel=max_calls)
+        if unknown_calls == len(batch):
+            # Unknown tool(s) only => stop
             return sanitize_text(model_out), tool_trace, last_occurrences, artifacts
-        except Exception as e:
-            tool_trace.append({"tool": action, "args": args, "error": str(e)})
-            scratchpad += f"\n- tool {action} errored: {e}\n"
 
     # If we have artifacts, we can safely produce a deterministic final answer.
     if "geojson" in artifacts:
@@ -2064,20 +2487,14 @@ def run_agent(
         return sanitize_text(msg), tool_trace, last_occurrences, artifacts
 
     # Otherwise, force a final answer (either after tool usage or max steps)
-    final_prompt = (
-        _MUHANNED_PERSONA
-        + "\n\nConversation so far:\n"
-        + (history_block or "(none)")
-        + "\n\nRAG context (from MODS):\n"
-        + (rag_context or "(none)")
-        + "\n\nUser query:\n"
-        + user_query
-        + "\n\nTool results so far:\n"
-        + (scratchpad or "(none)")
-        + "\n\nIMPORTANT: Do NOT call any more tools. Respond with a final JSON object only."
+    final_prompt = _agent_prompt("\n\nIMPORTANT: Do NOT call any more tools. Respond with a final JSON object only.")
+    model_out = generate_response(
+        final_prompt,
+        on_token=_agent_token_filter(),
+        system=_AGENT_SYSTEM_PROMPT,
+        response_format=structured_format(_FINAL_SCHEMA),
     )
-    model_out = generate_response(final_prompt)
-    action_obj = _extract_json_object(model_out)
+    action_obj = _parse_llm_json("agent_final", model_out, _extract_json_object)
     if action_obj and action_obj.get("action") == "final":
         ans = str(action_obj.get("answer", ""))
         audit_log("agent_final", {"query": user_query})
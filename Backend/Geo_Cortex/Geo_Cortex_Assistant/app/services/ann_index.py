@@ -0,0 +1,123 @@
+"""
+Approximate nearest-neighbour (ANN) FAISS indexes built from the flat MODS index.
+
+The flat index (index.faiss, exact L2) stays the source of truth: incremental rebuilds update it, and it is
+the ground truth for recall benchmarks. An optional ANN index (index_ann.faiss) holds the same vectors in
+the same order, so LangChain's position -> docstore id mapping (index.pkl) applies to both.
+
+Index types:
+- hnsw:  IndexHNSWFlat (graph; no training). Params: m, ef_construction, ef_search
+- ivfpq: IndexIVFPQ (inverted lists + product quantization; trained). Params: nlist, pq_m, pq_bits, nprobe
+
+Indexes are read with IO_FLAG_MMAP_IFC so forked workers share the vector pages instead of each holding a
+copy (plain IO_FLAG_MMAP still copies IndexFlat / IndexHNSWFlat storage into RAM); older faiss builds fall
+back to IO_FLAG_MMAP, then to a normal read. `read_index_with_mode` reports which one was used.
+"""
+from __future__ import annotations
+
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+ANN_FILENAME = "index_ann.faiss"
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+
+def _faiss():
+    import faiss
+
+    return faiss
+
+
+def default_params(index_type: str, n: int, dim: int) -> Dict[str, Any]:
+    """Reasonable starting points for `n` vectors of dimension `dim` (override per key)."""
+    if index_type == "hnsw":
+        return {"m": 32, "ef_construction": 200, "ef_search": 64}
+    if index_type == "ivfpq":
+        # k-means wants ~39 training points per centroid (lists and PQ codebook entries alike).
+        nlist = max(1, min(int(4 * math.sqrt(max(1, n))), n // 39 or 1))
+        pq_bits = int(min(8, max(4, math.floor(math.log2(max(16, n // 39))))))
+        pq_m = max(m for m in range(1, min(64, dim) + 1) if dim % m == 0)
+        return {"nlist": nlist, "pq_m": pq_m, "pq_bits": pq_bits, "nprobe": max(1, min(nlist, 16))}
+    return {}
+
+
+def build_ann_index(vectors: np.ndarray, index_type: str, params: Optional[Dict[str, Any]] = None):
+    """
+    Build an L2 index of `index_type` over `vectors` (float32, n x dim), keeping input order as ids.
+    Returns (index, effective_params).
+    """
+    faiss = _faiss()
+    x = np.ascontiguousarray(vectors, dtype="float32")
+    n, dim = x.shape
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {', '.join(INDEX_TYPES)}")
+    p = {**default_params(index_type, n, dim), **{k: v for k, v in (params or {}).items() if v is not None}}
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, int(p["m"]))
+        index.hnsw.efConstruction = int(p["ef_construction"])
+    else:
+        if dim % int(p["pq_m"]) != 0:
+            raise ValueError(f"pq_m={p['pq_m']} must divide the embedding dimension {dim}")
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, int(p["nlist"]), int(p["pq_m"]), int(p["pq_bits"]))
+        index.train(x)
+    index.add(x)
+    apply_search_params(index, p)
+    return index, p
+
+
+def apply_search_params(index: Any, params: Optional[Dict[str, Any]]) -> None:
+    """Set query-time knobs (not stored in the index file): ef_search for HNSW, nprobe for IVF."""
+    faiss = _faiss()
+    params = params or {}
+    ef = os.getenv("FAISS_EF_SEARCH") or params.get("ef_search")
+    nprobe = os.getenv("FAISS_NPROBE") or params.get("nprobe")
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None and ef:
+        hnsw.efSearch = int(ef)
+    if nprobe:
+        try:
+            faiss.extract_index_ivf(index).nprobe = int(nprobe)
+        except Exception:
+            pass
+
+
+def flat_vectors(index: Any) -> np.ndarray:
+    """All vectors of a flat index, in id order."""
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype="float32")
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def write_index(index: Any, path: Path) -> None:
+    _faiss().write_index(index, str(path))
+
+
+def read_index_with_mode(path: Path, mmap: bool = True) -> Tuple[Any, str]:
+    """
+    Read an index file, memory-mapped when possible. Returns (index, load mode):
+    "mmap_ifc" (flat codes mapped), "mmap" (IO_FLAG_MMAP; inverted lists only) or "read" (full copy in RAM).
+    """
+    faiss = _faiss()
+    if mmap:
+        for mode, flag_name in (("mmap_ifc", "IO_FLAG_MMAP_IFC"), ("mmap", "IO_FLAG_MMAP")):
+            flag = getattr(faiss, flag_name, None)
+            if flag is None:
+                continue
+            try:
+                return faiss.read_index(str(path), flag), mode
+            except Exception:
+                pass
+    return faiss.read_index(str(path)), "read"
+
+
+def read_index(path: Path, mmap: bool = True):
+    """Read an index file, memory-mapped when possible (falls back to a normal read)."""
+    return read_index_with_mode(path, mmap=mmap)[0]
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+BM25_FILENAME = "bm25.json"
+
+_TOKEN_RE = re.compile(r"\w+", flags=re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens (Unicode-aware, so Arabic names are indexed too).
+    Single characters are dropped; digits are kept (MODS numbers, coordinates).
+    """
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if len(t) >= 2 or t.isdigit()]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the same documents as the FAISS store (page_content + metadata).
+
+    Stored as one JSON file next to the FAISS index so both are built, shipped and swapped together.
+    Scoring walks only the postings of the query terms, so a query costs O(matching postings).
+    """
+
+    def __init__(
+        self,
+        docs: List[Dict[str, Any]],
+        postings: Dict[str, List[List[int]]],
+        doc_len: List[int],
+        *,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.docs = docs
+        self.postings = postings
+        self.doc_len = doc_len
+        self.k1 = float(k1)
+        self.b = float(b)
+        n = len(doc_len)
+        self.avgdl = (sum(doc_len) / n) if n else 0.0
+        self.idf = {t: math.log(1.0 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in postings.items()}
+
+    @classmethod
+    def build(cls, documents: List[Any], *, k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """
+        Build from LangChain Documents (anything with .page_content and .metadata).
+        """
+        docs: List[Dict[str, Any]] = []
+        postings: Dict[str, List[List[int]]] = {}
+        doc_len: List[int] = []
+        for i, d in enumerate(documents):
+            text = str(getattr(d, "page_content", "") or "")
+            docs.append({"page_content": text, "metadata": dict(getattr(d, "metadata", {}) or {})})
+            tf = Counter(tokenize(text))
+            doc_len.append(sum(tf.values()))
+            for term, c in tf.items():
+                postings.setdefault(term, []).append([i, int(c)])
+        return cls(docs, postings, doc_len, k1=k1, b=b)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Top-k (doc_index, score), best first.
+        """
+        if not self.doc_len:
+            return []
+        scores: Dict[int, float] = {}
+        k1, b, avgdl = self.k1, self.b, self.avgdl or 1.0
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for doc_idx, tf in plist:
+                dl = self.doc_len[doc_idx]
+                s = idf * (tf * (k1 + 1.0)) / (tf + k1 * (1.0 - b + b * dl / avgdl))
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + s
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+        return ranked[: max(0, int(k))]
+
+    def save(self, directory: Path) -> Path:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        out = directory / BM25_FILENAME
+        tmp = out.with_suffix(".json.part")
+        payload = {
+            "version": 1,
+            "k1": self.k1,
+            "b": self.b,
+            "docs": self.docs,
+            "doc_len": self.doc_len,
+            "postings": self.postings,
+        }
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, out)
+        return out
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["BM25Index"]:
+        p = Path(directory) / BM25_FILENAME
+        if not p.exists():
+            return None
+        data = json.loads(p.read_text(encoding="utf-8"))
+        return cls(
+            data.get("docs") or [],
+            data.get("postings") or {},
+            data.get("doc_len") or [],
+            k1=float(data.get("k1", 1.5)),
+            b=float(data.get("b", 0.75)),
+        )
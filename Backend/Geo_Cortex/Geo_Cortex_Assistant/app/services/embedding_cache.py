@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, List, Optional
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+
+from app.services.metrics import hit_rate, metrics
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_CACHE_PATH = BASE_DIR / "data" / "cache" / "query_embeddings.sqlite"
+
+
+def normalize_query_text(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip())
+
+
+class QueryEmbeddingCache:
+    """
+    Query embedding cache keyed by (model, normalized text).
+
+    In-memory LRU (EMBED_CACHE_SIZE entries) in front of a small SQLite store (EMBED_CACHE_PATH),
+    so repeated queries skip the embedding server across restarts too. EMBED_CACHE_DISABLE=1 turns it off.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_items: Optional[int] = None):
+        self.max_items = int(max_items or os.getenv("EMBED_CACHE_SIZE", "2048"))
+        self.enabled = os.getenv("EMBED_CACHE_DISABLE", "0") != "1"
+        p = os.getenv("EMBED_CACHE_PATH")
+        self.path = Path(p) if p else (path or DEFAULT_CACHE_PATH)
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        if self._db is None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(str(self.path), check_same_thread=False)
+                db.execute("CREATE TABLE IF NOT EXISTS query_embeddings (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+                db.commit()
+                self._db = db
+            except Exception:
+                # Disk cache is best-effort; the LRU still works.
+                self._db = None
+        return self._db
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha1(f"{model}\0{normalize_query_text(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        if not self.enabled:
+            return None
+        k = self.key(model, text)
+        with self._lock:
+            vec = self._lru.get(k)
+            if vec is not None:
+                self._lru.move_to_end(k)
+                self.hits += 1
+                metrics.incr("embed_cache.hits")
+                return vec
+            db = self._conn()
+            row = db.execute("SELECT vec FROM query_embeddings WHERE key = ?", (k,)).fetchone() if db else None
+            if row is not None:
+                vec = np.frombuffer(row[0], dtype="float32").tolist()
+                self._put_lru(k, vec)
+                self.hits += 1
+                self.disk_hits += 1
+                metrics.incr("embed_cache.hits")
+                metrics.incr("embed_cache.disk_hits")
+                return vec
+            self.misses += 1
+            metrics.incr("embed_cache.misses")
+            return None
+
+    def put(self, model: str, text: str, vec: List[float]) -> None:
+        if not self.enabled:
+            return
+        k = self.key(model, text)
+        with self._lock:
+            self._put_lru(k, list(vec))
+            db = self._conn()
+            if db is not None:
+                try:
+                    db.execute(
+                        "INSERT OR REPLACE INTO query_embeddings (key, vec) VALUES (?, ?)",
+                        (k, np.asarray(vec, dtype="float32").tobytes()),
+                    )
+                    db.commit()
+                except Exception:
+                    pass
+
+    def _put_lru(self, k: str, vec: List[float]) -> None:
+        self._lru[k] = vec
+        self._lru.move_to_end(k)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._lru),
+                "max_items": self.max_items,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hit_rate(self.hits, self.misses),
+            }
+
+
+query_embedding_cache = QueryEmbeddingCache()
+metrics.register("query_embedding_cache", query_embedding_cache.stats)
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings wrapper: embed_query goes through the query cache, embed_documents is passed through.
+    Used under the FAISS retriever so every rag_retrieve caller benefits.
+    """
+
+    def __init__(self, inner: Any, model: str, cache: Optional[QueryEmbeddingCache] = None):
+        self.inner = inner
+        self.model = model
+        self.cache = cache or query_embedding_cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vec = self.cache.get(self.model, text)
+        if vec is not None:
+            return vec
+        vec = self.inner.embed_query(normalize_query_text(text))
+        self.cache.put(self.model, text, vec)
+        return vec
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def run_key(model: str, ids: List[str]) -> str:
+    """
+    Identity of an embedding run: same model + same ordered ids => same checkpoints can be reused.
+    Checkpoints are named by the rows they cover, so a rerun with another batch size is still safe.
+    """
+    h = hashlib.sha1(model.encode("utf-8"))
+    for i in ids:
+        h.update(b"\0")
+        h.update(i.encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def embed_texts(
+    embeddings: Any,
+    texts: List[str],
+    *,
+    checkpoint_dir: Optional[Path] = None,
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    retries: Optional[int] = None,
+    progress_cb: Optional[Callable[[int, int, float], None]] = None,
+) -> np.ndarray:
+    """
+    Embed `texts` in batches with a bounded number of concurrent requests to the embedding server.
+
+    - Each finished batch is saved to `checkpoint_dir/rows_<start>_<end>.npy`; a rerun with the same
+      checkpoint_dir (see run_key) loads the batches covering exactly the same rows instead of re-embedding,
+      so an interrupted build resumes where it stopped. Checkpoints of another batch size are not reused.
+    - A failing batch is retried with exponential backoff before the run gives up.
+    - progress_cb(done, total, docs_per_sec) after each batch; docs/sec counts only newly embedded docs.
+
+    Returns a float32 array (len(texts), dim) in input order.
+    Env defaults: EMBED_BATCH_SIZE=64, EMBED_CONCURRENCY=2, EMBED_RETRIES=3.
+    """
+    batch_size = max(1, int(batch_size or _env_int("EMBED_BATCH_SIZE", 64)))
+    concurrency = max(1, int(concurrency or _env_int("EMBED_CONCURRENCY", 2)))
+    retries = max(0, int(retries if retries is not None else _env_int("EMBED_RETRIES", 3)))
+
+    total = len(texts)
+    starts = list(range(0, total, batch_size))
+    results: Dict[int, np.ndarray] = {}
+
+    def _checkpoint(bi: int) -> Path:
+        start = starts[bi]
+        return checkpoint_dir / f"rows_{start:08d}_{min(start + batch_size, total):08d}.npy"
+
+    if checkpoint_dir is not None:
+        checkpoint_dir = Path(checkpoint_dir)
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        for bi, start in enumerate(starts):
+            p = _checkpoint(bi)
+            if p.exists():
+                try:
+                    arr = np.load(p)
+                    if arr.shape[0] == len(texts[start : start + batch_size]):
+                        results[bi] = arr
+                except Exception:
+                    pass
+
+    done = sum(a.shape[0] for a in results.values())
+    resumed = done
+    if progress_cb and done:
+        progress_cb(done, total, 0.0)
+
+    def _embed_batch(bi: int) -> np.ndarray:
+        start = starts[bi]
+        chunk = texts[start : start + batch_size]
+        delay = 1.0
+        for attempt in range(retries + 1):
+            try:
+                arr = np.asarray(embeddings.embed_documents(chunk), dtype="float32")
+                break
+            except Exception:
+                if attempt >= retries:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+        if checkpoint_dir is not None:
+            path = _checkpoint(bi)
+            tmp = path.with_name(path.name + ".part")
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, path)
+        return arr
+
+    pending = [bi for bi in range(len(starts)) if bi not in results]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = {}
+        it = iter(pending)
+        for bi in it:
+            in_flight[pool.submit(_embed_batch, bi)] = bi
+            if len(in_flight) >= concurrency:
+                break
+        while in_flight:
+            finished, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                bi = in_flight.pop(fut)
+                results[bi] = fut.result()
+                done += results[bi].shape[0]
+                if progress_cb:
+                    elapsed = max(1e-9, time.perf_counter() - t0)
+                    progress_cb(done, total, (done - resumed) / elapsed)
+                nxt = next(it, None)
+                if nxt is not None:
+                    in_flight[pool.submit(_embed_batch, nxt)] = nxt
+
+    if not results:
+        return np.zeros((0, 0), dtype="float32")
+    return np.concatenate([results[bi] for bi in range(len(starts))], axis=0)
+
+
+def clear_checkpoints(checkpoint_dir: Path) -> None:
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
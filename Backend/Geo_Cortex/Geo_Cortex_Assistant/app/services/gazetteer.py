@@ -0,0 +1,305 @@
+"""
+Gazetteer of MODS vocabulary terms (regions, commodities, exploration statuses, occurrence types, importance)
+for extracting filters from free-text agent queries.
+
+The vocabularies are the same distinct column values served by /meta, plus English spelling and Arabic
+variants. All terms are compiled into one Aho-Corasick automaton, so a query is scanned once regardless of
+vocabulary size. Text is normalized first (lowercase, punctuation -> space, Arabic letter variants unified)
+and terms only match whole words; overlapping matches keep the longest ("silica sand" over "sand").
+Commodity names that double as verbs ("lead", "iron") are skipped when used as one ("lead me to gold").
+"""
+from __future__ import annotations
+
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+KINDS = ("region", "commodity", "exploration_status", "occurrence_type", "importance")
+
+# Variants per region base name (the vocabulary value without " Region").
+_REGION_VARIANTS: Dict[str, List[str]] = {
+    "riyadh": ["riyadh", "riyad", "ar riyadh", "الرياض"],
+    "makkah": ["makkah", "mecca", "makka", "makkah al mukarramah", "مكة", "مكة المكرمة"],
+    "madinah": ["madinah", "medina", "madina", "al madinah", "المدينة", "المدينة المنورة"],
+    "tabouk": ["tabouk", "tabuk", "تبوك"],
+    "asir": ["asir", "aseer", "assir", "عسير"],
+    "qasim": ["qasim", "qassim", "al qassim", "al qasim", "القصيم"],
+    "eastern": ["eastern province", "eastern region", "ash sharqiyah", "sharqiyah", "الشرقية", "المنطقة الشرقية"],
+    "hail": ["hail", "ha il", "haail", "حائل"],
+    "baha": ["baha", "al baha", "albaha", "الباحة"],
+    "al jouf": ["al jouf", "jouf", "al jawf", "jawf", "الجوف"],
+    "najran": ["najran", "نجران"],
+    "jizan": ["jizan", "jazan", "gizan", "جازان", "جيزان"],
+    "northern border": ["northern border", "northern borders", "al hudud ash shamaliyah", "الحدود الشمالية"],
+}
+
+# Arabic names of common commodities (the English vocabulary value is the canonical form).
+_COMMODITY_ARABIC: Dict[str, List[str]] = {
+    "gold": ["ذهب"],
+    "copper": ["نحاس"],
+    "silver": ["فضة"],
+    "iron": ["حديد"],
+    "zinc": ["زنك", "خارصين"],
+    "lead": ["رصاص"],
+    "phosphate": ["فوسفات"],
+    "limestone": ["حجر جيري", "الحجر الجيري"],
+    "granite": ["جرانيت", "غرانيت"],
+    "marble": ["رخام"],
+    "gypsum": ["جبس"],
+    "salt": ["ملح"],
+    "coal": ["فحم"],
+    "uranium": ["يورانيوم"],
+    "nickel": ["نيكل"],
+    "chromium": ["كروم"],
+    "tungsten": ["تنجستن"],
+    "barites": ["باريت"],
+    "fluorite": ["فلوريت", "فلورايت"],
+    "quartz": ["كوارتز"],
+    "clays": ["طين", "طفل"],
+    "sand": ["رمل", "رمال"],
+    "basalt": ["بازلت"],
+    "dolomite": ["دولوميت"],
+    "feldspar": ["فلسبار"],
+    "bauxite": ["بوكسيت"],
+    "magnesite": ["ماغنسيت"],
+}
+
+# Generic status words map to a filter substring ("mine" matches every "... mine" status).
+_STATUS_VARIANTS: Dict[str, List[str]] = {
+    "mine": ["mine", "mines", "منجم", "مناجم"],
+    "Quarry": ["quarry", "quarries", "محجر", "محاجر"],
+    "Prospect": ["prospect", "prospects"],
+    "Deposit": ["deposit", "deposits", "رواسب"],
+    "Mining lease": ["mining lease", "mining leases", "رخصة تعدين"],
+}
+
+_IMPORTANCE_SUFFIXES = ("importance", "priority")
+
+# Commodity names that are also common English verbs ("lead me to gold", "iron out"): used as a verb they
+# are followed by an object or particle, so a match followed by one of these words is not a commodity.
+_AMBIGUOUS_COMMODITY_WORDS = {"lead", "iron"}
+_VERB_FOLLOWERS = {
+    "me", "us", "you", "him", "her", "them", "it", "this", "that", "these", "those",
+    "my", "our", "your", "their", "the", "a", "an",
+    "to", "into", "towards", "toward", "through", "up", "out", "off", "away", "back",
+}
+
+_AR_DIACRITICS = re.compile(r"[ً-ْـ]")
+_NON_WORD = re.compile(r"[^\w]+", flags=re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, unify Arabic letter variants, punctuation/underscores -> single spaces."""
+    s = _AR_DIACRITICS.sub("", (text or "").lower())
+    s = s.replace("أ", "ا").replace("إ", "ا").replace("آ", "ا").replace("ة", "ه").replace("ى", "ي")
+    s = _NON_WORD.sub(" ", s).replace("_", " ")
+    return " ".join(s.split())
+
+
+def _is_arabic(s: str) -> bool:
+    return any("؀" <= ch <= "ۿ" for ch in s)
+
+
+@dataclass(frozen=True)
+class GazetteerMatch:
+    kind: str
+    value: str  # canonical vocabulary value (or filter substring, e.g. "mine")
+    text: str  # matched (normalized) query text
+    start: int  # offsets in the normalized query
+    end: int
+
+
+class _AhoCorasick:
+    def __init__(self) -> None:
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[int]] = [[]]
+        self.patterns: List[str] = []
+
+    def add(self, pattern: str) -> int:
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        pid = len(self.patterns)
+        self.patterns.append(pattern)
+        self.out[node].append(pid)
+        return pid
+
+    def build(self) -> None:
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                cand = self.goto[f].get(ch, 0)
+                self.fail[nxt] = cand if cand != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter(self, text: str) -> Iterable[Tuple[int, int]]:
+        """(pattern id, end offset exclusive) for every occurrence."""
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for pid in self.out[node]:
+                yield pid, i + 1
+
+
+class Gazetteer:
+    def __init__(self, vocabularies: Dict[str, List[str]]):
+        self._ac = _AhoCorasick()
+        self._entries: List[Tuple[str, str]] = []  # pattern id -> (kind, canonical value)
+        seen: set = set()
+
+        def add(kind: str, value: str, term: str) -> None:
+            t = normalize_text(term)
+            if not t or (kind, value, t) in seen:
+                return
+            seen.add((kind, value, t))
+            variants = [t]
+            if _is_arabic(t) and not t.startswith("ال"):
+                variants.append("ال" + t)
+            for v in variants:
+                # Space padding makes every match whole-word (the query is padded the same way).
+                self._ac.add(f" {v} ")
+                self._entries.append((kind, value))
+
+        for region in vocabularies.get("region", []):
+            base = normalize_text(re.sub(r"\s+(region|province)$", "", region.strip(), flags=re.IGNORECASE))
+            add("region", region, region)
+            for term in _REGION_VARIANTS.get(base, [base]):
+                add("region", region, term)
+        for commodity in vocabularies.get("commodity", []):
+            add("commodity", commodity, commodity)
+            for part in re.split(r"\s*[/,]\s*", commodity):
+                add("commodity", commodity, part)
+                n = normalize_text(part)
+                if n.endswith("s") and not n.endswith("ss") and len(n) > 4:
+                    add("commodity", commodity, n[:-1])
+                for ar in _COMMODITY_ARABIC.get(n, []):
+                    add("commodity", commodity, ar)
+        statuses = vocabularies.get("exploration_status", [])
+        for status in statuses:
+            add("exploration_status", status, status)
+        for value, terms in _STATUS_VARIANTS.items():
+            if value == "mine" or value in statuses:
+                for term in terms:
+                    add("exploration_status", value, term)
+        for otype in vocabularies.get("occurrence_type", []):
+            add("occurrence_type", otype, otype)
+        for level in vocabularies.get("importance", []):
+            for suffix in _IMPORTANCE_SUFFIXES:
+                add("importance", level, f"{level} {suffix}")
+        self._ac.build()
+
+    @property
+    def size(self) -> int:
+        return len(self._entries)
+
+    def matches(self, query: str) -> List[GazetteerMatch]:
+        """Non-overlapping matches in query order (longest wins where terms overlap)."""
+        text = f" {normalize_text(query)} "
+        found: List[GazetteerMatch] = []
+        for pid, end in self._ac.iter(text):
+            kind, value = self._entries[pid]
+            start = end - len(self._ac.patterns[pid])
+            # Offsets without the padding spaces (into the normalized query).
+            found.append(GazetteerMatch(kind, value, text[start + 1 : end - 1], start, end - 2))
+        found.sort(key=lambda m: (m.start, -(m.end - m.start)))
+        kept: List[GazetteerMatch] = []
+        covered_until = -1
+        for m in found:
+            if m.start >= covered_until:
+                kept.append(m)
+                covered_until = m.end
+            elif kept and kept[-1].start == m.start and kept[-1].end == m.end and kept[-1].kind != m.kind:
+                kept.append(m)  # the same words are a term of two kinds
+        return [m for m in kept if not self._used_as_verb(m, text)]
+
+    @staticmethod
+    def _used_as_verb(m: GazetteerMatch, text: str) -> bool:
+        if m.kind != "commodity" or m.text not in _AMBIGUOUS_COMMODITY_WORDS:
+            return False
+        following = text[m.end + 1 :].split(maxsplit=1)
+        return bool(following) and following[0] in _VERB_FOLLOWERS
+
+    def extract(self, query: str) -> Dict[str, List[str]]:
+        """kind -> distinct canonical values, in query order."""
+        out: Dict[str, List[str]] = {k: [] for k in KINDS}
+        for m in self.matches(query):
+            if m.value not in out[m.kind]:
+                out[m.kind].append(m.value)
+        return out
+
+
+def _distinct(db: Any, col: Any) -> List[str]:
+    rows = db.query(col).filter(col.isnot(None)).distinct().all()
+    return sorted({str(v).strip() for (v,) in rows if v is not None and str(v).strip()})
+
+
+def load_vocabularies(db: Any = None) -> Dict[str, List[str]]:
+    """The /meta vocabularies from the database; MODS.csv when no session is given or the query fails."""
+    if db is not None:
+        try:
+            from app.models.dbmodels import MODSOccurrence
+
+            vocab = {
+                "region": _distinct(db, MODSOccurrence.admin_region),
+                "commodity": _distinct(db, MODSOccurrence.major_commodity),
+                "exploration_status": _distinct(db, MODSOccurrence.exploration_status),
+                "occurrence_type": _distinct(db, MODSOccurrence.occurrence_type),
+                "importance": _distinct(db, MODSOccurrence.occurrence_importance),
+            }
+            if any(vocab.values()):
+                return vocab
+        except Exception:
+            try:
+                db.rollback()
+            except Exception:
+                pass
+    from app.services.router_service import get_mods_df
+
+    df = get_mods_df()
+    columns = {
+        "region": "Admin Region",
+        "commodity": "Major Commodity",
+        "exploration_status": "Exploration Status",
+        "occurrence_type": "Occurrence Type",
+        "importance": "Occurrence Importance",
+    }
+    return {
+        kind: sorted({str(v).strip() for v in df[col].dropna().tolist() if str(v).strip()}) if col in df.columns else []
+        for kind, col in columns.items()
+    }
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_generation = -1
+_lock = threading.Lock()
+
+
+def get_gazetteer(db: Any = None) -> Gazetteer:
+    """Shared gazetteer, built once per MODS data generation (rebuilt after ingest)."""
+    global _gazetteer, _gazetteer_generation
+    from app.services import router_service
+
+    generation = router_service.mods_generation
+    if _gazetteer is None or _gazetteer_generation != generation:
+        with _lock:
+            if _gazetteer is None or _gazetteer_generation != generation:
+                _gazetteer = Gazetteer(load_vocabularies(db))
+                _gazetteer_generation = generation
+    return _gazetteer
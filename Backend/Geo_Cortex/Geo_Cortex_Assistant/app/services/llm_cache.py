@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.services.metrics import hit_rate, metrics
+
+
+class LLMResponseCache:
+    """
+    LLM response cache keyed by (model, temperature, prompt hash).
+
+    In-memory LRU bounded to LLM_CACHE_SIZE entries; entries expire after LLM_CACHE_TTL_SEC seconds.
+    Only deterministic calls are cached (temperature 0); LLM_CACHE_DISABLE=1 turns it off.
+    """
+
+    def __init__(self, max_items: Optional[int] = None, ttl_sec: Optional[float] = None):
+        self.max_items = int(max_items or os.getenv("LLM_CACHE_SIZE", "512"))
+        self.ttl_sec = float(ttl_sec if ttl_sec is not None else os.getenv("LLM_CACHE_TTL_SEC", "3600"))
+        self.enabled = os.getenv("LLM_CACHE_DISABLE", "0") != "1"
+        self._lru: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @staticmethod
+    def key(model: str, temperature: float, prompt: str) -> str:
+        ph = hashlib.sha256((prompt or "").encode("utf-8")).hexdigest()
+        return f"{model}\0{float(temperature):g}\0{ph}"
+
+    @staticmethod
+    def cacheable(temperature: float) -> bool:
+        return float(temperature) == 0.0
+
+    def bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+        metrics.incr("llm_cache.bypassed")
+
+    def get(self, model: str, temperature: float, prompt: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        k = self.key(model, temperature, prompt)
+        now = time.monotonic()
+        with self._lock:
+            item = self._lru.get(k)
+            if item is not None and item[0] <= now:
+                del self._lru[k]
+                self.expired += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                metrics.incr("llm_cache.misses")
+                return None
+            self._lru.move_to_end(k)
+            self.hits += 1
+            metrics.incr("llm_cache.hits")
+            return item[1]
+
+    def put(self, model: str, temperature: float, prompt: str, text: str) -> None:
+        if not self.enabled or self.ttl_sec <= 0:
+            return
+        k = self.key(model, temperature, prompt)
+        with self._lock:
+            self._lru[k] = (time.monotonic() + self.ttl_sec, text)
+            self._lru.move_to_end(k)
+            while len(self._lru) > self.max_items:
+                self._lru.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._lru),
+                "max_items": self.max_items,
+                "ttl_sec": self.ttl_sec,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "hit_rate": hit_rate(self.hits, self.misses),
+            }
+
+
+llm_response_cache = LLMResponseCache()
+metrics.register("llm_response_cache", llm_response_cache.stats)
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from app.services.metrics import metrics
+
+
+class LLMBusyError(RuntimeError):
+    """The LLM queue is full; with LLM_BUSY_MODE=reject this becomes HTTP 429."""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class LLMGateway:
+    """
+    Admission control for LLM calls.
+
+    Calls run as coroutines on a private event loop thread:
+    - at most LLM_CONCURRENCY calls talk to Ollama at once (default 2)
+    - at most LLM_QUEUE_MAX more wait for a slot (default 16); beyond that `run` raises LLMBusyError immediately
+    - the deadline covers queue wait + generation; on expiry the task is cancelled, which closes the HTTP
+      request so Ollama stops generating and the slot is freed for the next caller
+
+    Queue depth, in-flight calls and wait/call timings are exposed through /metrics.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, queue_max: Optional[int] = None):
+        self.concurrency = max(1, int(concurrency or _env_int("LLM_CONCURRENCY", 2)))
+        self.queue_max = max(0, int(queue_max if queue_max is not None else _env_int("LLM_QUEUE_MAX", 16)))
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+                self._sem = asyncio.Semaphore(self.concurrency)
+                self._loop = loop
+            return self._loop
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._ensure_loop()
+
+    def _gauges(self) -> None:
+        metrics.set_gauge("llm.queue_depth", self.waiting)
+        metrics.set_gauge("llm.in_flight", self.running)
+
+    async def _guarded(self, make_coro: Callable[[], Awaitable[Any]], deadline: float, enqueued: float) -> Any:
+        assert self._sem is not None
+        try:
+            await asyncio.wait_for(self._sem.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            with self._lock:
+                self.waiting -= 1
+                self.timeouts += 1
+                self._gauges()
+            metrics.incr("llm.timeouts")
+            raise
+        t0 = time.monotonic()
+        metrics.observe_ms("llm.queue_wait_ms", (t0 - enqueued) * 1000.0)
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+            self._gauges()
+        try:
+            out = await asyncio.wait_for(make_coro(), timeout=max(0.001, deadline - time.monotonic()))
+            with self._lock:
+                self.completed += 1
+            return out
+        except TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            metrics.incr("llm.timeouts")
+            raise
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            metrics.incr("llm.errors")
+            raise
+        finally:
+            metrics.observe_ms("llm.call_ms", (time.monotonic() - t0) * 1000.0)
+            with self._lock:
+                self.running -= 1
+                self._gauges()
+            self._sem.release()
+
+    def run(self, make_coro: Callable[[], Awaitable[Any]], timeout_s: float) -> Any:
+        """
+        Run `make_coro()` under the gateway from a sync caller and return its result.
+        Raises LLMBusyError (queue full) or TimeoutError (deadline passed, call cancelled).
+        """
+        loop = self._ensure_loop()
+        with self._lock:
+            if self.waiting + self.running >= self.concurrency + self.queue_max:
+                self.rejected += 1
+                metrics.incr("llm.rejected")
+                raise LLMBusyError(
+                    f"LLM queue is full ({self.running} running, {self.waiting} waiting). Try again shortly."
+                )
+            self.waiting += 1
+            self._gauges()
+        now = time.monotonic()
+        fut = asyncio.run_coroutine_threadsafe(self._guarded(make_coro, now + float(timeout_s), now), loop)
+        # The coroutine enforces the deadline itself; the margin only covers cancellation cleanup.
+        return fut.result(timeout=float(timeout_s) + 5.0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "queue_max": self.queue_max,
+                "running": self.running,
+                "waiting": self.waiting,
+                "completed": self.completed,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+                "errors": self.errors,
+            }
+
+
+llm_gateway = LLMGateway()
+metrics.register("llm_gateway", llm_gateway.stats)
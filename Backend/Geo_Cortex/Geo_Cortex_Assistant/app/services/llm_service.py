@@ -1,42 +1,152 @@
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
-from langchain_core.output_parsers import StrOutputParser
+import asyncio
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import json
 import os
+import threading
+from typing import Any, Callable, Dict, Optional
 from dotenv import load_dotenv
-from langchain_ollama import ChatOllama
+
+from app.services.llm_cache import llm_response_cache
+from app.services.llm_gateway import LLMBusyError, llm_gateway
+from app.services.metrics import metrics
+from app.services.ollama_client import OllamaClient, chat_messages
+from app.services.request_context import get_llm_cache_enabled
 
 load_dotenv()
 
 # Initialize local Ollama LLM
 # Make sure Ollama is running: `ollama serve`
-llm = ChatOllama(
-    model=os.getenv("OLLAMA_MODEL", "llama3.1"),
-    base_url=os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434"),
-    temperature=float(os.getenv("OLLAMA_TEMPERATURE", "0")),
-)
-parser = StrOutputParser()
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1")
+OLLAMA_TEMPERATURE = float(os.getenv("OLLAMA_TEMPERATURE", "0"))
+
+llm = OllamaClient(model=OLLAMA_MODEL, temperature=OLLAMA_TEMPERATURE)
+
+# Answers that mean "no LLM output" (callers fall back to deterministic text).
+LLM_FAILURE_PREFIXES = ("LLM call timed out", "LLM error", "LLM is busy")
+
+
+def is_llm_failure(text: object) -> bool:
+    return isinstance(text, str) and text.startswith(LLM_FAILURE_PREFIXES)
+
+
+def structured_format(schema: Dict[str, Any]) -> Optional[Any]:
+    """
+    Ollama `format` for a call that must return JSON matching `schema` (LLM_STRUCTURED_OUTPUT):
+    `schema` (default) constrains decoding to the schema, `json` only to valid JSON (older Ollama), `off` sends none.
+    """
+    mode = os.getenv("LLM_STRUCTURED_OUTPUT", "schema").strip().lower()
+    if mode == "off":
+        return None
+    return "json" if mode == "json" else schema
+
+
+class JsonParseStats:
+    """Per call site: how often an LLM reply that should be JSON could be parsed (GET /metrics → llm_json)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sites: Dict[str, Dict[str, int]] = {}
 
-_EXEC = ThreadPoolExecutor(max_workers=1)
+    def record(self, site: str, outcome: str) -> None:
+        """outcome: "parsed", "parse_failures" or "llm_failures" (timeout/busy/error, no reply to parse)."""
+        with self._lock:
+            counts = self._sites.setdefault(site, {"parsed": 0, "parse_failures": 0, "llm_failures": 0})
+            counts[outcome] += 1
 
+    def stats(self) -> dict:
+        with self._lock:
+            out: Dict[str, Any] = {}
+            for site, c in self._sites.items():
+                replies = c["parsed"] + c["parse_failures"]
+                out[site] = {**c, "parse_failure_rate": (c["parse_failures"] / replies) if replies else 0.0}
+            out["structured_output"] = os.getenv("LLM_STRUCTURED_OUTPUT", "schema").strip().lower()
+            return out
 
-def generate_response(formatted_prompt: str) -> str:
-    """Generate response using LLM"""
-    if os.getenv("LLM_DISABLED", "").strip().lower() in {"1", "true", "yes"}:
+
+json_parse_stats = JsonParseStats()
+metrics.register("llm_json", json_parse_stats.stats)
+
+
+def _llm_disabled() -> bool:
+    return os.getenv("LLM_DISABLED", "").strip().lower() in {"1", "true", "yes"}
+
+
+def warm_up_llm() -> None:
+    """
+    Start loading the model in the background (non-blocking) so the first request does not pay the load.
+    Skipped when LLM_DISABLED is set or LLM_WARMUP=0.
+    """
+    if _llm_disabled() or os.getenv("LLM_WARMUP", "1") == "0":
+        return
+    asyncio.run_coroutine_threadsafe(llm.warm_up(), llm_gateway.loop)
+
+
+def generate_response(
+    formatted_prompt: str,
+    use_cache: Optional[bool] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    system: Optional[str] = None,
+    response_format: Optional[Any] = None,
+) -> str:
+    """
+    Generate response using LLM.
+
+    Deterministic calls (temperature 0) go through the response cache; errors and timeouts are never cached.
+    `use_cache=None` follows the request-scoped opt-out (request field `use_cache`).
+    `on_token` streams the answer: it is called with each chunk as Ollama produces it (a cache hit is one chunk).
+    The full text is still returned.
+    `system` is a static prefix (persona/instructions) sent as the system message; keep it identical across
+    calls so Ollama can reuse its prompt cache.
+    `response_format` is sent as Ollama's `format` (structured output: "json" or a JSON schema; see
+    structured_format).
+    """
+    if _llm_disabled():
         return "LLM is disabled (LLM_DISABLED=true)."
 
+    if use_cache is None:
+        use_cache = get_llm_cache_enabled()
+    use_cache = use_cache and llm_response_cache.cacheable(OLLAMA_TEMPERATURE)
+    cache_prompt = f"{system}\0{formatted_prompt}" if system else formatted_prompt
+    if response_format is not None:
+        cache_prompt = json.dumps(response_format, sort_keys=True) + "\0" + cache_prompt
+    if use_cache:
+        cached = llm_response_cache.get(OLLAMA_MODEL, OLLAMA_TEMPERATURE, cache_prompt)
+        if cached is not None:
+            if on_token is not None:
+                on_token(cached)
+            return cached
+    else:
+        llm_response_cache.bypass()
+
     timeout_s = float(os.getenv("LLM_TIMEOUT_SEC", "20"))
 
-    def _call() -> str:
-        return parser.invoke(llm.invoke(formatted_prompt))
+    messages = chat_messages(formatted_prompt, system=system)
+
+    async def _call() -> str:
+        if on_token is None:
+            return await llm.chat(messages, format=response_format)
+        parts = []
+        async for text in llm.chat_stream(messages, format=response_format):
+            parts.append(text)
+            on_token(text)
+        return "".join(parts)
 
-    fut = _EXEC.submit(_call)
     try:
-        return fut.result(timeout=timeout_s)
-    except FuturesTimeoutError:
+        out = llm_gateway.run(_call, timeout_s)
+    except LLMBusyError:
+        # LLM_BUSY_MODE=reject surfaces as HTTP 429; default answers with a fallback right away.
+        if os.getenv("LLM_BUSY_MODE", "fallback").strip().lower() == "reject":
+            raise
+        return "LLM is busy (too many concurrent requests). Try again shortly, or set LLM_CONCURRENCY higher."
+    except (TimeoutError, FuturesTimeoutError):
         return (
             "LLM call timed out. If you want fully-offline answers, set LLM_DISABLED=true, "
             "or increase LLM_TIMEOUT_SEC, and make sure Ollama is running."
         )
     except Exception as e:
         return f"LLM error: {e}"
+    if use_cache:
+        llm_response_cache.put(OLLAMA_MODEL, OLLAMA_TEMPERATURE, cache_prompt, out)
+    return out
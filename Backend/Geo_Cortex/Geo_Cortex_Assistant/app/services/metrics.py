@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict
+
+
+class _Metrics:
+    """
+    In-process counters/timers exposed at GET /metrics (JSON).
+    Counters are plain monotonically increasing ints; timings keep count/sum/max in milliseconds.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+        self._gauges: Dict[str, Any] = {}
+        self._providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + int(n)
+
+    def observe_ms(self, name: str, ms: float) -> None:
+        with self._lock:
+            t = self._timings.setdefault(name, {"count": 0, "sum_ms": 0.0, "max_ms": 0.0})
+            t["count"] += 1
+            t["sum_ms"] += float(ms)
+            t["max_ms"] = max(t["max_ms"], float(ms))
+
+    def set_gauge(self, name: str, value: Any) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def register(self, name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+        """Add a component (e.g. a cache) whose stats() are included in snapshots."""
+        with self._lock:
+            self._providers[name] = provider
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            timings = {
+                k: {**v, "avg_ms": (v["sum_ms"] / v["count"]) if v["count"] else 0.0} for k, v in self._timings.items()
+            }
+            out: Dict[str, Any] = {"counters": dict(self._counters), "timings": timings, "gauges": dict(self._gauges)}
+            providers = dict(self._providers)
+        for name, fn in providers.items():
+            try:
+                out[name] = fn()
+            except Exception as e:
+                out[name] = {"error": str(e)}
+        return out
+
+
+metrics = _Metrics()
+
+
+def hit_rate(hits: int, misses: int) -> float:
+    total = hits + misses
+    return (hits / total) if total else 0.0
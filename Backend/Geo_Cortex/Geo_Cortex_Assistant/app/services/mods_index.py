@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+
+def normalize_name(s: str) -> str:
+    """
+    Name normalization used for lookups: uppercase, non-alphanumerics collapsed to single spaces.
+    """
+    s = (s or "").upper()
+    s = re.sub(r"[^A-Z0-9]+", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+
+def _trigrams(s: str) -> Iterable[str]:
+    return {s[i : i + 3] for i in range(len(s) - 2)}
+
+
+class _SubstringIndex:
+    """
+    Trigram inverted index over a list of strings.
+
+    `contains(p)` returns the positions of every string that contains `p` (ascending), exactly like a
+    `str.contains(re.escape(p))` scan: trigram postings narrow the candidates, a plain `in` check confirms them.
+    """
+
+    def __init__(self, values: List[str]):
+        self.values = values
+        postings: Dict[str, List[int]] = {}
+        for i, v in enumerate(values):
+            for g in _trigrams(v):
+                postings.setdefault(g, []).append(i)
+        self.postings = postings
+
+    def contains(self, p: str) -> List[int]:
+        if len(p) < 3:
+            return [i for i, v in enumerate(self.values) if p in v]
+        grams = sorted(_trigrams(p), key=lambda g: len(self.postings.get(g, ())))
+        first = self.postings.get(grams[0])
+        if not first:
+            return []
+        candidates = set(first)
+        for g in grams[1:]:
+            candidates.intersection_update(self.postings.get(g, ()))
+            if not candidates:
+                return []
+        return [i for i in sorted(candidates) if p in self.values[i]]
+
+
+class ModsIndex:
+    """
+    Lookup structures over the MODS DataFrame, built once per load of MODS.csv.
+
+    - MODS number -> row positions (e.g. "MODS 01909" and "mods 1909" both map to 1909)
+    - English Name exact maps (raw uppercase and normalized)
+    - substring indexes for the "contains" fallback on both forms
+
+    Row positions are DataFrame positions (suitable for `df.iloc`), in DataFrame order.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.size = int(len(df))
+
+        self.by_mods_num: Dict[int, List[int]] = {}
+        if "MODS" in df.columns:
+            nums = df["MODS"].astype(str).str.extract(r"(\d+)", expand=False).fillna("")
+            for pos, x in enumerate(nums.tolist()):
+                if str(x).isdigit():
+                    self.by_mods_num.setdefault(int(x), []).append(pos)
+
+        # Missing names index as "" (pandas 3 keeps NaN through astype(str)).
+        names = df["English Name"].fillna("").astype(str).tolist() if "English Name" in df.columns else [""] * self.size
+        upper = [n.strip().upper() for n in names]
+        norm = [normalize_name(n) for n in upper]
+
+        self.by_name_upper: Dict[str, List[int]] = {}
+        self.by_name_norm: Dict[str, List[int]] = {}
+        for pos, (u, n) in enumerate(zip(upper, norm)):
+            self.by_name_upper.setdefault(u, []).append(pos)
+            self.by_name_norm.setdefault(n, []).append(pos)
+
+        self._upper = _SubstringIndex(upper)
+        self._norm = _SubstringIndex(norm)
+
+    def rows_for_mods_number(self, num: int) -> List[int]:
+        return list(self.by_mods_num.get(int(num), []))
+
+    def rows_for_name(self, phrase: str) -> List[int]:
+        """
+        Name lookup cascade: exact raw -> exact normalized -> contains raw -> contains normalized.
+        """
+        phrase_u = phrase.upper()
+        phrase_n = normalize_name(phrase)
+
+        hits: Optional[List[int]] = self.by_name_upper.get(phrase_u)
+        if not hits and phrase_n:
+            hits = self.by_name_norm.get(phrase_n)
+        if not hits:
+            hits = self._upper.contains(phrase_u)
+        if not hits and phrase_n:
+            hits = self._norm.contains(phrase_n)
+        return list(hits or [])
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.models.schemas import OccurrenceInfo
+
+# (OccurrenceInfo field, MODS.csv column); optional fields are None when the cell is empty.
+_REQUIRED_STR = (("mods_id", "MODS"), ("english_name", "English Name"), ("major_commodity", "Major Commodity"))
+_OPTIONAL_STR = (
+    ("arabic_name", "Arabic Name"),
+    ("admin_region", "Admin Region"),
+    ("occurrence_type", "Occurrence Type"),
+    ("exploration_status", "Exploration Status"),
+    ("occurrence_importance", "Occurrence Importance"),
+)
+_DESCRIPTION_PARTS = (
+    ("Major Commodity", "Major Commodity"),
+    ("Type", "Occurrence Type"),
+    ("Status", "Exploration Status"),
+    ("Region", "Admin Region"),
+)
+
+
+def _optional_str(df: pd.DataFrame, col: str) -> List[Optional[str]]:
+    if col not in df.columns:
+        return [None] * len(df)
+    s = df[col]
+    return [str(v) if ok else None for v, ok in zip(s.tolist(), s.notna().tolist())]
+
+
+def _numeric(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col].astype(str).str.strip().replace("", np.nan), errors="coerce").to_numpy(dtype="float64")
+
+
+class OccurrenceStore:
+    """
+    Read-optimized, column-oriented copy of MODS.csv for turning retrieval hits into OccurrenceInfo.
+
+    Built once per MODS load (refreshed with the data generation after ingest): every field is converted and
+    every description string is composed up front, so hydrating k hits is a fancy-index per column plus
+    k model constructions, instead of k `df.iloc` lookups with a dozen pandas accesses each.
+    Rows are DataFrame positions (the `row` metadata of vector store documents).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.size = int(len(df))
+        cols: Dict[str, np.ndarray] = {}
+        for field, col in _REQUIRED_STR:
+            values = df[col].tolist() if col in df.columns else [""] * self.size
+            # str() per value, as the row-by-row code did (pandas 3 keeps NaN through astype(str)).
+            cols[field] = np.array([str(v) for v in values], dtype=object)
+        for field, col in _OPTIONAL_STR:
+            cols[field] = np.array(_optional_str(df, col), dtype=object)
+        self.cols = cols
+
+        lon = _numeric(df, "Longitude")
+        lat = _numeric(df, "Latitude")
+        self.longitude = np.where(np.isnan(lon), 0.0, lon)
+        self.latitude = np.where(np.isnan(lat), 0.0, lat)
+        self.elevation = _numeric(df, "Elevation")
+
+        parts = [[f"{label}: {v}" if v is not None else None for v in _optional_str(df, col)] for label, col in _DESCRIPTION_PARTS]
+        descriptions: List[Optional[str]] = []
+        for vals in zip(*parts):
+            present = [v for v in vals if v is not None]
+            descriptions.append("; ".join(present) if present else None)
+        self.description = np.array(descriptions, dtype=object)
+
+        self.row_by_mods_id: Dict[str, int] = {}
+        for pos, m in enumerate(cols["mods_id"].tolist()):
+            self.row_by_mods_id.setdefault(m, pos)
+
+    def hydrate(self, rows: Iterable[int]) -> List[OccurrenceInfo]:
+        """OccurrenceInfo for each valid row position, in the given order (out-of-range rows are skipped)."""
+        idx = np.fromiter((int(r) for r in rows), dtype="int64")
+        idx = idx[(idx >= 0) & (idx < self.size)]
+        if idx.size == 0:
+            return []
+        picked = {field: arr[idx].tolist() for field, arr in self.cols.items()}
+        lon = self.longitude[idx].tolist()
+        lat = self.latitude[idx].tolist()
+        elev = self.elevation[idx].tolist()
+        desc = self.description[idx].tolist()
+        out: List[OccurrenceInfo] = []
+        for i in range(idx.size):
+            out.append(
+                OccurrenceInfo(
+                    **{field: values[i] for field, values in picked.items()},
+                    longitude=lon[i],
+                    latitude=lat[i],
+                    elevation=None if elev[i] != elev[i] else elev[i],
+                    description=desc[i],
+                )
+            )
+        return out
+
+    def hydrate_mods_ids(self, mods_ids: Iterable[str]) -> List[OccurrenceInfo]:
+        rows = [self.row_by_mods_id[m] for m in mods_ids if m in self.row_by_mods_id]
+        return self.hydrate(rows)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+
+def chat_messages(prompt: str, system: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    A static `system` prefix (persona + instructions) is sent as its own message so every call starts with
+    the same tokens and Ollama can reuse its prompt (KV) cache for it; the per-call part goes in `prompt`.
+    """
+    msgs: List[Dict[str, str]] = []
+    if system:
+        msgs.append({"role": "system", "content": system})
+    msgs.append({"role": "user", "content": prompt})
+    return msgs
+
+
+class OllamaClient:
+    """
+    Minimal async client for Ollama's /api/chat.
+
+    One pooled httpx.AsyncClient is reused for every call (keep-alive connections to OLLAMA_BASE_URL),
+    and each request sends `keep_alive` (OLLAMA_KEEP_ALIVE, default 30m) so the model stays resident
+    between calls instead of being reloaded.
+
+    The client must be used from a single event loop (the LLM gateway loop); it is created lazily there.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        *,
+        temperature: Optional[float] = None,
+        keep_alive: Optional[str] = None,
+        max_connections: Optional[int] = None,
+    ):
+        self.base_url = (base_url or os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")).rstrip("/")
+        self.model = model or os.getenv("OLLAMA_MODEL", "llama3.1")
+        self.temperature = float(temperature if temperature is not None else os.getenv("OLLAMA_TEMPERATURE", "0"))
+        self.keep_alive = keep_alive or os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        self.max_connections = int(max_connections or os.getenv("OLLAMA_HTTP_POOL", "8"))
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                # No read timeout: the gateway deadline cancels the request instead.
+                timeout=httpx.Timeout(None, connect=float(os.getenv("OLLAMA_CONNECT_TIMEOUT_SEC", "5"))),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=300.0,
+                ),
+            )
+        return self._client
+
+    def _payload(self, messages: List[Dict[str, str]], stream: bool, **extra: Any) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {"temperature": self.temperature},
+        }
+        payload.update({k: v for k, v in extra.items() if v is not None})
+        return payload
+
+    async def chat(self, messages: List[Dict[str, str]], **extra: Any) -> str:
+        r = await self.client.post("/api/chat", json=self._payload(messages, False, **extra))
+        r.raise_for_status()
+        data = r.json()
+        if data.get("error"):
+            raise RuntimeError(data["error"])
+        return str((data.get("message") or {}).get("content") or "")
+
+    async def chat_stream(self, messages: List[Dict[str, str]], **extra: Any) -> AsyncIterator[str]:
+        async with self.client.stream("POST", "/api/chat", json=self._payload(messages, True, **extra)) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                text = (data.get("message") or {}).get("content")
+                if text:
+                    yield text
+                if data.get("done"):
+                    break
+
+    async def warm_up(self) -> bool:
+        """
+        Load the model into memory (a /api/generate request without a prompt) so the first user request
+        does not pay the model load. Best-effort: returns False if Ollama is unreachable.
+        """
+        try:
+            r = await self.client.post("/api/generate", json={"model": self.model, "keep_alive": self.keep_alive})
+            r.raise_for_status()
+            return True
+        except Exception:
+            return False
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
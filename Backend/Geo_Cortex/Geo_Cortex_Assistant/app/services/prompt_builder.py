@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.services.metrics import metrics
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", flags=re.UNICODE)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Approximate LLM token count without a tokenizer dependency: punctuation marks count as one token and
+    words as one token per 4 characters. Slightly over-counts typical BPE tokenizers, which is the safe side
+    for a budget.
+    """
+    return sum((len(t) + 3) // 4 for t in _TOKEN_RE.findall(text or ""))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    text = text or ""
+    if max_tokens <= 0:
+        return ""
+    n = count_tokens(text)
+    if n <= max_tokens:
+        return text
+    cut = int(len(text) * max_tokens / n)
+    while cut > 0 and count_tokens(text[:cut]) > max_tokens - 1:
+        cut = int(cut * 0.9)
+    return text[:cut].rstrip() + "…"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class PromptBudget:
+    """
+    Token budget for one LLM prompt.
+
+    The fixed parts (system prompt, instructions, user query) are counted first; what is left is split
+    between conversation history, RAG context and tool results.
+
+    Env: PROMPT_TOKEN_BUDGET=3000, PROMPT_HISTORY_SHARE=0.2, PROMPT_RAG_SHARE=0.45, PROMPT_TOOLS_SHARE=0.35
+    """
+
+    def __init__(self, total: Optional[int] = None):
+        self.total = int(total or _env_float("PROMPT_TOKEN_BUDGET", 3000))
+        self.shares = {
+            "history": _env_float("PROMPT_HISTORY_SHARE", 0.2),
+            "rag": _env_float("PROMPT_RAG_SHARE", 0.45),
+            "tools": _env_float("PROMPT_TOOLS_SHARE", 0.35),
+        }
+
+    def allocate(self, *fixed_parts: str) -> Dict[str, int]:
+        available = max(0, self.total - sum(count_tokens(p) for p in fixed_parts))
+        # A floor keeps each section readable even when the fixed parts alone use up the budget.
+        return {k: max(64, int(available * share)) for k, share in self.shares.items()}
+
+
+def fit_history(messages: Optional[Sequence[Any]], max_tokens: int, *, max_turns: int = 12, assistant_name: str = "Muhanned") -> str:
+    """
+    Most recent turns first until the budget is used; each turn is capped so one long answer cannot take it all.
+    Older turns are replaced by a one-line extract of the user's earlier questions.
+    """
+    if not messages:
+        return ""
+    msgs = list(messages)[-max_turns:]
+    per_turn = min(max_tokens, max(32, max_tokens // 3))
+    kept: List[str] = []
+    used = 0
+    cutoff = 0
+    for i in range(len(msgs) - 1, -1, -1):
+        m = msgs[i]
+        role = "User" if m.role == "user" else assistant_name
+        prefix = f"{role}: "
+        line = prefix + truncate_to_tokens(m.content, per_turn - count_tokens(prefix))
+        n = count_tokens(line)
+        if kept and used + n > max_tokens:
+            cutoff = i + 1
+            break
+        kept.append(line)
+        used += n
+    kept.reverse()
+    older = [m for m in msgs[:cutoff] if m.role == "user"]
+    if older and max_tokens - used >= 16:
+        topics = " | ".join(" ".join(m.content.split()[:8]) for m in older)
+        kept.insert(0, truncate_to_tokens(f"(Earlier, the user asked: {topics})", max_tokens - used))
+    return "\n".join(kept)
+
+
+def fit_rag_context(context: str, max_tokens: int) -> str:
+    """
+    RAG context is ranked best-first with blank lines between documents: keep whole documents in rank order
+    while they fit (the top document is truncated rather than dropped).
+    """
+    context = (context or "").strip()
+    if not context or count_tokens(context) <= max_tokens:
+        return context
+    docs = [d for d in re.split(r"\n\s*\n", context) if d.strip()]
+    # Room for the "(N ... omitted)" note, unless the budget is too small to spare it.
+    note_tokens = count_tokens(f"({len(docs)} lower-ranked documents omitted)")
+    budget = max_tokens - note_tokens if max_tokens >= 2 * note_tokens else max_tokens
+    kept: List[str] = []
+    used = 0
+    for d in docs:
+        n = count_tokens(d)
+        if used + n > budget:
+            if not kept:
+                kept.append(truncate_to_tokens(d, budget))
+            break
+        kept.append(d)
+        used += n
+    omitted = len(docs) - len(kept)
+    out = "\n\n".join(kept)
+    if omitted and budget < max_tokens:
+        out += f"\n\n({omitted} lower-ranked documents omitted)"
+    return out
+
+
+def compact_tool_results(scratchpad: str, max_tokens: int, *, keep_recent: int = 2) -> str:
+    """
+    Tool results accumulate as "- ..." entries. The latest `keep_recent` keep their detail (within the budget);
+    older ones shrink to their first line (e.g. "search_mods returned 25 rows" without the row preview),
+    and the oldest are dropped if that is still too long.
+    """
+    entries = [e.strip() for e in re.split(r"\n(?=- )", (scratchpad or "").strip()) if e.strip()]
+    if not entries or count_tokens(scratchpad) <= max_tokens:
+        return scratchpad
+    recent_cap = min(max_tokens, max(32, max_tokens // (2 * max(1, keep_recent))))
+    older_cap = 24
+    compacted: List[str] = []
+    for i, e in enumerate(entries):
+        if i >= len(entries) - keep_recent:
+            compacted.append(truncate_to_tokens(e, recent_cap))
+        else:
+            head = re.split(r"[;:\n]", e, maxsplit=1)[0]
+            compacted.append(truncate_to_tokens(head, older_cap))
+
+    def _size(dropped: int) -> int:
+        note = [f"- ({dropped} earlier tool results omitted)"] if dropped else []
+        return count_tokens("\n".join(note + compacted))
+
+    dropped = 0
+    while len(compacted) > 1 and _size(dropped) > max_tokens:
+        compacted.pop(0)
+        dropped += 1
+    if dropped and _size(dropped) <= max_tokens:
+        compacted.insert(0, f"- ({dropped} earlier tool results omitted)")
+    elif count_tokens(compacted[-1]) > max_tokens:
+        compacted[-1] = truncate_to_tokens(compacted[-1], max_tokens)
+    return "\n" + "\n".join(compacted) + "\n"
+
+
+def record_prompt_size(name: str, prompt: str, system: Optional[str] = None) -> int:
+    """Expose the size of the latest prompt per call site in /metrics (gauge prompt_tokens.<name>)."""
+    n = count_tokens(prompt) + count_tokens(system or "")
+    metrics.set_gauge(f"prompt_tokens.{name}", n)
+    return n
@@ -0,0 +1,261 @@
+"""
+Rule-based parser for plain filter questions, so `run_agent` can answer them with direct tool calls
+instead of RAG + the LLM tool loop.
+
+A query is parsed into one tool call from:
+- an intent verb: count / nearest / near (within a radius) / export / map / list;
+- filters from the gazetteer (commodity, region, exploration status, occurrence type);
+- numbers: coordinates ("24.7, 46.7", "lat 24.7 lon 46.7"), a radius ("50 km"), a result count ("top 10").
+
+It only answers when it is confident: exactly one intent, the intent's required arguments present, and nearly
+every word of the query explained by the parse (QUERY_PARSER_MIN_COVERAGE, default 0.75). Negations /
+exclusions ("not in", "outside", "except"), numbers the parse cannot apply (years, ids), several values of one
+filter ("quarries or deposits") and follow-ups about earlier results ("those", "them") always go to the LLM
+loop, as do analysis, comparisons and names. `GET /metrics` → `query_parser` reports the share of agent
+queries served by the parser.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.gazetteer import Gazetteer, normalize_text
+from app.services.metrics import metrics
+
+# Intent -> trigger phrases (normalized text; matched as whole words / phrases).
+_INTENT_PHRASES: Dict[str, Tuple[str, ...]] = {
+    "count": ("count", "how many", "number of", "total", "كم عدد", "عدد"),
+    "nearest": ("nearest", "closest", "الاقرب", "اقرب"),
+    "near": ("near", "around", "within", "close to", "بالقرب من", "حول", "ضمن"),
+    "export": ("export", "download", "csv", "geojson", "تصدير", "تحميل", "صدر", "حمل"),
+    "map": ("map", "plot", "on the map", "على الخريطه", "خريطه"),
+    "list": ("list", "show", "find", "search", "display", "give me", "get", "which", "where are", "what are",
+             "اعرض", "اظهر", "ابحث عن", "ابحث", "اين"),
+}
+
+# When several intents match, the more specific one wins (e.g. "show the nearest ..." is nearest).
+_PRIORITY = ("nearest", "near", "count", "export", "map", "list")
+
+# Words that carry no filter meaning (explained by any parse).
+_FILLER = set(
+    """
+    a an the of in at on for to from with and or by me us please all any are is there how what which where
+    can you i want need let see some every each do does that my our
+    occurrence occurrences site sites location locations point points record records mods result results
+    region regions province area areas km kilometers kilometer kms radius lat latitude lon lng longitude
+    coordinates coords top first n e north east as file data saudi arabia ksa
+    في من على عن الى الي مع و او كل جميع منطقه مناطق لي ما هي هل موقع مواقع نتائج كيلو متر كيلومتر
+    """.split()
+)
+
+# Negation / exclusion words: the parse would apply the filter positively, so these go to the LLM.
+_NEGATIONS = set(
+    """
+    not no non outside except excluding exclude without beyond
+    غير خارج ماعدا عدا باستثناء بدون ليس ليست
+    """.split()
+)
+# Words pointing back at earlier results ("how many of those ..."): the parse has no history, so these are
+# follow-ups for the LLM loop.
+_ANAPHORA = set(
+    """
+    those these them it its they their ones above previous same
+    هذه هذا تلك ذلك هؤلاء منها منهم
+    """.split()
+)
+_NEGATION_RE = re.compile(r"n't\b|n’t\b")
+
+_NUM = r"-?\d+(?:\.\d+)?"
+_LAT_LON_RE = re.compile(rf"\b(?:lat|latitude)\s*(?P<lat>{_NUM})\s*(?:lon|lng|longitude)\s*(?P<lon>{_NUM})")
+_PAIR_RE = re.compile(rf"(?P<a>{_NUM})\s*,\s*(?P<b>{_NUM})")
+_RADIUS_RE = re.compile(rf"(?P<r>{_NUM})\s*(?P<unit>km|kms|kilometers?|كم|كيلو(?:متر)?|m|meters?|متر)\b")
+_LIMIT_RE = re.compile(r"\b(?:top|first|nearest|closest|limit)\s+(?P<n>\d{1,4})\b|\b(?P<m>\d{1,4})\s+(?:nearest|closest|results|occurrences|sites|locations)\b")
+
+_ARG_KEYS = {
+    "commodity": "commodity",
+    "region": "region",
+    "exploration_status": "exploration_status",
+    "occurrence_type": "occurrence_type",
+}
+
+
+@dataclass
+class ParsedQuery:
+    intent: str
+    tool: str
+    args: Dict[str, Any]
+    coverage: float
+    entities: Dict[str, List[str]] = field(default_factory=dict)
+
+
+def min_coverage() -> float:
+    return float(os.getenv("QUERY_PARSER_MIN_COVERAGE", "0.75"))
+
+
+def _phrase_spans(text: str, phrase: str) -> List[Tuple[int, int]]:
+    # Offsets into `text` (the match includes the two padding spaces).
+    return [(m.start(), m.end() - 2) for m in re.finditer(re.escape(f" {phrase} "), f" {text} ")]
+
+
+def _coordinates(raw: str) -> Optional[Tuple[float, float, Tuple[int, int]]]:
+    """(lat, lon, span in the raw lowercased query)."""
+    m = _LAT_LON_RE.search(raw)
+    if m:
+        return float(m.group("lat")), float(m.group("lon")), m.span()
+    m = _PAIR_RE.search(raw)
+    if not m:
+        return None
+    a, b = float(m.group("a")), float(m.group("b"))
+    # Saudi Arabia spans lat ~16..33 and lon ~34..56: treat "lon, lat" pairs accordingly.
+    if abs(a) > 90 or (a > 34 and b < 34):
+        a, b = b, a
+    if abs(a) > 90 or abs(b) > 180:
+        return None
+    return a, b, m.span()
+
+
+def _radius_km(raw: str) -> Optional[Tuple[float, Tuple[int, int]]]:
+    m = _RADIUS_RE.search(raw)
+    if not m:
+        return None
+    r = float(m.group("r"))
+    unit = m.group("unit")
+    if unit in ("m", "meter", "meters", "متر"):
+        r /= 1000.0
+    return (r, m.span()) if r > 0 else None
+
+
+def parse_query(query: str, gazetteer: Gazetteer) -> Optional[ParsedQuery]:
+    """One tool call for a plain filter question, or None when the query needs the LLM."""
+    raw = (query or "").lower()
+    # Numbers first (normalization would split "24.7" into two words).
+    coords = _coordinates(raw)
+    radius = _radius_km(raw)
+    limit_m = _LIMIT_RE.search(raw)
+    masked = raw
+    limit_group = ("n" if limit_m.group("n") else "m") if limit_m else None
+    spans = [coords[2] if coords else None, radius[1] if radius else None, limit_m.span(limit_group) if limit_m else None]
+    for span in [s for s in spans if s]:
+        masked = masked[: span[0]] + " " * (span[1] - span[0]) + masked[span[1]:]
+    limit = int(limit_m.group(limit_group)) if limit_m else None
+
+    text = normalize_text(masked)
+    if not text:
+        return None
+    if _NEGATION_RE.search(raw) or _NEGATIONS.intersection(text.split()):
+        return None  # "gold not in riyadh" must not become a riyadh filter
+    if _ANAPHORA.intersection(text.split()):
+        return None  # a follow-up about earlier results, not a filter question
+    if any(any(ch.isdigit() for ch in w) for w in text.split()):
+        return None  # a number the parse cannot apply (a year, an id, ...) is a constraint it would drop
+    covered = [False] * len(text)
+
+    def cover(start: int, end: int) -> None:
+        for i in range(start, end):
+            covered[i] = True
+
+    matches = gazetteer.matches(text)
+    for m in matches:
+        cover(m.start, m.end)
+    entities: Dict[str, List[str]] = {}
+    for m in matches:
+        values = entities.setdefault(m.kind, [])
+        if m.value not in values:
+            values.append(m.value)
+
+    intents: List[str] = []
+    for intent, phrases in _INTENT_PHRASES.items():
+        for phrase in phrases:
+            spans = _phrase_spans(text, phrase)
+            if spans:
+                if intent not in intents:
+                    intents.append(intent)
+                for s, e in spans:
+                    cover(s, e)
+    words = [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+    for s, e in words:
+        if text[s:e] in _FILLER:
+            cover(s, e)
+    explained = sum(1 for s, e in words if all(covered[s:e]))
+    coverage = explained / max(1, len(words))
+
+    intent = next((i for i in _PRIORITY if i in intents), None)
+    if intent is None or coverage < min_coverage():
+        return None
+    # More than one primary action ("count ... and export ...") is a workflow, not a filter question.
+    if len({i for i in intents if i in ("count", "export", "nearest")}) > 1:
+        return None
+
+    filters = {key: ", ".join(entities[kind]) if kind == "region" else entities[kind][0]
+               for kind, key in _ARG_KEYS.items() if entities.get(kind)}
+    if any(len(values) > 1 for kind, values in entities.items() if kind != "region"):
+        return None  # the tools filter by one commodity / status / type / importance level
+    if entities.get("importance") and intent != "count":
+        return None  # only the count answer can narrow to an importance level
+    args: Dict[str, Any] = dict(filters)
+
+    if intent in ("nearest", "near") and (set(filters) - {"commodity"}):
+        return None  # the point tools only filter by commodity
+    if intent == "nearest":
+        if not coords:
+            return None
+        args = {"lat": coords[0], "lon": coords[1], "limit": limit or 10}
+        if "commodity" in filters:
+            args["commodity"] = filters["commodity"]
+        tool = "nearest_mods"
+    elif intent == "near":
+        if not coords or not radius:
+            return None
+        args = {"lat": coords[0], "lon": coords[1], "radius_km": radius[0], "limit": limit or 50}
+        if "commodity" in filters:
+            args["commodity"] = filters["commodity"]
+        tool = "nearby_mods"
+    elif not filters or coords:
+        return None  # no filter: "count everything" / "export all" is rarely what was meant
+    elif intent == "count":
+        tool = "importance_breakdown"
+    elif intent == "export":
+        tool = "csv_export" if "csv" in text.split() else "geojson_export"
+        args["limit"] = limit or (5000 if tool == "csv_export" else 400)
+    elif intent == "map":
+        tool = "geojson_export"
+        args["limit"] = limit or 400
+    else:
+        tool = "search_mods"
+        args["limit"] = limit or 25
+    return ParsedQuery(intent=intent, tool=tool, args=args, coverage=round(coverage, 3), entities=entities)
+
+
+class QueryParserStats:
+    """How many agent queries the parser served (vs. handed to the LLM loop)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.total = 0
+        self.served = 0
+        self.by_intent: Dict[str, int] = {}
+
+    def record(self, intent: Optional[str]) -> None:
+        """One agent query; `intent` is what served it deterministically, None when it went to the LLM."""
+        with self._lock:
+            self.total += 1
+            if intent is not None:
+                self.served += 1
+                self.by_intent[intent] = self.by_intent.get(intent, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queries": self.total,
+                "served": self.served,
+                "served_pct": round(100.0 * self.served / self.total, 1) if self.total else 0.0,
+                "by_intent": dict(self.by_intent),
+                "min_coverage": min_coverage(),
+            }
+
+
+parser_stats = QueryParserStats()
+metrics.register("query_parser", parser_stats.stats)
@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 import io
+import math
 import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 RASTERS_DIR = BASE_DIR / "data" / "rasters"
 RASTERS_DIR.mkdir(parents=True, exist_ok=True)
+EXPORTS_DIR = BASE_DIR / "data" / "exports"
+EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
 
 
 def rasterio_available() -> bool:
@@ -20,6 +26,16 @@ def rasterio_available() -> bool:
         return False
 
 
+def find_raster_path(raster_id: str) -> Optional[Path]:
+    """
+    Resolve the raster file stored for an upload id (first file in its folder).
+    Sub-folders (e.g. derived outputs) are ignored.
+    """
+    d = RASTERS_DIR / raster_id
+    files = [p for p in d.iterdir() if p.is_file()] if d.exists() else []
+    return files[0] if files else None
+
+
 def save_raster_bytes(raster_id: str, filename: str, data: bytes) -> Path:
     safe_name = os.path.basename(filename or "raster.tif")
     out_dir = RASTERS_DIR / raster_id
@@ -92,6 +108,23 @@ def render_tile_png(path: Path, z: int, x: int, y: int, band: int = 1) -> bytes:
     Render a 256x256 PNG XYZ tile from a raster.
     Output CRS is EPSG:3857 tile space.
     """
+    try:
+        import rasterio
+    except Exception as e:
+        raise RuntimeError(
+            "Raster tile rendering requires optional dependencies. Install with: pip install -r requirements-raster.txt "
+            "(on Windows, Conda is often easiest)."
+        ) from e
+
+    with rasterio.open(path) as ds:
+        return render_tile_png_from_dataset(ds, z=z, x=x, y=y, band=band)
+
+
+def render_tile_png_from_dataset(ds: Any, z: int, x: int, y: int, band: int = 1) -> bytes:
+    """
+    Same as render_tile_png, but for an already-open rasterio dataset.
+    Lets batch renderers (tile exports) keep one handle per worker instead of reopening per tile.
+    """
     try:
         import numpy as np
         import rasterio
@@ -108,49 +141,635 @@ def render_tile_png(path: Path, z: int, x: int, y: int, band: int = 1) -> bytes:
     minx, miny, maxx, maxy = _tile_bounds_3857(int(z), int(x), int(y))
     dst_transform = from_bounds(minx, miny, maxx, maxy, tile_size, tile_size)
 
-    with rasterio.open(path) as ds:
-        if ds.count >= 3:
-            out = np.zeros((3, tile_size, tile_size), dtype=np.uint8)
-            for i in range(3):
-                reproject(
-                    source=rasterio.band(ds, i + 1),
-                    destination=out[i],
-                    src_transform=ds.transform,
-                    src_crs=ds.crs,
-                    dst_transform=dst_transform,
-                    dst_crs="EPSG:3857",
-                    resampling=Resampling.bilinear,
-                )
-            img = Image.fromarray(np.transpose(out, (1, 2, 0)), mode="RGB")
-            buf = io.BytesIO()
-            img.save(buf, format="PNG")
-            return buf.getvalue()
-
-        # Single-band render as grayscale
-        dest = np.zeros((tile_size, tile_size), dtype=np.float32)
-        reproject(
-            source=rasterio.band(ds, band),
-            destination=dest,
-            src_transform=ds.transform,
-            src_crs=ds.crs,
-            dst_transform=dst_transform,
-            dst_crs="EPSG:3857",
-            resampling=Resampling.bilinear,
-        )
-        # Normalize to 0..255
-        finite = dest[np.isfinite(dest)]
-        if finite.size == 0:
-            arr8 = np.zeros((tile_size, tile_size), dtype=np.uint8)
-        else:
-            vmin = float(np.percentile(finite, 2))
-            vmax = float(np.percentile(finite, 98))
-            if vmax <= vmin:
-                vmax = vmin + 1.0
-            scaled = (dest - vmin) / (vmax - vmin)
-            scaled = np.clip(scaled, 0.0, 1.0)
-            arr8 = (scaled * 255.0).astype(np.uint8)
-        img = Image.fromarray(arr8, mode="L")
+    if ds.count >= 3:
+        out = np.zeros((3, tile_size, tile_size), dtype=np.uint8)
+        for i in range(3):
+            reproject(
+                source=rasterio.band(ds, i + 1),
+                destination=out[i],
+                src_transform=ds.transform,
+                src_crs=ds.crs,
+                dst_transform=dst_transform,
+                dst_crs="EPSG:3857",
+                resampling=Resampling.bilinear,
+            )
+        img = Image.fromarray(np.transpose(out, (1, 2, 0)), mode="RGB")
         buf = io.BytesIO()
         img.save(buf, format="PNG")
         return buf.getvalue()
 
+    # Single-band render as grayscale
+    dest = np.zeros((tile_size, tile_size), dtype=np.float32)
+    reproject(
+        source=rasterio.band(ds, band),
+        destination=dest,
+        src_transform=ds.transform,
+        src_crs=ds.crs,
+        dst_transform=dst_transform,
+        dst_crs="EPSG:3857",
+        resampling=Resampling.bilinear,
+    )
+    # Normalize to 0..255
+    finite = dest[np.isfinite(dest)]
+    if finite.size == 0:
+        arr8 = np.zeros((tile_size, tile_size), dtype=np.uint8)
+    else:
+        vmin = float(np.percentile(finite, 2))
+        vmax = float(np.percentile(finite, 98))
+        if vmax <= vmin:
+            vmax = vmin + 1.0
+        scaled = (dest - vmin) / (vmax - vmin)
+        scaled = np.clip(scaled, 0.0, 1.0)
+        arr8 = (scaled * 255.0).astype(np.uint8)
+    img = Image.fromarray(arr8, mode="L")
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def raster_bounds_4326(path: Path) -> Tuple[float, float, float, float]:
+    """
+    Raster footprint as (min_lon, min_lat, max_lon, max_lat).
+    """
+    try:
+        import rasterio
+        from rasterio.warp import transform_bounds
+    except Exception as e:
+        raise RuntimeError(
+            "Raster support requires optional dependencies. Install with: pip install -r requirements-raster.txt "
+            "(on Windows, Conda is often easiest)."
+        ) from e
+
+    with rasterio.open(path) as ds:
+        b = ds.bounds
+        if ds.crs and str(ds.crs).upper() not in ("EPSG:4326", "WGS84"):
+            return tuple(transform_bounds(ds.crs, "EPSG:4326", b.left, b.bottom, b.right, b.top, densify_pts=21))  # type: ignore[return-value]
+        return b.left, b.bottom, b.right, b.top
+
+
+_MAX_MERCATOR_LAT = 85.0511287798066
+
+
+def _lonlat_to_tile(lon: float, lat: float, z: int) -> Tuple[int, int]:
+    n = 2 ** int(z)
+    lat = max(-_MAX_MERCATOR_LAT, min(_MAX_MERCATOR_LAT, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_r = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_r)) / math.pi) / 2.0 * n)
+    return max(0, min(n - 1, x)), max(0, min(n - 1, y))
+
+
+def tile_ranges_for_bbox(
+    bbox: Tuple[float, float, float, float], min_zoom: int, max_zoom: int
+) -> List[Tuple[int, int, int, int, int]]:
+    """
+    XYZ tile ranges covering a lon/lat bbox: [(z, min_x, min_y, max_x, max_y), ...] (inclusive).
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    out: List[Tuple[int, int, int, int, int]] = []
+    for z in range(int(min_zoom), int(max_zoom) + 1):
+        x0, y0 = _lonlat_to_tile(min_lon, max_lat, z)
+        x1, y1 = _lonlat_to_tile(max_lon, min_lat, z)
+        out.append((z, x0, y0, x1, y1))
+    return out
+
+
+def count_tiles(ranges: List[Tuple[int, int, int, int, int]]) -> int:
+    return sum((x1 - x0 + 1) * (y1 - y0 + 1) for _z, x0, y0, x1, y1 in ranges)
+
+
+def _iter_tiles(ranges: List[Tuple[int, int, int, int, int]]) -> Iterator[Tuple[int, int, int]]:
+    for z, x0, y0, x1, y1 in ranges:
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+class _MBTilesWriter:
+    """
+    Minimal MBTiles 1.3 writer (SQLite; TMS row order).
+    """
+
+    def __init__(self, out_path: Path) -> None:
+        self.conn = sqlite3.connect(str(out_path))
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+        self.conn.execute(
+            "CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)"
+        )
+        self.conn.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+
+    def write_tile(self, z: int, x: int, y: int, data: bytes) -> None:
+        tms_y = (2 ** z - 1) - y
+        self.conn.execute("INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)", (z, x, tms_y, sqlite3.Binary(data)))
+
+    def finalize(self, meta: Dict[str, Any]) -> None:
+        b = meta["bounds"]
+        rows = {
+            "name": meta["name"],
+            "format": "png",
+            "type": "overlay",
+            "version": "1.0",
+            "minzoom": str(meta["min_zoom"]),
+            "maxzoom": str(meta["max_zoom"]),
+            "bounds": ",".join(f"{v:.6f}" for v in b),
+            "center": f"{(b[0] + b[2]) / 2:.6f},{(b[1] + b[3]) / 2:.6f},{meta['min_zoom']}",
+        }
+        self.conn.executemany("INSERT INTO metadata VALUES (?, ?)", list(rows.items()))
+        self.conn.commit()
+        self.conn.close()
+
+    def abort(self) -> None:
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class _PMTilesWriter:
+    """
+    PMTiles v3 writer (thin wrapper over the optional `pmtiles` package).
+    """
+
+    def __init__(self, out_path: Path) -> None:
+        try:
+            from pmtiles.tile import zxy_to_tileid
+            from pmtiles.writer import Writer
+        except Exception as e:
+            raise RuntimeError(
+                "PMTiles export requires the optional `pmtiles` package. Install with: pip install -r requirements-raster.txt"
+            ) from e
+        self._zxy_to_tileid = zxy_to_tileid
+        self.f = open(out_path, "wb")
+        self.writer = Writer(self.f)
+
+    def write_tile(self, z: int, x: int, y: int, data: bytes) -> None:
+        self.writer.write_tile(self._zxy_to_tileid(z, x, y), data)
+
+    def finalize(self, meta: Dict[str, Any]) -> None:
+        from pmtiles.tile import Compression, TileType
+
+        b = meta["bounds"]
+        header = {
+            "tile_type": TileType.PNG,
+            "tile_compression": Compression.NONE,
+            "min_zoom": int(meta["min_zoom"]),
+            "max_zoom": int(meta["max_zoom"]),
+            "min_lon_e7": int(b[0] * 10_000_000),
+            "min_lat_e7": int(b[1] * 10_000_000),
+            "max_lon_e7": int(b[2] * 10_000_000),
+            "max_lat_e7": int(b[3] * 10_000_000),
+            "center_zoom": int(meta["min_zoom"]),
+            "center_lon_e7": int((b[0] + b[2]) / 2 * 10_000_000),
+            "center_lat_e7": int((b[1] + b[3]) / 2 * 10_000_000),
+        }
+        self.writer.finalize(header, {"name": meta["name"], "format": "png", "type": "overlay"})
+        self.f.close()
+
+    def abort(self) -> None:
+        try:
+            self.f.close()
+        except Exception:
+            pass
+
+
+def export_tile_archive(
+    path: Path,
+    out_path: Path,
+    *,
+    bbox: Tuple[float, float, float, float],
+    min_zoom: int,
+    max_zoom: int,
+    band: int = 1,
+    fmt: str = "mbtiles",
+    workers: int = 4,
+    progress_cb: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Pre-render every XYZ tile of a raster for bbox x zoom range into a single MBTiles/PMTiles archive.
+
+    Tiles are rendered in a thread pool (GDAL releases the GIL while warping); each worker keeps its own
+    dataset handle. The archive is written from the calling thread only, so the writers need no locking.
+    progress_cb(done, total) is called as tiles complete.
+    """
+    try:
+        import rasterio
+    except Exception as e:
+        raise RuntimeError(
+            "Raster tile rendering requires optional dependencies. Install with: pip install -r requirements-raster.txt "
+            "(on Windows, Conda is often easiest)."
+        ) from e
+
+    ranges = tile_ranges_for_bbox(bbox, min_zoom, max_zoom)
+    total = count_tiles(ranges)
+    if total <= 0:
+        raise ValueError("No tiles to render for the requested bbox/zoom range.")
+
+    fmt = (fmt or "mbtiles").lower()
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(out_path.name + ".part")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    if fmt == "mbtiles":
+        writer: Any = _MBTilesWriter(tmp_path)
+    elif fmt == "pmtiles":
+        writer = _PMTilesWriter(tmp_path)
+    else:
+        raise ValueError(f"Unsupported tile archive format: {fmt}")
+
+    local = threading.local()
+    opened: List[Any] = []
+    opened_lock = threading.Lock()
+
+    def _render(z: int, x: int, y: int) -> Tuple[int, int, int, bytes]:
+        ds = getattr(local, "ds", None)
+        if ds is None:
+            ds = rasterio.open(path)
+            local.ds = ds
+            with opened_lock:
+                opened.append(ds)
+        return z, x, y, render_tile_png_from_dataset(ds, z=z, x=x, y=y, band=band)
+
+    workers = max(1, int(workers))
+    max_in_flight = workers * 4
+    done = 0
+    total_bytes = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            tiles = _iter_tiles(ranges)
+            pending = set()
+            exhausted = False
+            while pending or not exhausted:
+                # Keep a bounded window of submitted tiles so huge exports don't queue everything at once.
+                while not exhausted and len(pending) < max_in_flight:
+                    nxt = next(tiles, None)
+                    if nxt is None:
+                        exhausted = True
+                        break
+                    pending.add(ex.submit(_render, *nxt))
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    z, x, y, png = fut.result()
+                    writer.write_tile(z, x, y, png)
+                    total_bytes += len(png)
+                    done += 1
+                if progress_cb is not None:
+                    progress_cb(done, total)
+        writer.finalize({"name": path.name, "bounds": bbox, "min_zoom": min_zoom, "max_zoom": max_zoom})
+    except Exception:
+        writer.abort()
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+    finally:
+        for ds in opened:
+            try:
+                ds.close()
+            except Exception:
+                pass
+
+    os.replace(tmp_path, out_path)
+    return {
+        "format": fmt,
+        "tiles": done,
+        "bytes": out_path.stat().st_size,
+        "tile_bytes": total_bytes,
+        "bbox": list(bbox),
+        "min_zoom": int(min_zoom),
+        "max_zoom": int(max_zoom),
+        "band": int(band),
+    }
+
+
+def _geometry_to_raster_crs(ds: Any, geometry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Geometry input is EPSG:4326 GeoJSON; reproject to the raster CRS when needed.
+    """
+    if ds.crs and str(ds.crs).upper() not in ("EPSG:4326", "WGS84"):
+        from rasterio.warp import transform_geom
+
+        return transform_geom("EPSG:4326", ds.crs, geometry, precision=6)
+    return geometry
+
+
+def clip_raster_to_geotiff(
+    path: Path,
+    geometry: Dict[str, Any],
+    out_path: Path,
+    *,
+    bands: Optional[List[int]] = None,
+    resolution: Optional[float] = None,
+    resampling: str = "nearest",
+    compress: str = "deflate",
+    mask: bool = True,
+    max_pixels: int = 200_000_000,
+    strip_rows: int = 512,
+) -> Dict[str, Any]:
+    """
+    Write the part of a raster that intersects an AOI (EPSG:4326 GeoJSON geometry) as a tiled, compressed GeoTIFF.
+
+    Only the window covering the AOI is read, and it is processed in strips of output rows, so memory stays
+    bounded by strip size regardless of raster or AOI size. `resolution` (raster CRS units per pixel) optionally
+    resamples the output; pixels outside the AOI are set to nodata when `mask` is true.
+    """
+    try:
+        import numpy as np
+        import rasterio
+        from rasterio.enums import Resampling
+        from rasterio.features import geometry_mask, geometry_window
+        from rasterio.transform import Affine
+        from rasterio.windows import Window, WindowError
+    except Exception as e:
+        raise RuntimeError(
+            "Raster support requires optional dependencies. Install with: pip install -r requirements-raster.txt "
+            "(on Windows, Conda is often easiest)."
+        ) from e
+
+    try:
+        resampling_enum = Resampling[resampling]
+    except KeyError:
+        raise ValueError(f"Unsupported resampling: {resampling}")
+
+    with rasterio.open(path) as ds:
+        geom = _geometry_to_raster_crs(ds, geometry)
+        idx = [int(b) for b in (bands or list(range(1, ds.count + 1)))]
+        for b in idx:
+            if b < 1 or b > ds.count:
+                raise ValueError(f"Invalid band={b}. Raster has {ds.count} band(s).")
+        try:
+            win = geometry_window(ds, [geom])
+        except WindowError:
+            raise ValueError("AOI does not intersect the raster")
+        win = win.intersection(Window(0, 0, ds.width, ds.height))
+        if win.width <= 0 or win.height <= 0:
+            raise ValueError("AOI does not intersect the raster")
+
+        src_transform = ds.window_transform(win)
+        if resolution:
+            out_w = max(1, int(math.ceil(win.width * abs(ds.res[0]) / float(resolution))))
+            out_h = max(1, int(math.ceil(win.height * abs(ds.res[1]) / float(resolution))))
+        else:
+            out_w, out_h = int(win.width), int(win.height)
+        if out_w * out_h * len(idx) > max_pixels:
+            raise ValueError(
+                f"Clip output would be {out_w}x{out_h}x{len(idx)} pixels (max {max_pixels}). "
+                "Use a smaller AOI or a coarser resolution."
+            )
+        sx = win.width / out_w
+        sy = win.height / out_h
+        out_transform = src_transform * Affine.scale(sx, sy)
+
+        dtype = ds.dtypes[idx[0] - 1]
+        nodata = ds.nodata
+        if nodata is None and mask:
+            nodata = float("nan") if np.issubdtype(np.dtype(dtype), np.floating) else 0
+
+        profile: Dict[str, Any] = {
+            "driver": "GTiff",
+            "width": out_w,
+            "height": out_h,
+            "count": len(idx),
+            "dtype": dtype,
+            "crs": ds.crs,
+            "transform": out_transform,
+            "nodata": nodata,
+            "tiled": True,
+            "blockxsize": 256,
+            "blockysize": 256,
+            "BIGTIFF": "IF_SAFER",
+        }
+        if compress and compress.lower() != "none":
+            profile["compress"] = compress.lower()
+
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with rasterio.open(out_path, "w", **profile) as dst:
+            for r0 in range(0, out_h, strip_rows):
+                rows = min(strip_rows, out_h - r0)
+                src_win = Window(win.col_off, win.row_off + r0 * sy, win.width, rows * sy)
+                arr = ds.read(idx, window=src_win, out_shape=(len(idx), rows, out_w), resampling=resampling_enum)
+                if mask:
+                    strip_transform = out_transform * Affine.translation(0, r0)
+                    outside = geometry_mask([geom], out_shape=(rows, out_w), transform=strip_transform)
+                    arr[:, outside] = nodata
+                dst.write(arr, window=Window(0, r0, out_w, rows))
+
+    return {
+        "width": out_w,
+        "height": out_h,
+        "bands": idx,
+        "bytes": out_path.stat().st_size,
+        "source_window": [int(win.col_off), int(win.row_off), int(win.width), int(win.height)],
+    }
+
+
+def sample_raster_points(
+    path: Path,
+    lons: List[float],
+    lats: List[float],
+    band: int = 1,
+    *,
+    block_size: int = 512,
+    progress_cb: Optional[Callable[[int, int], None]] = None,
+) -> List[Optional[float]]:
+    """
+    Sample one band at many EPSG:4326 points in a single pass.
+
+    Points are converted to pixel indexes with one vectorized transform, grouped by raster block, and each block
+    is read once; values are gathered with numpy fancy indexing. Points outside the raster or on nodata yield None.
+    """
+    try:
+        import numpy as np
+        import rasterio
+        from rasterio.warp import transform as warp_transform
+        from rasterio.windows import Window
+    except Exception as e:
+        raise RuntimeError(
+            "Raster support requires optional dependencies. Install with: pip install -r requirements-raster.txt "
+            "(on Windows, Conda is often easiest)."
+        ) from e
+
+    n = len(lons)
+    out: List[Optional[float]] = [None] * n
+    if n == 0:
+        return out
+
+    with rasterio.open(path) as ds:
+        if band < 1 or band > ds.count:
+            raise ValueError(f"Invalid band={band}. Raster has {ds.count} band(s).")
+        xs = np.asarray(lons, dtype="float64")
+        ys = np.asarray(lats, dtype="float64")
+        if ds.crs and str(ds.crs).upper() not in ("EPSG:4326", "WGS84"):
+            tx, ty = warp_transform("EPSG:4326", ds.crs, xs.tolist(), ys.tolist())
+            xs = np.asarray(tx, dtype="float64")
+            ys = np.asarray(ty, dtype="float64")
+
+        inv = ~ds.transform
+        cols_f = inv.a * xs + inv.b * ys + inv.c
+        rows_f = inv.d * xs + inv.e * ys + inv.f
+        ok = np.isfinite(cols_f) & np.isfinite(rows_f)
+        cols = np.floor(np.where(ok, cols_f, -1)).astype("int64")
+        rows = np.floor(np.where(ok, rows_f, -1)).astype("int64")
+        ok &= (cols >= 0) & (cols < ds.width) & (rows >= 0) & (rows < ds.height)
+
+        idx = np.nonzero(ok)[0]
+        if idx.size == 0:
+            return out
+        block_keys = (rows[idx] // block_size) * ((ds.width // block_size) + 1) + (cols[idx] // block_size)
+        order = np.argsort(block_keys, kind="stable")
+        idx = idx[order]
+        block_keys = block_keys[order]
+        splits = np.nonzero(np.diff(block_keys))[0] + 1
+
+        nodata = ds.nodata
+        done = 0
+        for group in np.split(idx, splits):
+            r = rows[group]
+            c = cols[group]
+            r0 = int(r.min()) // block_size * block_size
+            c0 = int(c.min()) // block_size * block_size
+            win = Window(c0, r0, min(block_size, ds.width - c0), min(block_size, ds.height - r0))
+            arr = ds.read(band, window=win)
+            vals = arr[r - r0, c - c0].astype("float64")
+            valid = np.isfinite(vals)
+            if nodata is not None:
+                valid &= vals != float(nodata)
+            for i, v, good in zip(group.tolist(), vals.tolist(), valid.tolist()):
+                if good:
+                    out[i] = v
+            done += len(group)
+            if progress_cb:
+                progress_cb(done, int(idx.size))
+
+    return out
+
+
+_EARTH_RADIUS_M = 6371008.8
+
+
+def line_coords_from_geojson(obj: Dict[str, Any]) -> List[Tuple[float, float]]:
+    """
+    Extract the vertices of the first LineString in a GeoJSON geometry / Feature / FeatureCollection.
+    MultiLineStrings are chained part after part.
+    """
+    t = obj.get("type") if isinstance(obj, dict) else None
+    if t == "FeatureCollection":
+        for f in obj.get("features") or []:
+            try:
+                return line_coords_from_geojson(f)
+            except ValueError:
+                continue
+        raise ValueError("FeatureCollection has no LineString feature")
+    if t == "Feature":
+        return line_coords_from_geojson(obj.get("geometry") or {})
+    if t == "LineString":
+        coords = obj.get("coordinates") or []
+    elif t == "MultiLineString":
+        coords = [c for part in (obj.get("coordinates") or []) for c in part]
+    else:
+        raise ValueError("geometry must be a GeoJSON LineString (or a Feature/FeatureCollection containing one)")
+    pts = [(float(c[0]), float(c[1])) for c in coords]
+    if len(pts) < 2:
+        raise ValueError("LineString needs at least 2 coordinates")
+    return pts
+
+
+def densify_line_4326(
+    coords: List[Tuple[float, float]],
+    spacing_m: float,
+) -> Tuple[List[float], List[float], List[float]]:
+    """
+    Densify an EPSG:4326 polyline to points every `spacing_m` meters (haversine distance along the line).
+    Returns (lons, lats, distance_m); vertices are always kept so the profile never cuts corners.
+    """
+    import numpy as np
+
+    xy = np.asarray(coords, dtype="float64")
+    lon = np.radians(xy[:, 0])
+    lat = np.radians(xy[:, 1])
+    dlat = lat[1:] - lat[:-1]
+    dlon = lon[1:] - lon[:-1]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    seg_len = 2 * _EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    seg_start = np.concatenate([[0.0], np.cumsum(seg_len)[:-1]])
+
+    lons: List[np.ndarray] = []
+    lats: List[np.ndarray] = []
+    dist: List[np.ndarray] = []
+    for i, length in enumerate(seg_len):
+        n = max(1, int(math.ceil(length / spacing_m)))
+        t = np.arange(n, dtype="float64") / n
+        lons.append(xy[i, 0] + (xy[i + 1, 0] - xy[i, 0]) * t)
+        lats.append(xy[i, 1] + (xy[i + 1, 1] - xy[i, 1]) * t)
+        dist.append(seg_start[i] + length * t)
+    lons.append(xy[-1:, 0])
+    lats.append(xy[-1:, 1])
+    dist.append(np.asarray([float(seg_start[-1] + seg_len[-1])]))
+    return (
+        np.concatenate(lons).tolist(),
+        np.concatenate(lats).tolist(),
+        np.concatenate(dist).tolist(),
+    )
+
+
+def line_length_m(coords: List[Tuple[float, float]]) -> float:
+    _, _, dist = densify_line_4326(coords, spacing_m=float("inf"))
+    return float(dist[-1])
+
+
+def build_profile_chart(distance_m: List[float], values: List[Optional[float]], band: int = 1) -> Dict[str, Any]:
+    """
+    Vega-Lite line chart for a raster profile (same chart shape as the agent's workflow charts).
+    """
+    data = [{"distance_m": round(d, 2), "value": v} for d, v in zip(distance_m, values) if v is not None]
+    return {
+        "name": "raster_profile",
+        "title": f"Raster profile (band {band})",
+        "data": data,
+        "vega_lite": {
+            "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+            "description": "Raster values along a transect (line chart).",
+            "data": {"name": "data"},
+            "mark": {"type": "line", "tooltip": True},
+            "encoding": {
+                "x": {"field": "distance_m", "type": "quantitative", "title": "Distance (m)"},
+                "y": {"field": "value", "type": "quantitative", "title": f"Band {band} value", "scale": {"zero": False}},
+                "tooltip": [{"field": "distance_m"}, {"field": "value"}],
+            },
+        },
+    }
+
+
+def compute_zonal_stats(path: Path, geometry: Dict[str, Any], band: int = 1) -> Dict[str, Any]:
+    """
+    Zonal statistics (count/min/max/mean/std) of one band inside an EPSG:4326 GeoJSON geometry.
+    Only the band requested and the window covering the geometry are read.
+    """
+    try:
+        import numpy as np
+        import rasterio
+        from rasterio.mask import mask
+    except Exception as e:
+        raise RuntimeError(
+            "Zonal stats require raster dependencies. Install with: pip install -r requirements-raster.txt "
+            "(on Windows, Conda is often easiest)."
+        ) from e
+
+    with rasterio.open(path) as ds:
+        if band < 1 or band > ds.count:
+            raise ValueError(f"Invalid band={band}. Raster has {ds.count} band(s).")
+        geom = _geometry_to_raster_crs(ds, geometry)
+        out, _ = mask(ds, [geom], crop=True, filled=False, indexes=band)
+
+    valid = np.asarray(out)[~np.ma.getmaskarray(out)]
+    if valid.size == 0:
+        return {"count": 0, "min": None, "max": None, "mean": None, "std": None}
+    return {
+        "count": int(valid.size),
+        "min": float(np.min(valid)),
+        "max": float(np.max(valid)),
+        "mean": float(np.mean(valid)),
+        "std": float(np.std(valid)),
+    }
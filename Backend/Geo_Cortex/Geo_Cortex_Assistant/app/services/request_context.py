@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
 from contextvars import ContextVar
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
 
 
 request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
@@ -9,6 +12,33 @@ uploaded_geometry_var: ContextVar[Optional[Dict[str, Any]]] = ContextVar("upload
 uploaded_feature_collection_var: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
     "uploaded_feature_collection", default=None
 )
+llm_cache_enabled_var: ContextVar[bool] = ContextVar("llm_cache_enabled", default=True)
+# Set by streaming (SSE) endpoints: sink(event, data) receives tokens / tool steps / artifacts as they happen.
+event_sink_var: ContextVar[Optional[Callable[[str, Any], None]]] = ContextVar("event_sink", default=None)
+
+
+class RequestMemo:
+    """
+    Results of expensive pure calls (e.g. RAG retrieval) computed once per request.
+    Entries are Futures, so a call that is still running (e.g. started in the background) is joined, not repeated.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Future] = {}
+
+    def claim(self, key: Hashable) -> Tuple[Future, bool]:
+        """(future, owner): the owner must fill the future; everyone else waits on it."""
+        with self._lock:
+            fut = self._entries.get(key)
+            if fut is not None:
+                return fut, False
+            fut = Future()
+            self._entries[key] = fut
+            return fut, True
+
+
+request_memo_var: ContextVar[Optional[RequestMemo]] = ContextVar("request_memo", default=None)
 
 
 def set_request_id(request_id: Optional[str]) -> None:
@@ -34,3 +64,49 @@ def set_uploaded_feature_collection(feature_collection: Optional[Dict[str, Any]]
 def get_uploaded_feature_collection() -> Optional[Dict[str, Any]]:
     return uploaded_feature_collection_var.get()
 
+
+
+def set_llm_cache_enabled(enabled: bool) -> None:
+    llm_cache_enabled_var.set(bool(enabled))
+
+
+def get_llm_cache_enabled() -> bool:
+    return llm_cache_enabled_var.get()
+
+
+def get_request_memo() -> Optional[RequestMemo]:
+    return request_memo_var.get()
+
+
+@contextmanager
+def request_memo() -> Iterator[RequestMemo]:
+    """Scope a RequestMemo to the enclosed work (an already active memo is reused)."""
+    memo = request_memo_var.get()
+    if memo is not None:
+        yield memo
+        return
+    memo = RequestMemo()
+    token = request_memo_var.set(memo)
+    try:
+        yield memo
+    finally:
+        request_memo_var.reset(token)
+
+
+def set_event_sink(sink: Optional[Callable[[str, Any], None]]) -> None:
+    event_sink_var.set(sink)
+
+
+def emit_event(event: str, data: Any) -> None:
+    """Forward an event to the request's stream; no-op for regular (non-streaming) requests."""
+    sink = event_sink_var.get()
+    if sink is not None:
+        sink(event, data)
+
+
+def token_emitter() -> Optional[Callable[[str], None]]:
+    """Callback that streams LLM tokens as `token` events, or None when the request is not streaming."""
+    sink = event_sink_var.get()
+    if sink is None:
+        return None
+    return lambda text: sink("token", {"text": text})
@@ -1,4 +1,4 @@
-from app.vectorstores.loader import retrievers
+from app.vectorstores.loader import RETRIEVAL_MODES, retrievers
 
 
 def _get_documents(retriever, query: str):
@@ -22,3 +22,17 @@ def retrieve_documents(source_key: str, query: str):
     """Retrieve documents from vector store"""
     retriever = retrievers[source_key]
     return _get_documents(retriever, query)
+
+
+def retrieval_mode(source_key: str = "geological") -> str:
+    """Mode actually used for queries: hybrid | vector | bm25 (falls back to what is built)."""
+    retriever = retrievers[source_key]
+    return getattr(retriever, "effective_mode", "vector")
+
+
+def set_retrieval_mode(mode: str, source_key: str = "geological") -> None:
+    """Override the retrieval mode (process-wide; used by eval scripts to compare modes)."""
+    mode = (mode or "").strip().lower()
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"mode must be one of {RETRIEVAL_MODES}")
+    retrievers[source_key].mode = mode
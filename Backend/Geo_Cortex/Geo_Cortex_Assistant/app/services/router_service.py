@@ -1,15 +1,30 @@
 from langchain_core.prompts import PromptTemplate
-from app.services.retriever_service import retrieve_context, retrieve_documents
+from app.services.retriever_service import retrieve_context, retrieve_documents, retrieval_mode
 from app.services.llm_service import generate_response
+from app.services.request_context import get_request_memo, token_emitter
 from app.models.schemas import OccurrenceInfo
+from app.services.metrics import metrics
+from app.services.mods_index import ModsIndex
+from app.services.occurrence_store import OccurrenceStore
 import pandas as pd
 import os
 import re
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any, Optional
 
 # Load MODS CSV (lazy loading)
 MODS_CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "MODS.csv")
 mods_df = None
+mods_index: Optional[ModsIndex] = None
+occurrence_store: Optional[OccurrenceStore] = None
+# Bumped whenever MODS.csv is reloaded (cache keys can include it).
+mods_generation = 0
+_MODS_LOCK = threading.Lock()
+# Background retrieval started ahead of use (see prefetch_rag). Separate from the loader's FAISS pool,
+# which retrieval itself waits on.
+_PREFETCH_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("RAG_PREFETCH_WORKERS", "4")))
 
 
 def _safe_float(v: Any, default: Optional[float] = None) -> Optional[float]:
@@ -34,12 +49,50 @@ def get_mods_df():
     """Lazy load MODS CSV"""
     global mods_df
     if mods_df is None:
-        if os.path.exists(MODS_CSV_PATH):
-            mods_df = pd.read_csv(MODS_CSV_PATH)
-        else:
-            raise FileNotFoundError(f"MODS.csv not found at {MODS_CSV_PATH}")
+        with _MODS_LOCK:
+            if mods_df is None:
+                if os.path.exists(MODS_CSV_PATH):
+                    mods_df = pd.read_csv(MODS_CSV_PATH)
+                else:
+                    raise FileNotFoundError(f"MODS.csv not found at {MODS_CSV_PATH}")
     return mods_df
 
+
+def get_mods_index() -> ModsIndex:
+    """Lookup index over MODS.csv (built once per load)."""
+    global mods_index
+    if mods_index is None:
+        df = get_mods_df()
+        with _MODS_LOCK:
+            if mods_index is None:
+                mods_index = ModsIndex(df)
+    return mods_index
+
+
+def get_occurrence_store() -> OccurrenceStore:
+    """Columnar OccurrenceInfo source over MODS.csv (built once per load)."""
+    global occurrence_store
+    if occurrence_store is None:
+        df = get_mods_df()
+        with _MODS_LOCK:
+            if occurrence_store is None:
+                occurrence_store = OccurrenceStore(df)
+    return occurrence_store
+
+
+def reload_mods_data() -> int:
+    """
+    Drop the cached MODS DataFrame + index + occurrence store (e.g. after ingest replaced MODS.csv).
+    They are rebuilt lazily on next use. Returns the new data generation.
+    """
+    global mods_df, mods_index, occurrence_store, mods_generation
+    with _MODS_LOCK:
+        mods_df = None
+        mods_index = None
+        occurrence_store = None
+        mods_generation += 1
+        return mods_generation
+
 # Prompt Templates
 geological_template = """You are a highly experienced geologist specializing in mineral occurrences and geological data.
 Use the following context from the MODS (Mineral Occurrence Database System) to help answer the question.
@@ -76,59 +129,61 @@ def handle_query(query: str):
     documents = retrieve_documents(source_key, query)
     context = "\n".join(doc.page_content for doc in documents)
     prompt = template_map[source_key].format(query=query, context=context)
-    response = generate_response(prompt)
-
-    # Extract structured data from documents
-    occurrences = []
-    df = get_mods_df()
-    for doc in documents:
-        md = doc.metadata
-        if 'row' in md:
-            try:
-                row_data = df.iloc[md['row']]
-                
-                # Build description from available fields
-                description_parts = []
-                if pd.notna(row_data.get('Major Commodity')):
-                    description_parts.append(f"Major Commodity: {row_data['Major Commodity']}")
-                if pd.notna(row_data.get('Occurrence Type')):
-                    description_parts.append(f"Type: {row_data['Occurrence Type']}")
-                if pd.notna(row_data.get('Exploration Status')):
-                    description_parts.append(f"Status: {row_data['Exploration Status']}")
-                if pd.notna(row_data.get('Admin Region')):
-                    description_parts.append(f"Region: {row_data['Admin Region']}")
-                
-                description = "; ".join(description_parts) if description_parts else None
-                
-                occurrences.append(
-                    OccurrenceInfo(
-                        mods_id=str(row_data.get("MODS", "")),
-                        english_name=str(row_data.get("English Name", "")),
-                        arabic_name=str(row_data.get("Arabic Name", "")) if pd.notna(row_data.get("Arabic Name")) else None,
-                        major_commodity=str(row_data.get("Major Commodity", "")),
-                        longitude=_safe_float(row_data.get("Longitude"), default=0.0) or 0.0,
-                        latitude=_safe_float(row_data.get("Latitude"), default=0.0) or 0.0,
-                        admin_region=str(row_data.get("Admin Region", "")) if pd.notna(row_data.get("Admin Region")) else None,
-                        elevation=_safe_float(row_data.get("Elevation"), default=None),
-                        occurrence_type=str(row_data.get("Occurrence Type", "")) if pd.notna(row_data.get("Occurrence Type")) else None,
-                        exploration_status=str(row_data.get("Exploration Status", "")) if pd.notna(row_data.get("Exploration Status")) else None,
-                        occurrence_importance=str(row_data.get("Occurrence Importance", "")) if pd.notna(row_data.get("Occurrence Importance")) else None,
-                        description=description,
-                    )
-                )
-            except Exception as e:
-                print(f"Error processing row {md.get('row', 'unknown')}: {e}")
-                continue
+    response = generate_response(prompt, on_token=token_emitter())
+
+    # Extract structured data from documents (all hits hydrated in one pass)
+    occurrences = get_occurrence_store().hydrate(
+        doc.metadata["row"] for doc in documents if "row" in (doc.metadata or {})
+    )
 
     print(f"🔀 Extracted {len(occurrences)} occurrences")
     return response, occurrences
 
 
+def _rag_memo_key(query: str, k: int):
+    return ("rag_retrieve", (query or "").strip(), int(k), mods_generation)
+
+
+def _fill(fut: Future, query: str, k: int) -> None:
+    try:
+        fut.set_result(_rag_retrieve(query, k))
+    except BaseException as e:
+        fut.set_exception(e)
+
+
 def rag_retrieve(query: str, k: int = 5):
     """
     RAG retrieval ONLY (no LLM call).
     Returns (context_text, occurrences_from_retrieved_rows).
+
+    Inside a request memo (request_context.request_memo) the same (query, k) is retrieved once per request.
+    """
+    memo = get_request_memo()
+    if memo is None:
+        return _rag_retrieve(query, k)
+    fut, owner = memo.claim(_rag_memo_key(query, k))
+    if owner:
+        _fill(fut, query, k)
+    else:
+        metrics.incr("rag_memo.hits")
+    context, occurrences = fut.result()
+    return context, list(occurrences)
+
+
+def prefetch_rag(query: str, k: int = 5) -> None:
     """
+    Start rag_retrieve(query, k) in the background so its latency overlaps other work; a later
+    rag_retrieve call with the same arguments joins it. No-op without an active request memo.
+    """
+    memo = get_request_memo()
+    if memo is None:
+        return
+    fut, owner = memo.claim(_rag_memo_key(query, k))
+    if owner:
+        _PREFETCH_POOL.submit(contextvars.copy_context().run, _fill, fut, query, k)
+
+
+def _rag_retrieve(query: str, k: int = 5):
     # Guardrail: if the user provides an explicit MODS id, do an exact lookup.
     # This dramatically improves retrieval accuracy without "overfitting" (it's an identifier lookup).
     q = (query or "").strip()
@@ -137,14 +192,7 @@ def rag_retrieve(query: str, k: int = 5):
         try:
             df = get_mods_df()
             target_num = int(m.group(1))
-            mods_nums = (
-                df["MODS"]
-                .astype(str)
-                .str.extract(r"(\d+)", expand=False)
-                .fillna("")
-                .apply(lambda x: int(x) if str(x).isdigit() else -1)
-            )
-            hits = df.index[mods_nums == target_num].tolist()
+            hits = get_mods_index().rows_for_mods_number(target_num)
             if hits:
                 idx = int(hits[0])
                 row_data = df.iloc[idx]
@@ -159,31 +207,7 @@ def rag_retrieve(query: str, k: int = 5):
                     ]
                 ).strip()
 
-                description_parts = []
-                if pd.notna(row_data.get('Major Commodity')):
-                    description_parts.append(f"Major Commodity: {row_data['Major Commodity']}")
-                if pd.notna(row_data.get('Occurrence Type')):
-                    description_parts.append(f"Type: {row_data['Occurrence Type']}")
-                if pd.notna(row_data.get('Exploration Status')):
-                    description_parts.append(f"Status: {row_data['Exploration Status']}")
-                if pd.notna(row_data.get('Admin Region')):
-                    description_parts.append(f"Region: {row_data['Admin Region']}")
-                description = "; ".join(description_parts) if description_parts else None
-
-                occ = OccurrenceInfo(
-                    mods_id=str(row_data.get('MODS', '')),
-                    english_name=str(row_data.get('English Name', '')),
-                    arabic_name=str(row_data.get('Arabic Name', '')) if pd.notna(row_data.get('Arabic Name')) else None,
-                    major_commodity=str(row_data.get('Major Commodity', '')),
-                    longitude=_safe_float(row_data.get("Longitude"), default=0.0) or 0.0,
-                    latitude=_safe_float(row_data.get("Latitude"), default=0.0) or 0.0,
-                    admin_region=str(row_data.get('Admin Region', '')) if pd.notna(row_data.get('Admin Region')) else None,
-                    elevation=_safe_float(row_data.get("Elevation"), default=None),
-                    occurrence_type=str(row_data.get('Occurrence Type', '')) if pd.notna(row_data.get('Occurrence Type')) else None,
-                    exploration_status=str(row_data.get('Exploration Status', '')) if pd.notna(row_data.get('Exploration Status')) else None,
-                    occurrence_importance=str(row_data.get('Occurrence Importance', '')) if pd.notna(row_data.get('Occurrence Importance')) else None,
-                    description=description,
-                )
+                occ = get_occurrence_store().hydrate([idx])[0]
                 return context, [occ]
         except Exception:
             pass
@@ -234,32 +258,9 @@ def rag_retrieve(query: str, k: int = 5):
         if phrase is not None:
             phrase = phrase.strip().strip(".").strip("?").strip("!").strip()
             if phrase:
-                def _norm(s: str) -> str:
-                    s = (s or "").upper()
-                    s = re.sub(r"[^A-Z0-9]+", " ", s)
-                    s = re.sub(r"\s+", " ", s).strip()
-                    return s
-
-                phrase_u = phrase.upper()
-                phrase_n = _norm(phrase)
-
-                col = df["English Name"].astype(str)
-                col_u = col.str.strip().str.upper()
-                col_n = col_u.apply(_norm)
-
-                # exact (raw) match first
-                hits = df.index[col_u == phrase_u].tolist()
-                if not hits and phrase_n:
-                    # exact (normalized) match
-                    hits = df.index[col_n == phrase_n].tolist()
-                if not hits:
-                    # contains (raw), then contains (normalized)
-                    hits = df.index[col_u.str.contains(re.escape(phrase_u), na=False)].tolist()
-                if not hits and phrase_n:
-                    hits = df.index[col_n.str.contains(re.escape(phrase_n), na=False)].tolist()
+                hits = get_mods_index().rows_for_name(phrase)
                 if hits:
                     # Build context from top matches (cap to k)
-                    occurrences = []
                     contexts = []
                     for idx in hits[:k]:
                         row_data = df.iloc[int(idx)]
@@ -274,32 +275,7 @@ def rag_retrieve(query: str, k: int = 5):
                                 ]
                             ).strip()
                         )
-                        description_parts = []
-                        if pd.notna(row_data.get('Major Commodity')):
-                            description_parts.append(f"Major Commodity: {row_data['Major Commodity']}")
-                        if pd.notna(row_data.get('Occurrence Type')):
-                            description_parts.append(f"Type: {row_data['Occurrence Type']}")
-                        if pd.notna(row_data.get('Exploration Status')):
-                            description_parts.append(f"Status: {row_data['Exploration Status']}")
-                        if pd.notna(row_data.get('Admin Region')):
-                            description_parts.append(f"Region: {row_data['Admin Region']}")
-                        description = "; ".join(description_parts) if description_parts else None
-                        occurrences.append(
-                            OccurrenceInfo(
-                                mods_id=str(row_data.get('MODS', '')),
-                                english_name=str(row_data.get('English Name', '')),
-                                arabic_name=str(row_data.get('Arabic Name', '')) if pd.notna(row_data.get('Arabic Name')) else None,
-                                major_commodity=str(row_data.get('Major Commodity', '')),
-                                longitude=_safe_float(row_data.get("Longitude"), default=0.0) or 0.0,
-                                latitude=_safe_float(row_data.get("Latitude"), default=0.0) or 0.0,
-                                admin_region=str(row_data.get('Admin Region', '')) if pd.notna(row_data.get('Admin Region')) else None,
-                                elevation=_safe_float(row_data.get("Elevation"), default=None),
-                                occurrence_type=str(row_data.get('Occurrence Type', '')) if pd.notna(row_data.get('Occurrence Type')) else None,
-                                exploration_status=str(row_data.get('Exploration Status', '')) if pd.notna(row_data.get('Exploration Status')) else None,
-                                occurrence_importance=str(row_data.get('Occurrence Importance', '')) if pd.notna(row_data.get('Occurrence Importance')) else None,
-                                description=description,
-                            )
-                        )
+                    occurrences = get_occurrence_store().hydrate(int(i) for i in hits[:k])
                     return "\n\n".join([c for c in contexts if c]), occurrences
     except Exception:
         pass
@@ -308,6 +284,8 @@ def rag_retrieve(query: str, k: int = 5):
     documents = retrieve_documents(source_key, query) or []
 
     # Re-rank documents using cheap lexical signals (improves top-k quality).
+    # Hybrid/BM25 results already carry lexical ranking (RRF), so only the MODS id boost applies there.
+    lexical_rerank = retrieval_mode(source_key) == "vector"
     ql = q.lower()
     q_tokens = {t for t in re.split(r"[^a-z0-9]+", ql) if len(t) >= 3}
     q_mods = None
@@ -328,7 +306,7 @@ def rag_retrieve(query: str, k: int = 5):
         if q_mods and q_mods in mods_id:
             score += 1000.0
         # token overlap with english name
-        if name and q_tokens:
+        if lexical_rerank and name and q_tokens:
             for t in q_tokens:
                 if t in name:
                     score += 2.0
@@ -337,41 +315,11 @@ def rag_retrieve(query: str, k: int = 5):
     scored.sort(key=lambda x: (-x[0], x[1]))
     documents = [d for (_s, _i, d) in scored[: max(25, k)]]
     documents = documents[:k] if documents else []
-    context = "\n".join(doc.page_content for doc in documents)
+    # Blank line between documents (best first) so prompt budgeting can drop whole low-ranked documents.
+    context = "\n\n".join(doc.page_content for doc in documents)
 
-    occurrences = []
-    df = get_mods_df()
-    for doc in documents:
-        md = doc.metadata
-        if 'row' in md:
-            try:
-                row_data = df.iloc[md['row']]
-                description_parts = []
-                if pd.notna(row_data.get('Major Commodity')):
-                    description_parts.append(f"Major Commodity: {row_data['Major Commodity']}")
-                if pd.notna(row_data.get('Occurrence Type')):
-                    description_parts.append(f"Type: {row_data['Occurrence Type']}")
-                if pd.notna(row_data.get('Exploration Status')):
-                    description_parts.append(f"Status: {row_data['Exploration Status']}")
-                if pd.notna(row_data.get('Admin Region')):
-                    description_parts.append(f"Region: {row_data['Admin Region']}")
-                description = "; ".join(description_parts) if description_parts else None
-
-                occurrences.append(OccurrenceInfo(
-                    mods_id=str(row_data.get('MODS', '')),
-                    english_name=str(row_data.get('English Name', '')),
-                    arabic_name=str(row_data.get('Arabic Name', '')) if pd.notna(row_data.get('Arabic Name')) else None,
-                    major_commodity=str(row_data.get('Major Commodity', '')),
-                    longitude=float(row_data.get('Longitude', 0.0)) if pd.notna(row_data.get('Longitude')) else 0.0,
-                    latitude=float(row_data.get('Latitude', 0.0)) if pd.notna(row_data.get('Latitude')) else 0.0,
-                    admin_region=str(row_data.get('Admin Region', '')) if pd.notna(row_data.get('Admin Region')) else None,
-                    elevation=float(row_data.get('Elevation', 0.0)) if pd.notna(row_data.get('Elevation')) else None,
-                    occurrence_type=str(row_data.get('Occurrence Type', '')) if pd.notna(row_data.get('Occurrence Type')) else None,
-                    exploration_status=str(row_data.get('Exploration Status', '')) if pd.notna(row_data.get('Exploration Status')) else None,
-                    occurrence_importance=str(row_data.get('Occurrence Importance', '')) if pd.notna(row_data.get('Occurrence Importance')) else None,
-                    description=description
-                ))
-            except Exception:
-                continue
+    occurrences = get_occurrence_store().hydrate(
+        doc.metadata["row"] for doc in documents if "row" in (doc.metadata or {})
+    )
 
     return context, occurrences
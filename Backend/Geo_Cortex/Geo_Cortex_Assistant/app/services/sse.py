@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import queue
+import threading
+from typing import Any, Callable, Iterator
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+from app.services.request_context import set_event_sink
+
+_DONE = object()
+
+
+def sse_event(event: str, data: Any) -> str:
+    payload = json.dumps(jsonable_encoder(data), ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def stream_events(worker: Callable[[], Any]) -> Iterator[str]:
+    """
+    Run `worker()` on its own thread and yield what it emits as server-sent events.
+
+    While the worker runs, request_context.emit_event() calls (tokens, tool steps, artifacts) are queued
+    and streamed immediately. The worker's return value is sent last as the `result` event
+    (an exception becomes an `error` event). Comment heartbeats keep idle connections open.
+
+    The thread starts with a copy of the caller's context, so request-scoped values set by the route
+    (uploaded geometry, cache opt-out) are visible to the worker.
+    """
+    q: "queue.Queue[Any]" = queue.Queue()
+    heartbeat_s = float(os.getenv("SSE_HEARTBEAT_SEC", "15"))
+
+    def _run() -> None:
+        set_event_sink(lambda event, data: q.put((event, data)))
+        try:
+            q.put(("result", worker()))
+        except Exception as e:
+            q.put(("error", {"detail": str(e)}))
+        finally:
+            q.put(_DONE)
+
+    ctx = contextvars.copy_context()
+    threading.Thread(target=ctx.run, args=(_run,), daemon=True).start()
+
+    def _events() -> Iterator[str]:
+        while True:
+            try:
+                item = q.get(timeout=heartbeat_s)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if item is _DONE:
+                return
+            event, data = item
+            try:
+                yield sse_event(event, data)
+            except Exception as e:
+                yield sse_event("error", {"detail": f"Failed to encode {event} event: {e}"})
+
+    return _events()
+
+
+def sse_response(worker: Callable[[], Any]) -> StreamingResponse:
+    return StreamingResponse(
+        stream_events(worker),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
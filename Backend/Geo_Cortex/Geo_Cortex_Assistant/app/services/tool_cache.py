@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from app.services.metrics import hit_rate, metrics
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+# Whether the latest cached tool call in this context was served from the cache (see tool_cache_note).
+_last_call_hit: ContextVar[bool] = ContextVar("tool_cache_last_call_hit", default=False)
+
+
+def _data_generation() -> int:
+    from app.services import router_service
+
+    return router_service.mods_generation
+
+
+def canonical_args(args: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Canonical JSON of tool arguments: sorted keys, None values and values equal to the tool's `defaults`
+    dropped, strings stripped and case-folded (the cached tools filter strings with ILIKE).
+    """
+    defaults = defaults or {}
+    norm = {
+        k: (v.strip().casefold() if isinstance(v, str) else v)
+        for k, v in args.items()
+        if v is not None and not (k in defaults and v == defaults[k])
+    }
+    return json.dumps(norm, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _signature_defaults(fn: Callable[..., Any]) -> Dict[str, Any]:
+    return {
+        name: p.default
+        for name, p in inspect.signature(fn).parameters.items()
+        if p.default is not inspect.Parameter.empty
+    }
+
+
+class ToolResultCache:
+    """
+    Agent tool results shared across requests and sessions, keyed by
+    (tool name, canonical JSON arguments, MODS data generation).
+
+    The generation is bumped when ingest changes the data, so older entries stop matching and age out of
+    the LRU (TOOL_CACHE_SIZE entries). TOOL_CACHE_TTL_SEC bounds staleness for changes made outside the
+    API (e.g. scripts/load_mods_to_db.py); TOOL_CACHE_DISABLE=1 turns it off.
+    Results are deep-copied in and out, so callers may modify what they get.
+    """
+
+    def __init__(self, max_items: Optional[int] = None, ttl_sec: Optional[float] = None):
+        self.max_items = int(max_items or os.getenv("TOOL_CACHE_SIZE", "256"))
+        self.ttl_sec = float(ttl_sec if ttl_sec is not None else os.getenv("TOOL_CACHE_TTL_SEC", "600"))
+        self.enabled = os.getenv("TOOL_CACHE_DISABLE", "0") != "1"
+        self._lru: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @staticmethod
+    def key(tool: str, args: Dict[str, Any], generation: int, defaults: Optional[Dict[str, Any]] = None) -> str:
+        ah = hashlib.sha256(canonical_args(args, defaults).encode("utf-8")).hexdigest()
+        return f"{tool}\0{int(generation)}\0{ah}"
+
+    def _get(self, k: str) -> Tuple[bool, Any]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._lru.get(k)
+            if item is not None and item[0] <= now:
+                del self._lru[k]
+                self.expired += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                metrics.incr("tool_cache.misses")
+                return False, None
+            self._lru.move_to_end(k)
+            self.hits += 1
+            metrics.incr("tool_cache.hits")
+            return True, item[1]
+
+    def _put(self, k: str, value: Any) -> None:
+        with self._lock:
+            self._lru[k] = (time.monotonic() + self.ttl_sec, value)
+            self._lru.move_to_end(k)
+            while len(self._lru) > self.max_items:
+                self._lru.popitem(last=False)
+                self.evicted += 1
+
+    def call(
+        self,
+        tool: str,
+        fn: Callable[..., Any],
+        db: Any,
+        args: Dict[str, Any],
+        defaults: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        fn(db, **args), served from the cache when the same call was made for the current data.
+        `defaults` (fn's keyword defaults) let an explicit default and an omitted argument share an entry.
+        """
+        if not self.enabled or self.ttl_sec <= 0:
+            _last_call_hit.set(False)
+            return fn(db, **args)
+        k = self.key(tool, args, _data_generation(), defaults)
+        hit, value = self._get(k)
+        _last_call_hit.set(hit)
+        if hit:
+            return copy.deepcopy(value)
+        value = fn(db, **args)
+        self._put(k, copy.deepcopy(value))
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._lru),
+                "max_items": self.max_items,
+                "ttl_sec": self.ttl_sec,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "hit_rate": hit_rate(self.hits, self.misses),
+            }
+
+
+tool_result_cache = ToolResultCache()
+metrics.register("tool_result_cache", tool_result_cache.stats)
+
+
+def cached_tool(name: str) -> Callable[[_F], _F]:
+    """Serve a read-only `tool(db, **kwargs)` from tool_result_cache."""
+
+    def deco(fn: _F) -> _F:
+        defaults = _signature_defaults(fn)
+
+        @functools.wraps(fn)
+        def wrapper(db: Any, **kwargs: Any) -> Any:
+            return tool_result_cache.call(name, fn, db, kwargs, defaults)
+
+        return wrapper  # type: ignore[return-value]
+
+    return deco
+
+
+def tool_cache_note() -> Dict[str, Any]:
+    """Fields for the tool_trace item of the cached tool call just made: {"cached": True} on a hit."""
+    return {"cached": True} if _last_call_hit.get() else {}
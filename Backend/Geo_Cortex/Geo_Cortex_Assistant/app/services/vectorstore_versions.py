@@ -0,0 +1,93 @@
+"""
+Versioned vector store directories.
+
+A store root (e.g. app/vectorstores/mods_vectorstore) holds one subdirectory per build (v20250101T120000-1a2b3c4d)
+and a small pointer file, CURRENT, naming the live one. A build writes a new version directory, then
+publishes it by atomically replacing CURRENT, so readers always see either the old or the new store, never
+a missing or half-written one. Replacing a file also works on Windows while the old version is still open
+(renaming a directory that is in use does not). Older versions are removed after publishing, keeping the
+last VECTORSTORE_KEEP_VERSIONS (default 2) so workers that still map the previous one keep working.
+
+Stores from before versioning (index files directly in the root, no CURRENT) are still read as-is.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+POINTER_FILENAME = "CURRENT"
+VERSION_PREFIX = "v"
+
+# Files of an unversioned store, removed from the root once a version is published.
+_LEGACY_FILES = ("index.faiss", "index.pkl", "index_ann.faiss", "bm25.json", "manifest.json")
+
+
+def current_store_dir(root: Path) -> Path:
+    """The live store directory: the version named in CURRENT, else the root itself (unversioned store)."""
+    root = Path(root)
+    try:
+        name = (root / POINTER_FILENAME).read_text(encoding="utf-8").strip()
+    except OSError:
+        return root
+    if name and (root / name).is_dir():
+        return root / name
+    return root
+
+
+def new_version_dir(root: Path) -> Path:
+    """
+    A fresh, empty version directory under `root` (not visible to readers until published).
+    The random suffix keeps two builds in the same second apart; an existing directory is never reused.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    path = root / f"{VERSION_PREFIX}{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    path.mkdir(exist_ok=False)
+    return path
+
+
+def clone_live_version(root: Path) -> Path:
+    """
+    A new version directory holding the live store's files (hard links where possible, else copies),
+    for builds that replace only some of them. Files are never modified in place, so sharing them is safe.
+    """
+    root = Path(root)
+    live = current_store_dir(root)
+    path = new_version_dir(root)
+    for src in live.iterdir():
+        if not src.is_file() or (live == root and src.name not in _LEGACY_FILES):
+            continue
+        try:
+            os.link(src, path / src.name)
+        except OSError:
+            shutil.copy2(src, path / src.name)
+    return path
+
+
+def _versions(root: Path) -> List[Path]:
+    """Version directories, oldest first (names start with the build time)."""
+    return sorted(p for p in Path(root).iterdir() if p.is_dir() and p.name.startswith(VERSION_PREFIX))
+
+
+def publish_version(root: Path, version_dir: Path) -> None:
+    """Make `version_dir` the live store (atomic pointer replace), then prune old versions."""
+    root = Path(root)
+    version_dir = Path(version_dir)
+    tmp = root / f"{POINTER_FILENAME}.tmp-{os.getpid()}"
+    tmp.write_text(version_dir.name, encoding="utf-8")
+    os.replace(tmp, root / POINTER_FILENAME)
+
+    for name in _LEGACY_FILES:
+        try:
+            (root / name).unlink()
+        except OSError:
+            pass
+    keep = max(1, int(os.getenv("VECTORSTORE_KEEP_VERSIONS", "2")))
+    old = [p for p in _versions(root) if p.name != version_dir.name]
+    for path in old[: max(0, len(old) - (keep - 1))]:
+        # Files still mapped by a worker cannot be deleted on Windows; the next build retries.
+        shutil.rmtree(path, ignore_errors=True)
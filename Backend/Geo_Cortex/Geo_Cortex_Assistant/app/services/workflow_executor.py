@@ -0,0 +1,120 @@
+"""
+Dependency-aware execution of workflow plan steps.
+
+Most plans are independent DB aggregates (qc_summary, commodity_stats, stats_by_region, ...). Those run in
+parallel; a step only waits for the earlier steps it depends on:
+- it reads their output: geometry_ref="buffer" needs the preceding spatial_buffer, and
+  publish_layer_instructions without a URL needs the preceding ogc_items_link;
+- it writes the same output (e.g. two search_mods steps both set the occurrences), so the plan order decides
+  which result is kept.
+
+Each step has a deadline (WORKFLOW_STEP_TIMEOUT_SEC), counted from when it starts running. A step that misses
+it is reported as failed and its late result is discarded. Python threads cannot be interrupted, so a
+timed-out step keeps its thread until it returns: each run has its own pool with one thread per step (started
+lazily, at most max_parallel non-timed-out steps at once), so orphaned steps never delay later steps or other
+runs, and their number is bounded by the plan length. DB steps are also bounded by the same PostgreSQL
+statement_timeout.
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# Steps whose result replaces the workflow's occurrence list.
+_OCCURRENCE_ACTIONS = frozenset({"search_mods", "nearby_mods", "bbox_mods"})
+
+def step_timeout_s() -> float:
+    return float(os.getenv("WORKFLOW_STEP_TIMEOUT_SEC", "30"))
+
+
+def _writes(step: Dict[str, Any]) -> str:
+    action = str(step.get("action") or "")
+    return "occurrences" if action in _OCCURRENCE_ACTIONS else action
+
+
+def _reads(step: Dict[str, Any]) -> Set[str]:
+    args = step.get("args") or {}
+    reads: Set[str] = set()
+    if args.get("geometry_ref") == "buffer":
+        reads.add("spatial_buffer")
+    if step.get("action") == "publish_layer_instructions" and not args.get("ogc_items_url"):
+        reads.add("ogc_items_link")
+    return reads
+
+
+def step_dependencies(steps: List[Dict[str, Any]]) -> List[Set[int]]:
+    """For each step, the indices of the earlier steps it must wait for."""
+    last_writer: Dict[str, int] = {}
+    deps: List[Set[int]] = []
+    for i, step in enumerate(steps):
+        d = {last_writer[key] for key in _reads(step) if key in last_writer}
+        out = _writes(step)
+        if out in last_writer:
+            d.add(last_writer[out])
+        last_writer[out] = i
+        deps.append(d)
+    return deps
+
+
+def run_steps(
+    steps: List[Dict[str, Any]],
+    run_step: Callable[[Dict[str, Any]], Any],
+    on_done: Callable[[int, Any, Optional[BaseException], float], None],
+    *,
+    max_parallel: Optional[int] = None,
+    timeout_s: Optional[float] = None,
+) -> None:
+    """
+    Run `run_step(step)` for every step on worker threads (each with a copy of the caller's context),
+    starting a step as soon as its dependencies have finished.
+
+    `on_done(index, result, error, elapsed_ms)` is called on the calling thread, once per step, in completion
+    order; a step's dependents start only after its on_done returned, so on_done can publish the results
+    they read. A timed-out step gets a TimeoutError (its thread is left to finish on its own).
+    """
+    max_parallel = max(1, int(max_parallel or os.getenv("WORKFLOW_MAX_PARALLEL", "4")))
+    timeout_s = float(timeout_s if timeout_s is not None else step_timeout_s())
+    deps = step_dependencies(steps)
+    pending = list(range(len(steps)))
+    done: Set[int] = set()
+    running: Dict[Future, int] = {}
+    started: Dict[int, float] = {}  # step index -> monotonic start time (set on the worker thread)
+
+    def _timed(i: int) -> Any:
+        started[i] = time.monotonic()
+        return run_step(steps[i])
+
+    pool = ThreadPoolExecutor(max_workers=max(1, len(steps)), thread_name_prefix="workflow-step")
+    try:
+        while pending or running:
+            for i in [i for i in pending if deps[i] <= done]:
+                if len(running) >= max_parallel:
+                    break
+                pending.remove(i)
+                running[pool.submit(contextvars.copy_context().run, _timed, i)] = i
+
+            # Until every running step has started, poll briefly so its deadline is counted from its start.
+            starts = [started.get(i) for i in running.values()]
+            if any(t0 is None for t0 in starts):
+                wait_s = 0.01
+            else:
+                wait_s = max(0.0, min(starts) + timeout_s - time.monotonic())
+            finished, _ = wait(list(running), timeout=wait_s, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for fut in finished:
+                i = running.pop(fut)
+                err = fut.exception()
+                on_done(i, None if err is not None else fut.result(), err, (now - started.get(i, now)) * 1000.0)
+                done.add(i)
+            for fut, i in list(running.items()):
+                t0 = started.get(i)
+                if t0 is not None and now - t0 >= timeout_s:
+                    running.pop(fut)
+                    on_done(i, None, TimeoutError(f"step timed out after {timeout_s:g}s"), (now - t0) * 1000.0)
+                    done.add(i)
+    finally:
+        # Timed-out steps keep their threads until they return; do not wait for them here.
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.dbmodels import MODSOccurrence, ZonalStatsCache
+from app.services.raster_service import compute_zonal_stats
+
+
+def geometry_hash(geometry: Dict[str, Any]) -> str:
+    """
+    Stable hash of a GeoJSON geometry (key order and whitespace do not matter).
+    """
+    canon = json.dumps(geometry, sort_keys=True, separators=(",", ":"), ensure_ascii=True)
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+
+def get_zonal_stats(
+    db: Session,
+    raster_id: str,
+    path: Path,
+    geometry: Dict[str, Any],
+    band: int = 1,
+    *,
+    label: Optional[str] = None,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Zonal stats for (raster, band, geometry), served from the cache when present.
+    Returns (stats, cached). Uploaded rasters are immutable (raster_id = upload job id), so entries never go stale.
+    A labeled entry (admin_region hull) replaces older entries with the same label, whose hull has since changed.
+    """
+    gh = geometry_hash(geometry)
+    row = db.get(ZonalStatsCache, (raster_id, int(band), gh))
+    if row is not None:
+        return dict(row.stats or {}), True
+
+    stats = compute_zonal_stats(path, geometry, band=int(band))
+    if label is not None:
+        db.query(ZonalStatsCache).filter(
+            ZonalStatsCache.raster_id == raster_id,
+            ZonalStatsCache.band == int(band),
+            ZonalStatsCache.label == label,
+            ZonalStatsCache.geom_hash != gh,
+        ).delete(synchronize_session=False)
+    db.add(
+        ZonalStatsCache(
+            raster_id=raster_id,
+            band=int(band),
+            geom_hash=gh,
+            label=label,
+            geometry=geometry,
+            stats=stats,
+            created_at=datetime.utcnow(),
+        )
+    )
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request cached the same key concurrently; its result is identical.
+        db.rollback()
+    return stats, False
+
+
+def admin_region_hulls(db: Session, regions: Optional[List[str]] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Convex hull (EPSG:4326 GeoJSON) of the occurrences in each admin_region.
+    Regions with fewer than 3 distinct points have no areal hull and are skipped.
+    """
+    hull = func.ST_AsGeoJSON(func.ST_ConvexHull(func.ST_Collect(func.geometry(MODSOccurrence.geom))))
+    q = db.query(MODSOccurrence.admin_region, hull).filter(
+        MODSOccurrence.admin_region.isnot(None),
+        MODSOccurrence.geom.isnot(None),
+    )
+    if regions:
+        q = q.filter(MODSOccurrence.admin_region.in_(regions))
+    out: List[Tuple[str, Dict[str, Any]]] = []
+    for region, gj in q.group_by(MODSOccurrence.admin_region).all():
+        if not region or not gj:
+            continue
+        geom = json.loads(gj)
+        if geom.get("type") not in ("Polygon", "MultiPolygon"):
+            continue
+        out.append((str(region), geom))
+    return out
+
+
+def _like_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def admin_region_hull(db: Session, region: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    (canonical region name, hull) for one admin_region; tolerant of case/partial names ("makkah").
+    """
+    hulls = admin_region_hulls(db, [region])
+    if hulls:
+        return hulls[0]
+    name = _like_escape(region.strip())
+    if not name:
+        return None
+    match = None
+    # Case-insensitive exact name first, then a (literal) substring.
+    for pattern in (name, f"%{name}%"):
+        match = (
+            db.query(MODSOccurrence.admin_region)
+            .filter(MODSOccurrence.admin_region.ilike(pattern, escape="\\"))
+            .distinct()
+            .order_by(MODSOccurrence.admin_region.asc())
+            .first()
+        )
+        if match:
+            break
+    if match and match[0] and match[0] != region:
+        hulls = admin_region_hulls(db, [match[0]])
+        if hulls:
+            return hulls[0]
+    return None
+
+
+def cached_region_stats(db: Session, raster_id: str, band: int = 1) -> List[Dict[str, Any]]:
+    """
+    Cached per-admin_region stats whose hull is still current (regions whose occurrences changed since the
+    last prewarm are left out until it is re-run).
+    """
+    current = {region: geometry_hash(geom) for region, geom in admin_region_hulls(db)}
+    rows = (
+        db.query(ZonalStatsCache)
+        .filter(
+            ZonalStatsCache.raster_id == raster_id,
+            ZonalStatsCache.band == int(band),
+            ZonalStatsCache.label.isnot(None),
+        )
+        .order_by(ZonalStatsCache.label.asc())
+        .all()
+    )
+    return [{"admin_region": r.label, "stats": r.stats} for r in rows if current.get(r.label) == r.geom_hash]
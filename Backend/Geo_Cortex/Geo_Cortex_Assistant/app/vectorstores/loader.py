@@ -0,0 +1,251 @@
+"""
+Vector store loader.
+
+`retrievers[source_key]` returns documents for a query. The geological store combines:
+- FAISS (semantic, Ollama embeddings) built by scripts/build_vectorstore.py
+- BM25 (lexical) over the same documents, saved as bm25.json in the same directory
+
+The store directory is versioned: each build is published by replacing a CURRENT pointer file, which is
+resolved on every (re)load (app/services/vectorstore_versions.py).
+
+Both are queried in parallel and fused with reciprocal rank fusion (RRF). If the FAISS side fails (e.g. the
+embedding server is down), hybrid queries return the BM25 ranking alone (`GET /metrics` →
+`counters.rag.vector_errors`).
+
+The FAISS index is memory-mapped (FAISS_MMAP=1), so forked workers share its pages; `GET /metrics` →
+`gauges.faiss.load_mode` shows the mode actually used (mmap_ifc | mmap | read). When the store was
+built with an ANN index (index_ann.faiss: HNSW / IVF-PQ) that one is searched instead of the flat index
+(FAISS_INDEX=auto|flat|ann).
+"""
+from __future__ import annotations
+
+import json
+import os
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.services.ann_index import ANN_FILENAME, apply_search_params, read_index_with_mode
+from app.services.bm25_index import BM25Index
+from app.services.embedding_cache import CachedQueryEmbeddings
+from app.services.metrics import metrics
+from app.services.vectorstore_versions import current_store_dir
+
+load_dotenv()
+
+VECTORSTORES_DIR = Path(__file__).resolve().parent
+MODS_VECTORSTORE_DIR = VECTORSTORES_DIR / "mods_vectorstore"
+
+RETRIEVAL_MODES = ("hybrid", "vector", "bm25")
+
+# Hybrid queries run the FAISS side (embedding HTTP call) here while BM25 scores on the caller thread.
+_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("RAG_RETRIEVAL_WORKERS", "8")))
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def load_faiss_store(directory: Path, embeddings: Any) -> Any:
+    """
+    LangChain FAISS store from `directory` without FAISS.load_local's full in-memory read:
+    the index file is memory-mapped, and the ANN index is preferred when present.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    directory = Path(directory)
+    manifest: Dict[str, Any] = {}
+    try:
+        manifest = json.loads((directory / "manifest.json").read_text(encoding="utf-8"))
+    except Exception:
+        pass
+    choice = os.getenv("FAISS_INDEX", "auto").strip().lower()
+    use_ann = choice != "flat" and (directory / ANN_FILENAME).exists()
+    index_file = ANN_FILENAME if use_ann else "index.faiss"
+    index, load_mode = read_index_with_mode(directory / index_file, mmap=os.getenv("FAISS_MMAP", "1") != "0")
+    metrics.set_gauge("faiss.load_mode", load_mode)
+    metrics.set_gauge("faiss.index_file", index_file)
+    if use_ann:
+        apply_search_params(index, manifest.get("ann_params"))
+    # index.pkl is written by FAISS.save_local in build_vectorstore.py (trusted local file).
+    with open(directory / "index.pkl", "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
+
+
+def _doc_key(doc: Any) -> Any:
+    md = getattr(doc, "metadata", {}) or {}
+    if "row" in md:
+        return ("row", md["row"])
+    return ("text", getattr(doc, "page_content", ""))
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: List[List[Any]],
+    weights: List[float],
+    *,
+    rrf_k: float = 60.0,
+    limit: Optional[int] = None,
+) -> List[Any]:
+    """
+    score(d) = sum_i w_i / (rrf_k + rank_i(d)), rank starting at 1. Ties keep first-seen order.
+    """
+    scores: Dict[Any, float] = {}
+    first: Dict[Any, Any] = {}
+    order: Dict[Any, int] = {}
+    for docs, w in zip(ranked_lists, weights):
+        if w <= 0:
+            continue
+        for rank, doc in enumerate(docs, start=1):
+            key = _doc_key(doc)
+            if key not in first:
+                first[key] = doc
+                order[key] = len(order)
+            scores[key] = scores.get(key, 0.0) + w / (rrf_k + rank)
+    keys = sorted(scores, key=lambda k: (-scores[k], order[k]))
+    if limit is not None:
+        keys = keys[:limit]
+    return [first[k] for k in keys]
+
+
+@dataclass(frozen=True)
+class _LoadedIndexes:
+    """The indexes of one load; replaced as a whole, so a query never mixes two loads."""
+
+    faiss: Any
+    bm25: Optional[BM25Index]
+
+
+class HybridRetriever:
+    """
+    Lazy-loading FAISS + BM25 retriever (LangChain-style `.invoke(query)`).
+
+    Configuration (env):
+    - RAG_RETRIEVAL_MODE: hybrid (default) | vector | bm25
+    - RAG_FETCH_K: candidates per retriever and documents returned (default 25)
+    - RAG_RRF_K: RRF rank constant (default 60)
+    - RAG_VECTOR_WEIGHT / RAG_BM25_WEIGHT: fusion weights (default 1.0 / 1.0)
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.mode = os.getenv("RAG_RETRIEVAL_MODE", "hybrid").strip().lower()
+        self.fetch_k = int(os.getenv("RAG_FETCH_K", "25"))
+        self.rrf_k = _env_float("RAG_RRF_K", 60.0)
+        self.vector_weight = _env_float("RAG_VECTOR_WEIGHT", 1.0)
+        self.bm25_weight = _env_float("RAG_BM25_WEIGHT", 1.0)
+        self._lock = threading.Lock()
+        self._indexes: Optional[_LoadedIndexes] = None
+
+    def _load(self) -> _LoadedIndexes:
+        indexes = self._indexes
+        if indexes is not None:
+            return indexes
+        with self._lock:
+            if self._indexes is not None:
+                return self._indexes
+            directory = current_store_dir(self.directory)
+            faiss_store = None
+            if (directory / "index.faiss").exists():
+                from langchain_ollama import OllamaEmbeddings
+
+                embed_model = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+                embeddings = CachedQueryEmbeddings(
+                    OllamaEmbeddings(
+                        model=embed_model,
+                        base_url=os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434"),
+                    ),
+                    model=embed_model,
+                )
+                faiss_store = load_faiss_store(directory, embeddings)
+            indexes = _LoadedIndexes(faiss=faiss_store, bm25=BM25Index.load(directory))
+            self._indexes = indexes
+            if indexes.faiss is None and indexes.bm25 is None:
+                print(f"⚠️ No vector store at {self.directory}. Run: python scripts/build_vectorstore.py")
+            return indexes
+
+    def reload(self) -> None:
+        """Drop loaded indexes (e.g. after a rebuild); they are re-read on next query."""
+        with self._lock:
+            self._indexes = None
+
+    def _mode(self, indexes: _LoadedIndexes) -> str:
+        mode = self.mode if self.mode in RETRIEVAL_MODES else "hybrid"
+        if mode != "vector" and indexes.bm25 is None:
+            return "vector"
+        if mode != "bm25" and indexes.faiss is None:
+            return "bm25" if indexes.bm25 is not None else "vector"
+        return mode
+
+    @property
+    def effective_mode(self) -> str:
+        return self._mode(self._load())
+
+    @staticmethod
+    def _vector_search(indexes: _LoadedIndexes, query: str, k: int) -> List[Any]:
+        if indexes.faiss is None:
+            return []
+        return list(indexes.faiss.similarity_search(query, k=k))
+
+    @staticmethod
+    def _bm25_search(indexes: _LoadedIndexes, query: str, k: int) -> List[Any]:
+        if indexes.bm25 is None:
+            return []
+        from langchain_core.documents import Document
+
+        out = []
+        for idx, _score in indexes.bm25.search(query, k=k):
+            d = indexes.bm25.docs[idx]
+            out.append(Document(page_content=d["page_content"], metadata=dict(d["metadata"])))
+        return out
+
+    def invoke(self, query: str, k: Optional[int] = None) -> List[Any]:
+        k = int(k or self.fetch_k)
+        indexes = self._load()  # one snapshot for the whole query, even if reload() runs meanwhile
+        mode = self._mode(indexes)
+        if mode == "vector":
+            if indexes.faiss is None:
+                raise RuntimeError(f"Vector store not found at {self.directory}. Run: python scripts/build_vectorstore.py")
+            return self._vector_search(indexes, query, k)
+        if mode == "bm25":
+            return self._bm25_search(indexes, query, k)
+
+        # Hybrid: FAISS (embedding HTTP call) and BM25 run concurrently, then RRF.
+        fut_vec = _POOL.submit(self._vector_search, indexes, query, k)
+        lexical = self._bm25_search(indexes, query, k)
+        try:
+            semantic = fut_vec.result()
+        except Exception as e:
+            # Embedding server down / index error: the lexical ranking alone still answers the query.
+            metrics.incr("rag.vector_errors")
+            print(f"⚠️ Vector search failed ({e}); using BM25 results only")
+            return lexical
+        return reciprocal_rank_fusion(
+            [semantic, lexical],
+            [self.vector_weight, self.bm25_weight],
+            rrf_k=self.rrf_k,
+            limit=k,
+        )
+
+
+retrievers: Dict[str, HybridRetriever] = {
+    "geological": HybridRetriever(MODS_VECTORSTORE_DIR),
+}
+
+
+def reload_vectorstores() -> None:
+    for r in retrievers.values():
+        r.reload()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+# Ensure imports work when running as a script (python scripts/bench_ann.py)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.services.ann_index import apply_search_params, build_ann_index, flat_vectors, read_index  # noqa: E402
+from app.services.vectorstore_versions import current_store_dir  # noqa: E402
+
+VECTORSTORE_DIR = ROOT / "app" / "vectorstores" / "mods_vectorstore"
+
+
+def _ints(env: str, default: str) -> List[int]:
+    out = []
+    for part in os.getenv(env, default).split(","):
+        part = part.strip()
+        if part.isdigit():
+            out.append(int(part))
+    return out
+
+
+def _load_vectors() -> np.ndarray:
+    n_syn = int(os.getenv("ANN_BENCH_SYNTHETIC", "0"))
+    if n_syn > 0:
+        # Synthetic clustered vectors: lets you see how a configuration behaves at a larger dataset size.
+        dim = int(os.getenv("ANN_BENCH_DIM", "768"))
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(max(8, n_syn // 200), dim)).astype("float32")
+        x = centers[rng.integers(0, len(centers), n_syn)] + 0.3 * rng.normal(size=(n_syn, dim)).astype("float32")
+        return x.astype("float32")
+    path = current_store_dir(VECTORSTORE_DIR) / "index.faiss"
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found. Run scripts/build_vectorstore.py or set ANN_BENCH_SYNTHETIC=N")
+    return flat_vectors(read_index(path, mmap=False))
+
+
+def _search_latency(index, queries: np.ndarray, k: int):
+    """One query per call (like serving); returns (ids, per-query ms)."""
+    ids = np.zeros((len(queries), k), dtype="int64")
+    ms = np.zeros(len(queries))
+    for i in range(len(queries)):
+        t0 = time.perf_counter()
+        _d, I = index.search(queries[i : i + 1], k)
+        ms[i] = (time.perf_counter() - t0) * 1000.0
+        ids[i] = I[0]
+    return ids, ms
+
+
+def _recall(truth: np.ndarray, got: np.ndarray) -> float:
+    k = truth.shape[1]
+    hits = sum(len(set(t) & set(g)) for t, g in zip(truth.tolist(), got.tolist()))
+    return hits / float(len(truth) * k)
+
+
+def main() -> int:
+    """
+    Recall@k and latency of ANN indexes against the exact flat index.
+
+    Queries are stored vectors plus small noise (no embedding server needed).
+    Env: ANN_BENCH_N=500 queries, ANN_BENCH_K=10, ANN_BENCH_TYPES=hnsw,ivfpq,
+         ANN_BENCH_EF=16,32,64,128 (HNSW ef_search sweep), ANN_BENCH_NPROBE=1,4,8,16,32 (IVF sweep),
+         ANN_BENCH_SYNTHETIC=N to benchmark N synthetic vectors (ANN_BENCH_DIM=768) instead of the built store.
+    """
+    x = _load_vectors()
+    n, dim = x.shape
+    k = int(os.getenv("ANN_BENCH_K", "10"))
+    nq = min(n, int(os.getenv("ANN_BENCH_N", "500")))
+    types = [t.strip().lower() for t in os.getenv("ANN_BENCH_TYPES", "hnsw,ivfpq").split(",") if t.strip()]
+
+    rng = np.random.default_rng(1)
+    q = x[rng.choice(n, nq, replace=False)]
+    q = (q + 0.05 * float(x.std()) * rng.normal(size=q.shape)).astype("float32")
+
+    flat, _ = build_ann_index(x, "flat")
+    truth, flat_ms = _search_latency(flat, q, k)
+    print(f"vectors={n} dim={dim} queries={nq} k={k}")
+    print(f"{'index':<34} {'recall@k':>9} {'avg_ms':>8} {'p95_ms':>8} {'build_s':>8} {'size_mb':>8}")
+
+    def _row(label: str, recall: float, ms: np.ndarray, build_s: float, size_mb: float) -> None:
+        print(f"{label:<34} {recall:>9.3f} {ms.mean():>8.3f} {np.percentile(ms, 95):>8.3f} {build_s:>8.2f} {size_mb:>8.1f}")
+
+    import faiss
+
+    _row("flat", 1.0, flat_ms, 0.0, faiss.serialize_index(flat).nbytes / 1e6)
+
+    for t in types:
+        t0 = time.perf_counter()
+        index, params = build_ann_index(x, t)
+        build_s = time.perf_counter() - t0
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+        sweep: Dict[str, List[int]] = (
+            {"ef_search": _ints("ANN_BENCH_EF", "16,32,64,128")}
+            if t == "hnsw"
+            else {"nprobe": [p for p in _ints("ANN_BENCH_NPROBE", "1,4,8,16,32") if p <= params.get("nlist", 1)]}
+        )
+        base = ", ".join(f"{kk}={vv}" for kk, vv in params.items() if kk not in sweep)
+        print(f"# {t}: {base}")
+        for key, values in sweep.items():
+            for v in values:
+                apply_search_params(index, {key: v})
+                got, ms = _search_latency(index, q, k)
+                _row(f"{t} {key}={v}", _recall(truth, got), ms, build_s, size_mb)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
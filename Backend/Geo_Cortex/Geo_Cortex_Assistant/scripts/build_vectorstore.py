@@ -2,8 +2,15 @@
 Script to build FAISS vector store from MODS.csv
 Run this script to create the vector store for RAG functionality.
 """
+import argparse
+import hashlib
+import json
 import os
+import shutil
 import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import pandas as pd
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
@@ -13,37 +20,34 @@ from langchain_ollama import OllamaEmbeddings
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app.services.ann_index import ANN_FILENAME, INDEX_TYPES, build_ann_index, flat_vectors, write_index  # noqa: E402
+from app.services.bm25_index import BM25Index  # noqa: E402
+from app.services.embedding_pipeline import clear_checkpoints, embed_texts, run_key  # noqa: E402
+from app.services.vectorstore_versions import (  # noqa: E402
+    clone_live_version,
+    current_store_dir,
+    new_version_dir,
+    publish_version,
+)
+
 load_dotenv()
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODS_CSV_PATH = os.path.join(BASE_DIR, "MODS.csv")
+# Store root: one directory per build plus a CURRENT pointer (app/services/vectorstore_versions.py)
 VECTORSTORE_DIR = os.path.join(BASE_DIR, "app", "vectorstores", "mods_vectorstore")
+# Embedding model the index was built with (a different model forces a full rebuild)
+MANIFEST_FILENAME = "manifest.json"
+# Finished embedding batches of an interrupted run (reused on the next run with the same inputs)
+CHECKPOINTS_DIR = os.path.join(BASE_DIR, "app", "vectorstores", "embed_checkpoints")
 
 # Ensure vectorstore directory exists
 os.makedirs(VECTORSTORE_DIR, exist_ok=True)
 
 
-def build_vectorstore():
-    """Build FAISS vector store from MODS.csv"""
-    print("Loading MODS.csv...")
-    
-    if not os.path.exists(MODS_CSV_PATH):
-        raise FileNotFoundError(f"MODS.csv not found at {MODS_CSV_PATH}")
-    
-    # Load CSV
-    df = pd.read_csv(MODS_CSV_PATH)
-    print(f"Loaded {len(df)} rows from MODS.csv")
-    
-    # Initialize embeddings
-    print("Initializing embeddings...")
-    embeddings = OllamaEmbeddings(
-        model=os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text"),
-        base_url=os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434"),
-    )
-    
-    # Create documents
-    print("Creating documents...")
+def build_documents(df: pd.DataFrame) -> list:
+    """Create one Document per MODS.csv row (shared by the FAISS and BM25 indexes)."""
     documents = []
     
     for idx, row in df.iterrows():
@@ -123,24 +127,249 @@ def build_vectorstore():
         if (idx + 1) % 100 == 0:
             print(f"Processed {idx + 1} rows...")
     
-    print(f"Created {len(documents)} documents")
+    return documents
+
+
+def load_mods_csv() -> pd.DataFrame:
+    if not os.path.exists(MODS_CSV_PATH):
+        raise FileNotFoundError(f"MODS.csv not found at {MODS_CSV_PATH}")
+    return pd.read_csv(MODS_CSV_PATH)
+
+
+def build_bm25_index(documents: list, directory: str) -> None:
+    """Build the lexical (BM25) index over the same documents and save it next to the FAISS index."""
+    print("Creating BM25 index...")
+    path = BM25Index.build(documents).save(Path(directory))
+    print(f"   BM25 index: {path}")
+
+
+def rebuild_bm25_only() -> None:
+    """
+    Refresh only the BM25 index (no embeddings): the live store's other files go into a new version
+    with the new BM25 index, which is then published like a full build. The live version is never written.
+    """
+    root = Path(VECTORSTORE_DIR)
+    version = clone_live_version(root)
+    try:
+        build_bm25_index(build_documents(load_mods_csv()), str(version))
+    except Exception:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+    publish_version(root, version)
+
+
+def document_ids(documents: list) -> List[str]:
+    """
+    Content-addressed ids: sha1 of the embedded text + metadata (minus the row position).
+    Unchanged rows keep their id across CSV reloads even if they move; exact duplicates get a #n suffix.
+    """
+    ids: List[str] = []
+    seen: Dict[str, int] = {}
+    for doc in documents:
+        md = {k: v for k, v in doc.metadata.items() if k != "row"}
+        payload = json.dumps({"text": doc.page_content, "metadata": md}, sort_keys=True, ensure_ascii=False)
+        h = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+        n = seen.get(h, 0)
+        seen[h] = n + 1
+        ids.append(h if n == 0 else f"{h}#{n}")
+    return ids
+
+
+def _read_manifest(directory: str) -> Dict[str, Any]:
+    p = os.path.join(directory, MANIFEST_FILENAME)
+    if not os.path.exists(p):
+        return {}
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _resolve_index_type(
+    index_type: Optional[str], ann_params: Optional[Dict[str, Any]], manifest: Dict[str, Any]
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Index type: argument, else FAISS_INDEX_TYPE, else the live manifest's, else flat (params likewise)."""
+    index_type = (index_type or os.getenv("FAISS_INDEX_TYPE") or manifest.get("index_type") or "flat").strip().lower()
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {', '.join(INDEX_TYPES)}")
+    if not ann_params and index_type == manifest.get("index_type"):
+        ann_params = manifest.get("ann_params") or None
+    return index_type, ann_params
+
+
+def build_vectorstore(
+    full: bool = False,
+    progress_cb: Optional[Callable[[int, str], None]] = None,
+    index_type: Optional[str] = None,
+    ann_params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Build or update the FAISS vector store (and the BM25 index) from MODS.csv.
+
+    Incremental by default: each document has a content-hash id, and ids are compared with the existing
+    index. Only new/changed rows are embedded (in batches), removed rows are deleted (FAISS remove_ids),
+    and moved rows only get their `row` metadata updated. The result is written to a new version directory
+    and published by replacing the store's CURRENT pointer. A full rebuild happens with full=True, when no index exists, or when the embedding model changed.
+
+    index_type (FAISS_INDEX_TYPE, else the live store's type, else flat): with hnsw / ivfpq an ANN index
+    (index_ann.faiss) is also built from the flat vectors with `ann_params` (see app/services/ann_index.py);
+    workers load it instead. Without explicit params, a rebuild of the live type keeps the live params, so
+    a rebuild triggered by ingest does not silently drop the ANN index or its tuning.
+
+    progress_cb(percent, message) is called as work proceeds (used by the ingest job).
+    """
+    live_dir = str(current_store_dir(Path(VECTORSTORE_DIR)))
+    manifest = _read_manifest(live_dir)
+    index_type, ann_params = _resolve_index_type(index_type, ann_params, manifest)
+    def _progress(pct: int, msg: str) -> None:
+        print(msg)
+        if progress_cb:
+            progress_cb(pct, msg)
+
+    _progress(1, "Loading MODS.csv...")
     
-    # Create vector store
-    print("Creating FAISS vector store...")
-    vectorstore = FAISS.from_documents(documents, embeddings)
+    # Load CSV
+    df = load_mods_csv()
+    print(f"Loaded {len(df)} rows from MODS.csv")
     
-    # Save vector store
-    print(f"Saving vector store to {VECTORSTORE_DIR}...")
-    vectorstore.save_local(VECTORSTORE_DIR)
+    # Initialize embeddings
+    print("Initializing embeddings...")
+    embed_model = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+    embeddings = OllamaEmbeddings(
+        model=embed_model,
+        base_url=os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434"),
+    )
+    
+    # Create documents
+    _progress(3, "Creating documents...")
+    documents = build_documents(df)
+    ids = document_ids(documents)
+    print(f"Created {len(documents)} documents")
+
+    vectorstore = None
+    can_update = (
+        not full
+        and os.path.exists(os.path.join(live_dir, "index.faiss"))
+        and manifest.get("embed_model") == embed_model
+    )
+    if can_update:
+        vectorstore = FAISS.load_local(live_dir, embeddings, allow_dangerous_deserialization=True)
+
+    existing = set(vectorstore.index_to_docstore_id.values()) if vectorstore is not None else set()
+    wanted = set(ids)
+    to_remove = sorted(existing - wanted)
+    to_add = [i for i, doc_id in enumerate(ids) if doc_id not in existing]
+    _progress(
+        5,
+        f"{'Updating' if vectorstore is not None else 'Creating'} FAISS vector store: "
+        f"{len(to_add)} to embed, {len(to_remove)} to delete, {len(wanted & existing)} unchanged",
+    )
+
+    if vectorstore is not None:
+        if to_remove:
+            vectorstore.delete(to_remove)
+        # Unchanged documents may have moved in the CSV; keep df.iloc hydration correct.
+        for i, doc_id in enumerate(ids):
+            if doc_id in existing:
+                stored = vectorstore.docstore.search(doc_id)
+                if isinstance(stored, Document):
+                    stored.metadata["row"] = documents[i].metadata["row"]
+
+    # Embed new/changed rows: batched, concurrent, checkpointed (an interrupted run resumes).
+    add_ids = [ids[i] for i in to_add]
+    checkpoint_dir = Path(CHECKPOINTS_DIR) / run_key(embed_model, add_ids)
+    stats = {"docs_per_sec": 0.0}
+
+    def _embed_progress(done: int, total: int, dps: float) -> None:
+        stats["docs_per_sec"] = dps
+        _progress(5 + int(done * 85 / max(1, total)), f"Embedded {done}/{total} documents ({dps:.1f} docs/sec)")
+
+    t0 = time.perf_counter()
+    vectors = embed_texts(
+        embeddings,
+        [documents[i].page_content for i in to_add],
+        checkpoint_dir=checkpoint_dir,
+        progress_cb=_embed_progress,
+    )
+    embed_sec = time.perf_counter() - t0
+
+    add_batch = 1000
+    for start in range(0, len(to_add), add_batch):
+        batch = to_add[start : start + add_batch]
+        pairs = [(documents[i].page_content, vectors[start + j].tolist()) for j, i in enumerate(batch)]
+        metadatas = [documents[i].metadata for i in batch]
+        batch_ids = add_ids[start : start + add_batch]
+        if vectorstore is None:
+            vectorstore = FAISS.from_embeddings(pairs, embeddings, metadatas=metadatas, ids=batch_ids)
+        else:
+            vectorstore.add_embeddings(pairs, metadatas=metadatas, ids=batch_ids)
+
+    if vectorstore is None:
+        raise RuntimeError("MODS.csv produced no documents to index")
+
+    # Save vector store (new version directory, then publish)
+    tmp_dir = str(new_version_dir(Path(VECTORSTORE_DIR)))
+    _progress(92, f"Saving vector store to {tmp_dir}...")
+    vectorstore.save_local(tmp_dir)
+    manifest_out: Dict[str, Any] = {"embed_model": embed_model, "documents": len(ids), "index_type": index_type}
+    if index_type != "flat":
+        # Same vectors, same order as the flat index, so index.pkl's position -> id mapping applies to both.
+        _progress(93, f"Building {index_type} ANN index...")
+        ann, params = build_ann_index(flat_vectors(vectorstore.index), index_type, ann_params)
+        write_index(ann, Path(tmp_dir) / ANN_FILENAME)
+        manifest_out["ann_params"] = params
+    build_bm25_index(documents, tmp_dir)
+    with open(os.path.join(tmp_dir, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest_out, f)
+    publish_version(Path(VECTORSTORE_DIR), Path(tmp_dir))
+    clear_checkpoints(checkpoint_dir)
     
     print("✅ Vector store created successfully!")
-    print(f"   Location: {VECTORSTORE_DIR}")
+    print(f"   Location: {tmp_dir}")
     print(f"   Documents: {len(documents)}")
+    print(f"   Embedded: {len(to_add)} in {embed_sec:.1f}s ({stats['docs_per_sec']:.1f} docs/sec)")
+    return {
+        "documents": len(documents),
+        "embedded": len(to_add),
+        "deleted": len(to_remove),
+        "unchanged": len(wanted & existing),
+        "incremental": bool(can_update),
+        "index_type": index_type,
+        "embed_seconds": round(embed_sec, 2),
+        "docs_per_sec": round(stats["docs_per_sec"], 2),
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Build the MODS FAISS + BM25 indexes")
+    ap.add_argument("--full", action="store_true", help="re-embed every row (default: incremental)")
+    ap.add_argument("--bm25-only", action="store_true", help="only (re)build the BM25 index, no embeddings")
+    ap.add_argument("--index-type", choices=INDEX_TYPES, default=None, help="ANN index to build next to the flat one")
+    ap.add_argument("--hnsw-m", type=int, dest="m")
+    ap.add_argument("--ef-construction", type=int)
+    ap.add_argument("--ef-search", type=int)
+    ap.add_argument("--nlist", type=int)
+    ap.add_argument("--pq-m", type=int)
+    ap.add_argument("--pq-bits", type=int)
+    ap.add_argument("--nprobe", type=int)
+    return ap.parse_args()
 
 
 if __name__ == "__main__":
+    args = _parse_args()
     try:
-        build_vectorstore()
+        if args.bm25_only:
+            # Lexical index only (no embeddings): adds hybrid retrieval to an existing FAISS store.
+            rebuild_bm25_only()
+        else:
+            # Incremental by default; --full re-embeds every row.
+            params = {
+                k: getattr(args, k)
+                for k in ("m", "ef_construction", "ef_search", "nlist", "pq_m", "pq_bits", "nprobe")
+                if getattr(args, k) is not None
+            }
+            build_vectorstore(full=args.full, index_type=args.index_type, ann_params=params)
     except Exception as e:
         print(f"❌ Error: {e}")
         sys.exit(1)
@@ -11,6 +11,7 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from app.services.retriever_service import retrieval_mode, set_retrieval_mode  # noqa: E402
 from app.services.router_service import rag_retrieve  # noqa: E402
 
 
@@ -41,13 +42,7 @@ def _hit(expected: List[str], occs: Any) -> bool:
     return False
 
 
-def main() -> int:
-    k = int(os.getenv("RAG_K", "5"))
-    items = _load()
-    if not items:
-        print(f"No golden file found at {GOLDEN}. Generate one with: python scripts/generate_golden_rag.py")
-        return 1
-
+def _evaluate(items: List[Dict[str, Any]], k: int, label: str) -> None:
     hits = 0
     total = 0
     times: List[float] = []
@@ -67,14 +62,30 @@ def main() -> int:
             misses.append((str(it.get("id")), q, list(exp)))
 
     recall = hits / total if total else 0.0
-    print(f"golden_items: {total}")
-    print(f"recall@{k}: {recall:.3f} ({hits}/{total})")
+    print(f"\n[{label}] recall@{k}: {recall:.3f} ({hits}/{total})")
     if times:
-        print(f"retrieval_ms: avg={sum(times)/len(times):.1f}  max={max(times):.1f}")
+        ts = sorted(times)
+        p95 = ts[int(0.95 * (len(ts) - 1))]
+        print(f"[{label}] retrieval_ms: avg={sum(times)/len(times):.1f}  p95={p95:.1f}  max={max(times):.1f}")
     if misses:
         print(f"misses: {len(misses)} (showing up to 10)")
         for mid, q, exp in misses[:10]:
             print(f"- {mid} expected={exp} query={q[:120]}")
+
+
+def main() -> int:
+    k = int(os.getenv("RAG_K", "5"))
+    items = _load()
+    if not items:
+        print(f"No golden file found at {GOLDEN}. Generate one with: python scripts/generate_golden_rag.py")
+        return 1
+
+    modes = [m.strip().lower() for m in os.getenv("RAG_MODES", "").split(",") if m.strip()]
+    print(f"golden_items: {len(items)}")
+    for mode in modes or [None]:
+        if mode:
+            set_retrieval_mode(mode)
+        _evaluate(items, k, retrieval_mode())
     return 0
 
 
@@ -14,6 +14,7 @@ if str(ROOT) not in sys.path:
 
 from app.database import SessionLocal
 from app.models.dbmodels import MODSOccurrence
+from app.services.retriever_service import retrieval_mode, set_retrieval_mode
 from app.services.router_service import rag_retrieve
 
 
@@ -50,6 +51,8 @@ def main() -> int:
         except Exception:
             continue
     ks = [k for k in ks if k > 0] or [5]
+    # Compare retrieval modes (latency vs recall), e.g. RAG_MODES=vector,bm25,hybrid
+    modes = [m.strip().lower() for m in os.getenv("RAG_MODES", "").split(",") if m.strip()]
 
     db = SessionLocal()
     try:
@@ -93,24 +96,35 @@ def main() -> int:
             recall = (hits / total) if total else 0.0
             avg_ms = sum(times_ms) / len(times_ms) if times_ms else 0.0
 
+            times_sorted = sorted(times_ms)
+            p95_ms = times_sorted[int(0.95 * (len(times_sorted) - 1))] if times_sorted else 0.0
+
             print(f"\n[{template_name}] recall@{k}: {recall:.3f} ({hits}/{total})")
-            print(f"[{template_name}] retrieval_time_ms: avg={avg_ms:.1f}  max={max(times_ms) if times_ms else 0.0:.1f}")
+            print(
+                f"[{template_name}] retrieval_time_ms: avg={avg_ms:.1f}  p95={p95_ms:.1f}  "
+                f"max={max(times_ms) if times_ms else 0.0:.1f}"
+            )
             if misses:
                 print(f"[{template_name}] misses: {len(misses)} (showing up to 10)")
                 for m in misses[:10]:
                     print(f"- {m['mods_id']}: {m['english_name']}")
 
-    _run(
-        "name+mods_id",
-        lambda mods_id, english_name: f"Tell me about {english_name}. MODS ID: {mods_id}.",
-    )
-    _run(
-        "name_only",
-        lambda _mods_id, english_name: f"Tell me about {english_name}.",
-    )
+    for mode in modes or [None]:
+        if mode:
+            set_retrieval_mode(mode)
+        label = retrieval_mode()
+        _run(
+            f"{label} name+mods_id",
+            lambda mods_id, english_name: f"Tell me about {english_name}. MODS ID: {mods_id}.",
+        )
+        _run(
+            f"{label} name_only",
+            lambda _mods_id, english_name: f"Tell me about {english_name}.",
+        )
 
     print("\nNotes:")
-    print("- This tests retrieval (FAISS) only; it does not evaluate the LLM answer quality.")
+    print("- This tests retrieval (FAISS/BM25/hybrid) only; it does not evaluate the LLM answer quality.")
+    print("- Set RAG_MODES=vector,bm25,hybrid to compare modes; tune fusion with RAG_VECTOR_WEIGHT / RAG_BM25_WEIGHT / RAG_RRF_K.")
     print("- If recall is low, try rebuilding the vectorstore or tuning chunking/metadata in build_vectorstore.py.")
     return 0
 
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List
+
+import pytest
+
+from app.services import agent_service
+from app.services.agent_service import _agent_tool_calls
+
+
+class _FakeSession:
+    opened = 0
+
+    def __init__(self) -> None:
+        type(self).opened += 1
+
+    def execute(self, *args: Any, **kwargs: Any) -> None:
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+def test_agent_tool_calls_accepts_single_and_batched_actions():
+    assert _agent_tool_calls(None) == []
+    assert _agent_tool_calls({}) == []
+    assert _agent_tool_calls({"action": "search_mods", "args": {}}) == [{"action": "search_mods", "args": {}}]
+    batched = {"actions": [{"action": "search_mods", "args": {}}, "junk", {"args": {}}, {"action": "rag", "args": {}}]}
+    assert [c["action"] for c in _agent_tool_calls(batched)] == ["search_mods", "rag"]
+    assert _agent_tool_calls({"actions": []}) == []
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    """run_agent with scripted LLM replies and in-memory tools; returns (run, replies, calls)."""
+    replies: List[Any] = []
+    calls: List[tuple] = []
+
+    def fake_llm(prompt: str, **kwargs: Any) -> str:
+        reply = replies.pop(0) if replies else {"action": "final", "answer": "done"}
+        return reply if isinstance(reply, str) else json.dumps(reply)
+
+    def fake_search(db: Any, **args: Any):
+        calls.append(("search_mods", args.get("commodity")))
+        return []
+
+    def fake_breakdown(db: Any, **args: Any):
+        calls.append(("importance_breakdown", args.get("commodity")))
+        return [{"occurrence_importance": "High", "count": 3}]
+
+    monkeypatch.setenv("QUERY_PARSER_DISABLE", "1")
+    monkeypatch.setenv("AGENT_DEBUG_TRACE", "1")
+    monkeypatch.delenv("AGENT_MAX_TOOL_CALLS", raising=False)
+    monkeypatch.setattr(agent_service, "generate_response", fake_llm)
+    monkeypatch.setattr(agent_service, "rag_retrieve", lambda query, k=6: ("", []))
+    monkeypatch.setattr(agent_service, "prefetch_rag", lambda query, k=6: None)
+    monkeypatch.setattr(agent_service, "audit_log", lambda *args, **kwargs: None)
+    monkeypatch.setattr(agent_service, "SessionLocal", _FakeSession)
+    monkeypatch.setattr(agent_service, "_tool_search_mods", fake_search)
+    monkeypatch.setattr(agent_service, "_tool_importance_breakdown", fake_breakdown)
+    _FakeSession.opened = 0
+
+    def run(max_steps: int = 3):
+        return agent_service.run_agent(_FakeSession(), "zzz tell me about gold", max_steps=max_steps)
+
+    return run, replies, calls
+
+
+def _call(action: str, **args: Any) -> Dict[str, Any]:
+    return {"action": action, "args": args}
+
+
+def test_batched_step_runs_each_distinct_call_once(agent):
+    run, replies, calls = agent
+    replies.append(
+        {
+            "actions": [
+                _call("search_mods", commodity="Gold"),
+                _call("importance_breakdown", commodity="Gold"),
+                _call("importance_breakdown", commodity="Copper"),  # same artifact in the same step
+                _call("search_mods", commodity="Gold"),  # repeated call
+            ]
+        }
+    )
+    replies.append(_call("search_mods", commodity="Gold"))  # looping: nothing new, forces the final answer
+
+    answer, trace, _occs, artifacts = run()
+
+    assert sorted(calls) == [("importance_breakdown", "Gold"), ("search_mods", "Gold")]
+    assert _FakeSession.opened == 1 + 2  # the request session + one per concurrent call
+    assert answer.startswith("Occurrence importance breakdown:")
+    assert artifacts["importance_breakdown"] == [{"occurrence_importance": "High", "count": 3}]
+    tools = [t["tool"] for t in trace]
+    assert tools.count("redundant_tool_call") == 1
+    assert tools.count("loop_detected") == 2
+    assert all("elapsed_ms" in t for t in trace if t["tool"] in ("search_mods", "importance_breakdown"))
+
+
+def test_calls_per_step_are_capped(agent, monkeypatch):
+    run, replies, calls = agent
+    monkeypatch.setenv("AGENT_MAX_TOOL_CALLS", "2")
+    replies.append({"actions": [_call("search_mods", commodity=c) for c in ("Gold", "Copper", "Zinc")]})
+
+    run(max_steps=1)
+
+    assert calls == [("search_mods", "Gold"), ("search_mods", "Copper")]  # occurrence searches keep their order
+
+
+def test_single_call_runs_on_the_request_session(agent):
+    run, replies, calls = agent
+    replies.append(_call("search_mods", commodity="Gold"))
+
+    answer, trace, _occs, _artifacts = run()
+
+    assert calls == [("search_mods", "Gold")]
+    assert _FakeSession.opened == 1
+    assert answer == "done"
+
+
+def test_final_next_to_tool_calls_is_ignored(agent):
+    run, replies, calls = agent
+    replies.append({"actions": [{"action": "final", "answer": "guess"}, _call("search_mods", commodity="Gold")]})
+
+    answer, _trace, _occs, _artifacts = run()
+
+    assert calls == [("search_mods", "Gold")]
+    assert answer == "done"
+
+
+def test_step_of_unknown_tools_returns_the_model_reply(agent):
+    run, replies, calls = agent
+    replies.append({"actions": [_call("drill_hole"), _call("teleport")]})
+
+    answer, trace, _occs, _artifacts = run()
+
+    assert calls == []
+    assert [t["tool"] for t in trace] == ["unknown", "unknown"]
+    assert "drill_hole" in answer
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict
+
+from shapely.geometry import mapping, shape
+
+from app.services import agent_service
+
+
+class _FakeSession:
+    def execute(self, *args: Any, **kwargs: Any) -> None:
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+def _square(x0: float, y0: float, size: float) -> Dict[str, Any]:
+    return {
+        "type": "Polygon",
+        "coordinates": [[[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size], [x0, y0]]],
+    }
+
+
+def test_workflow_buffer_then_overlay(monkeypatch):
+    plan = {
+        "plan": [
+            {"action": "spatial_buffer", "args": {"geometry": _square(46.0, 24.0, 1.0), "distance_m": 1000.0}},
+            {"action": "spatial_overlay", "args": {"op": "intersection", "geometry_ref": "buffer", "b": _square(46.5, 24.5, 1.0)}},
+        ]
+    }
+
+    def fake_llm(prompt: str, **kwargs: Any) -> str:
+        return json.dumps(plan) if "workflow planner" in prompt else "LLM error: offline"
+
+    def fake_buffer(db: Any, geometry: Dict[str, Any], distance_m: float) -> Dict[str, Any]:
+        # PostGIS-free stand-in: buffer in degrees.
+        return {"geometry": mapping(shape(geometry).buffer(distance_m / 100000.0))}
+
+    monkeypatch.setattr(agent_service, "generate_response", fake_llm)
+    monkeypatch.setattr(agent_service, "rag_retrieve", lambda query, k=6: ("", []))
+    monkeypatch.setattr(agent_service, "prefetch_rag", lambda query, k=6: None)
+    monkeypatch.setattr(agent_service, "audit_log", lambda *args, **kwargs: None)
+    monkeypatch.setattr(agent_service, "SessionLocal", _FakeSession)
+    monkeypatch.setattr(agent_service, "_tool_spatial_buffer", fake_buffer)
+
+    _answer, steps, trace, _occs, artifacts = agent_service.run_workflow(
+        _FakeSession(), "zzz custom geometry plan", max_steps=4, use_llm=True
+    )
+
+    assert [s["action"] for s in steps] == ["spatial_buffer", "spatial_overlay"]
+    assert not [t for t in trace if t.get("error")], trace
+    overlay = shape(artifacts["overlay_geometry"])
+    assert overlay.geom_type == "Polygon"
+    # Intersection of the buffered square with the offset square: a ~0.51 x 0.51 degree patch.
+    assert 0.25 < overlay.area < 0.27
+
+
+def _occ(i: int):
+    from app.models.schemas import OccurrenceInfo
+
+    return OccurrenceInfo(
+        mods_id=f"MODS {i:05d}", english_name=f"Site {i}", major_commodity="Gold", longitude=46.0, latitude=24.0,
+        admin_region="Riyadh Region",
+    )
+
+
+def test_parsed_search_does_not_present_the_limit_as_a_count(monkeypatch):
+    from app.services.query_parser import ParsedQuery
+
+    monkeypatch.setattr(agent_service, "_tool_search_mods", lambda db, limit=25, **kw: [_occ(i) for i in range(limit)])
+    parsed = ParsedQuery(intent="list", tool="search_mods", args={"commodity": "Gold", "limit": 25}, coverage=1.0)
+    answer, occs = agent_service._answer_parsed_query(_FakeSession(), parsed, [], {})
+    assert answer.startswith("Showing the first 25 matching Gold occurrences (there may be more):")
+    assert len(occs) == 25
+
+    monkeypatch.setattr(agent_service, "_tool_search_mods", lambda db, limit=25, **kw: [_occ(i) for i in range(3)])
+    answer, _ = agent_service._answer_parsed_query(_FakeSession(), parsed, [], {})
+    assert answer.startswith("Found 3 Gold occurrences:")
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import pytest
+
+from scripts.build_vectorstore import _resolve_index_type
+
+LIVE = {"embed_model": "m", "documents": 10, "index_type": "hnsw", "ann_params": {"m": 48, "ef_search": 96}}
+
+
+def test_rebuild_without_a_type_keeps_the_live_index_and_params(monkeypatch):
+    monkeypatch.delenv("FAISS_INDEX_TYPE", raising=False)
+    assert _resolve_index_type(None, None, LIVE) == ("hnsw", {"m": 48, "ef_search": 96})
+    assert _resolve_index_type(None, {}, LIVE) == ("hnsw", {"m": 48, "ef_search": 96})
+
+
+def test_explicit_type_or_params_win_over_the_live_manifest(monkeypatch):
+    monkeypatch.delenv("FAISS_INDEX_TYPE", raising=False)
+    assert _resolve_index_type("ivfpq", None, LIVE) == ("ivfpq", None)
+    assert _resolve_index_type("hnsw", {"m": 16}, LIVE) == ("hnsw", {"m": 16})
+    monkeypatch.setenv("FAISS_INDEX_TYPE", "flat")
+    assert _resolve_index_type(None, None, LIVE) == ("flat", None)
+
+
+def test_defaults_to_flat_without_a_live_store(monkeypatch):
+    monkeypatch.delenv("FAISS_INDEX_TYPE", raising=False)
+    assert _resolve_index_type(None, None, {}) == ("flat", None)
+    with pytest.raises(ValueError):
+        _resolve_index_type("lsh", None, {})
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import threading
+from typing import List
+
+import numpy as np
+import pytest
+
+from app.services.embedding_pipeline import embed_texts, run_key
+
+
+class _FakeEmbeddings:
+    """Deterministic 2-d vectors; fails once `fail_after` texts have been embedded (simulates an interruption)."""
+
+    def __init__(self, fail_after: int | None = None):
+        self.fail_after = fail_after
+        self.embedded: List[str] = []
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]):
+        with self._lock:
+            if self.fail_after is not None and len(self.embedded) + len(texts) > self.fail_after:
+                raise ConnectionError("embedding server went away")
+            self.embedded.extend(texts)
+        return [[float(t[1:]), 1.0] for t in texts]
+
+
+TEXTS = [f"t{i}" for i in range(10)]
+EXPECTED = np.array([[float(i), 1.0] for i in range(10)], dtype="float32")
+
+
+def test_embeds_in_input_order_without_checkpoints():
+    fake = _FakeEmbeddings()
+    out = embed_texts(fake, TEXTS, batch_size=3, concurrency=3, retries=0)
+    assert out.dtype == np.float32
+    np.testing.assert_array_equal(out, EXPECTED)
+    assert sorted(fake.embedded) == sorted(TEXTS)
+
+
+def test_interrupted_run_resumes_from_checkpoints(tmp_path):
+    first = _FakeEmbeddings(fail_after=6)
+    with pytest.raises(ConnectionError):
+        embed_texts(first, TEXTS, checkpoint_dir=tmp_path, batch_size=3, concurrency=1, retries=0)
+    assert first.embedded == TEXTS[:6]
+
+    second = _FakeEmbeddings()
+    progress = []
+    out = embed_texts(
+        second,
+        TEXTS,
+        checkpoint_dir=tmp_path,
+        batch_size=3,
+        concurrency=1,
+        retries=0,
+        progress_cb=lambda done, total, dps: progress.append((done, total)),
+    )
+    np.testing.assert_array_equal(out, EXPECTED)
+    assert second.embedded == TEXTS[6:]
+    assert progress[0] == (6, 10)
+    assert progress[-1] == (10, 10)
+
+
+def test_checkpoints_of_another_batch_size_are_not_reused(tmp_path):
+    embed_texts(_FakeEmbeddings(), TEXTS, checkpoint_dir=tmp_path, batch_size=4, concurrency=1, retries=0)
+
+    # The last batch of size 4 holds rows 8-9: batch 2 of size 2 (rows 4-5) has the same length but must not
+    # reuse it, while batch 4 (rows 8-9) covers exactly those rows and does.
+    fake = _FakeEmbeddings()
+    out = embed_texts(fake, TEXTS, checkpoint_dir=tmp_path, batch_size=2, concurrency=2, retries=0)
+    np.testing.assert_array_equal(out, EXPECTED)
+    assert sorted(fake.embedded) == TEXTS[:8]
+
+
+def test_failing_batch_is_retried(monkeypatch):
+    monkeypatch.setattr("app.services.embedding_pipeline.time.sleep", lambda s: None)
+    calls = {"n": 0}
+
+    class Flaky:
+        def embed_documents(self, texts):
+            calls["n"] += 1
+            if calls["n"] == 1:
+                raise ConnectionError("blip")
+            return [[1.0] for _ in texts]
+
+    out = embed_texts(Flaky(), ["a", "b"], batch_size=2, concurrency=1, retries=2)
+    assert out.shape == (2, 1)
+    assert calls["n"] == 2
+
+
+def test_run_key_depends_on_model_and_ordered_ids():
+    assert run_key("m", ["a", "b"]) == run_key("m", ["a", "b"])
+    assert run_key("m", ["a", "b"]) != run_key("m", ["b", "a"])
+    assert run_key("m", ["a", "b"]) != run_key("other", ["a", "b"])
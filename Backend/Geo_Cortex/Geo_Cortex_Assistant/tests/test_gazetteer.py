@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import pytest
+
+from app.services.gazetteer import Gazetteer
+
+
+@pytest.fixture(scope="module")
+def gazetteer() -> Gazetteer:
+    return Gazetteer(
+        {
+            "region": ["Riyadh Region", "Asir Region"],
+            "commodity": ["Gold", "Lead", "Zinc", "Iron", "Silica Sand", "Sand"],
+            "exploration_status": ["Prospect"],
+            "occurrence_type": ["Metallic"],
+            "importance": ["High"],
+        }
+    )
+
+
+def test_extracts_every_kind_in_one_pass(gazetteer):
+    out = gazetteer.extract("high importance gold prospects in riyadh and aseer")
+    assert out["commodity"] == ["Gold"]
+    assert out["region"] == ["Riyadh Region", "Asir Region"]
+    assert out["exploration_status"] == ["Prospect"]
+    assert out["importance"] == ["High"]
+
+
+def test_longest_term_wins_and_arabic_matches(gazetteer):
+    assert gazetteer.extract("silica sand quarries")["commodity"] == ["Silica Sand"]
+    assert gazetteer.extract("مواقع الذهب في الرياض")["commodity"] == ["Gold"]
+    assert gazetteer.extract("golden")["commodity"] == []  # whole words only
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("lead me to gold", ["Gold"]),
+        ("lead the way to gold prospects", ["Gold"]),
+        ("what could iron out these zinc numbers", ["Zinc"]),
+        ("lead and zinc deposits in asir", ["Lead", "Zinc"]),
+        ("lead occurrences in riyadh", ["Lead"]),
+        ("where is lead", ["Lead"]),
+        ("iron in asir", ["Iron"]),
+        ("رصاص في عسير", ["Lead"]),
+    ],
+)
+def test_commodity_words_used_as_verbs_are_not_commodities(gazetteer, query, expected):
+    assert gazetteer.extract(query)["commodity"] == expected
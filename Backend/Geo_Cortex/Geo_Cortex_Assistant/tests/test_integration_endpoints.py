@@ -20,6 +20,7 @@ def _req(method: str, path: str, json_body: Optional[Dict[str, Any]] = None) ->
     [
         ("GET", "/health"),
         ("GET", "/version"),
+        ("GET", "/metrics"),
         ("GET", "/meta/regions"),
         ("GET", "/meta/commodities"),
         ("GET", "/occurrences/mods/search?commodity=Gold&limit=3"),
@@ -71,6 +72,23 @@ def test_agent_fast_path():
     assert "response" in j
 
 
+def test_agent_fast_path_gazetteer_arabic():
+    r = _req("POST", "/agent/", {"query": "اعرض مناجم الذهب في منطقة المدينة المنورة", "max_steps": 1})
+    assert 200 <= r.status_code < 300, r.text[:500]
+    trace = r.json()["tool_trace"]
+    assert trace and trace[0]["tool"] == "auto_geojson_export"
+    assert trace[0]["args"]["commodity"] == "Gold" and "Madinah" in trace[0]["args"]["region"]
+
+
+def test_agent_parsed_count_query():
+    r = _req("POST", "/agent/", {"query": "How many copper mines in Asir?", "max_steps": 3})
+    assert 200 <= r.status_code < 300, r.text[:500]
+    trace = r.json()["tool_trace"]
+    assert trace and trace[0]["tool"] == "importance_breakdown"
+    assert trace[0]["parsed"]["intent"] == "count"
+    assert trace[0]["args"]["commodity"] == "Copper" and trace[0]["args"]["exploration_status"] == "mine"
+
+
 def test_agent_workflow_endpoint():
     r = _req("POST", "/agent/workflow", {"query": "Run QC summary", "max_steps": 3, "use_llm": False})
     assert 200 <= r.status_code < 300, r.text[:500]
@@ -78,6 +96,38 @@ def test_agent_workflow_endpoint():
     assert "plan" in j
 
 
+def test_agent_workflow_parallel_steps_timed():
+    r = _req(
+        "POST",
+        "/agent/workflow",
+        {"query": "QC summary, top commodities by region and importance", "max_steps": 6, "use_llm": False},
+    )
+    assert 200 <= r.status_code < 300, r.text[:500]
+    j = r.json()
+    assert len(j["plan"]) >= 3
+    tools = {t["tool"] for t in j["tool_trace"]}
+    assert {"qc_summary", "commodity_stats", "stats_by_region"} <= tools
+    assert all(t.get("elapsed_ms") is not None for t in j["tool_trace"])
+
+
+def test_agent_workflow_repeat_uses_tool_cache():
+    body = {"query": "Counts by region", "max_steps": 3, "use_llm": False}
+    _req("POST", "/agent/workflow", body)
+    r = _req("POST", "/agent/workflow", body)
+    assert 200 <= r.status_code < 300, r.text[:500]
+    trace = r.json()["tool_trace"]
+    assert any(t["tool"] == "stats_by_region" and t.get("cached") for t in trace)
+
+
+def test_agent_workflow_stream():
+    r = _req("POST", "/agent/workflow/stream", {"query": "Run QC summary", "max_steps": 3, "use_llm": False})
+    assert 200 <= r.status_code < 300, r.text[:500]
+    assert "text/event-stream" in (r.headers.get("content-type") or "")
+    events = [line[len("event: ") :] for line in r.text.splitlines() if line.startswith("event: ")]
+    assert "tool" in events
+    assert events[-1] == "result"
+
+
 def test_spatial_intersects():
     poly = {
         "type": "Polygon",
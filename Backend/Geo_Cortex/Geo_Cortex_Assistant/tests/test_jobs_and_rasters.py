@@ -36,3 +36,51 @@ def test_raster_upload_creates_job_and_job_endpoint_works():
 def test_raster_tile_endpoint_exists_returns_404_for_missing_raster():
     r = requests.get(f"{BASE_URL}/rasters/does-not-exist/tiles/0/0/0.png", timeout=TIMEOUT_SEC)
     assert r.status_code == 404
+
+
+def test_raster_export_tiles_returns_404_for_missing_raster():
+    r = requests.post(
+        f"{BASE_URL}/rasters/does-not-exist/export-tiles",
+        json={"min_zoom": 4, "max_zoom": 6, "format": "mbtiles"},
+        timeout=TIMEOUT_SEC,
+    )
+    assert r.status_code == 404
+
+
+def test_job_download_returns_404_for_missing_job():
+    r = requests.get(f"{BASE_URL}/jobs/does-not-exist/download", timeout=TIMEOUT_SEC)
+    assert r.status_code == 404
+
+
+def test_raster_clip_returns_404_for_missing_raster():
+    r = requests.post(
+        f"{BASE_URL}/rasters/does-not-exist/clip",
+        json={"geometry": {"type": "Polygon", "coordinates": [[[44, 25], [45, 25], [45, 26], [44, 25]]]}},
+        timeout=TIMEOUT_SEC,
+    )
+    assert r.status_code == 404
+
+
+def test_raster_sample_occurrences_returns_404_for_missing_raster():
+    r = requests.post(f"{BASE_URL}/rasters/does-not-exist/sample-occurrences", json={"band": 1}, timeout=TIMEOUT_SEC)
+    assert r.status_code == 404
+
+
+def test_stats_raster_values_empty_for_unsampled_raster():
+    r = requests.get(f"{BASE_URL}/stats/raster-values?raster_id=does-not-exist", timeout=TIMEOUT_SEC)
+    assert r.status_code == 200
+    assert r.json() == []
+
+
+def test_raster_profile_returns_404_for_missing_raster():
+    r = requests.post(
+        f"{BASE_URL}/rasters/does-not-exist/profile",
+        json={"geometry": {"type": "LineString", "coordinates": [[44.5, 23.0], [45.5, 23.7]]}, "spacing_m": 500},
+        timeout=TIMEOUT_SEC,
+    )
+    assert r.status_code == 404
+
+
+def test_raster_zonal_regions_returns_404_for_missing_raster():
+    r = requests.get(f"{BASE_URL}/rasters/does-not-exist/zonal-stats/regions", timeout=TIMEOUT_SEC)
+    assert r.status_code == 404
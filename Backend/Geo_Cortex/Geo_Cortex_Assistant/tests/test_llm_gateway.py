@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.routers import llm as llm_router
+from app.services import llm_service
+from app.services.llm_gateway import LLMBusyError, LLMGateway
+
+
+class _FakeLLM:
+    """Stands in for the Ollama client: counts calls in flight and optionally blocks until released."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.release = threading.Event()
+        self.entered = threading.Event()
+        self.block = False
+        self.active = 0
+        self.peak = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    async def chat(self, messages, format=None) -> str:
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        self.entered.set()
+        try:
+            if self.block:
+                while not self.release.is_set():
+                    await asyncio.sleep(0.01)
+            else:
+                await asyncio.sleep(self.delay)
+            return "answer"
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _wait_for(predicate, timeout: float = 2.0) -> None:
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "condition not reached in time"
+        time.sleep(0.005)
+
+
+# ---------------------------------------------------------------- gateway
+
+
+def test_gateway_caps_concurrency_and_queues_the_rest():
+    gw = LLMGateway(concurrency=2, queue_max=8)
+    fake = _FakeLLM(delay=0.1)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda _: gw.run(lambda: fake.chat([]), 5.0), range(6)))
+    assert results == ["answer"] * 6
+    assert fake.peak == 2
+    stats = gw.stats()
+    assert stats["completed"] == 6
+    assert stats["running"] == 0 and stats["waiting"] == 0
+
+
+def test_gateway_rejects_when_slots_and_queue_are_full():
+    gw = LLMGateway(concurrency=1, queue_max=1)
+    fake = _FakeLLM()
+    fake.block = True
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(gw.run, lambda: fake.chat([]), 5.0)
+        _wait_for(fake.entered.is_set)
+        second = pool.submit(gw.run, lambda: fake.chat([]), 5.0)
+        _wait_for(lambda: gw.stats()["waiting"] == 1)
+        with pytest.raises(LLMBusyError):
+            gw.run(lambda: fake.chat([]), 5.0)
+        fake.release.set()
+        assert first.result() == "answer"
+        assert second.result() == "answer"
+    assert gw.stats()["rejected"] == 1
+    assert gw.stats()["completed"] == 2
+
+
+def test_gateway_deadline_cancels_the_call_and_frees_the_slot():
+    gw = LLMGateway(concurrency=1, queue_max=0)
+    fake = _FakeLLM()
+    fake.block = True
+    with pytest.raises(TimeoutError):
+        gw.run(lambda: fake.chat([]), 0.1)
+    _wait_for(lambda: gw.stats()["running"] == 0)
+    assert fake.cancelled == 1
+    assert gw.stats()["timeouts"] == 1
+
+    # The slot is free again: the next call is admitted, not rejected.
+    fake.block = False
+    assert gw.run(lambda: fake.chat([]), 1.0) == "answer"
+
+
+def test_gateway_deadline_covers_queue_wait():
+    gw = LLMGateway(concurrency=1, queue_max=1)
+    fake = _FakeLLM()
+    fake.block = True
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(gw.run, lambda: fake.chat([]), 5.0)
+        _wait_for(fake.entered.is_set)
+        with pytest.raises(TimeoutError):
+            gw.run(lambda: fake.chat([]), 0.1)
+        assert gw.stats()["waiting"] == 0
+        fake.release.set()
+        assert first.result() == "answer"
+
+
+def test_gateway_counts_errors():
+    gw = LLMGateway(concurrency=1, queue_max=0)
+
+    async def boom():
+        raise RuntimeError("ollama down")
+
+    with pytest.raises(RuntimeError):
+        gw.run(boom, 1.0)
+    assert gw.stats()["errors"] == 1
+    assert gw.stats()["running"] == 0
+
+
+# ---------------------------------------------------------------- HTTP
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def fake_handle_query(query: str):
+        return llm_service.generate_response(query, use_cache=False), []
+
+    monkeypatch.setenv("LLM_DISABLED", "false")
+    monkeypatch.setattr(llm_router, "handle_query", fake_handle_query)
+
+    app = FastAPI()
+    app.include_router(llm_router.query_router)
+
+    # Same mapping as app.main (which needs a database to import).
+    @app.exception_handler(LLMBusyError)
+    async def _busy(request: Request, exc: LLMBusyError):
+        return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "2"})
+
+    with TestClient(app) as c:
+        yield c
+
+
+def _use(monkeypatch, gw: LLMGateway, fake: _FakeLLM) -> None:
+    monkeypatch.setattr(llm_service, "llm_gateway", gw)
+    monkeypatch.setattr(llm_service, "llm", fake)
+
+
+def test_concurrent_requests_reach_the_gateway_in_parallel(client, monkeypatch):
+    gw = LLMGateway(concurrency=3, queue_max=16)
+    fake = _FakeLLM(delay=0.2)
+    _use(monkeypatch, gw, fake)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        responses = list(pool.map(lambda i: client.post("/query/rag", json={"query": f"q{i}"}), range(6)))
+
+    assert [r.status_code for r in responses] == [200] * 6
+    assert all(r.json()["response"] == "answer" for r in responses)
+    # A blocking async handler would serialize requests on the event loop (peak 1).
+    assert fake.peak == 3
+
+
+def test_full_queue_returns_429_in_reject_mode(client, monkeypatch):
+    monkeypatch.setenv("LLM_BUSY_MODE", "reject")
+    gw = LLMGateway(concurrency=1, queue_max=0)
+    fake = _FakeLLM()
+    fake.block = True
+    _use(monkeypatch, gw, fake)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(client.post, "/query/", json={"query": "slow"})
+        _wait_for(fake.entered.is_set)
+        busy = client.post("/query/", json={"query": "fast"})
+        fake.release.set()
+        assert first.result().status_code == 200
+
+    assert busy.status_code == 429
+    assert busy.headers["Retry-After"] == "2"
+    assert gw.stats()["rejected"] == 1
+
+
+def test_full_queue_answers_with_fallback_by_default(client, monkeypatch):
+    monkeypatch.delenv("LLM_BUSY_MODE", raising=False)
+    gw = LLMGateway(concurrency=1, queue_max=0)
+    fake = _FakeLLM()
+    fake.block = True
+    _use(monkeypatch, gw, fake)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        first = pool.submit(client.post, "/query/", json={"query": "slow"})
+        _wait_for(fake.entered.is_set)
+        busy = client.post("/query/", json={"query": "fast"})
+        fake.release.set()
+        assert first.result().status_code == 200
+
+    assert busy.status_code == 200
+    assert busy.json()["response"].startswith("LLM is busy")
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import pytest
+
+from app.services import agent_service, llm_service
+from app.services.agent_service import _extract_json_object, _parse_llm_json
+from app.services.llm_service import JsonParseStats, structured_format
+
+
+@pytest.fixture
+def stats(monkeypatch) -> JsonParseStats:
+    s = JsonParseStats()
+    monkeypatch.setattr(agent_service, "json_parse_stats", s)
+    return s
+
+
+def test_parsed_and_unparseable_replies_are_counted_per_site(stats):
+    assert _parse_llm_json("agent_step", '{"action": "final", "answer": "ok"}', _extract_json_object) == {
+        "action": "final",
+        "answer": "ok",
+    }
+    assert _parse_llm_json("agent_step", 'Sure! {"action": "rag", "args": {}} hope that helps', _extract_json_object) == {
+        "action": "rag",
+        "args": {},
+    }
+    assert _parse_llm_json("agent_step", "I think the answer is gold.", _extract_json_object) is None
+    assert _parse_llm_json("workflow_plan", "{not json}", _extract_json_object) is None
+
+    out = stats.stats()
+    assert out["agent_step"] == {"parsed": 2, "parse_failures": 1, "llm_failures": 0, "parse_failure_rate": pytest.approx(1 / 3)}
+    assert out["workflow_plan"]["parse_failures"] == 1
+    assert out["workflow_plan"]["parse_failure_rate"] == 1.0
+
+
+@pytest.mark.parametrize(
+    "reply",
+    [
+        "LLM call timed out. If you want fully-offline answers, set LLM_DISABLED=true",
+        "LLM error: connection refused",
+        "LLM is busy (too many concurrent requests). Try again shortly.",
+        "LLM is disabled (LLM_DISABLED=true).",
+    ],
+)
+def test_llm_failures_are_not_parse_failures(stats, reply):
+    calls = []
+
+    def extract(text):
+        calls.append(text)
+        return {"never": "used"}
+
+    assert _parse_llm_json("agent_final", reply, extract) is None
+    assert calls == []
+    assert stats.stats()["agent_final"] == {"parsed": 0, "parse_failures": 0, "llm_failures": 1, "parse_failure_rate": 0.0}
+
+
+def test_stats_report_the_structured_output_mode(monkeypatch):
+    s = JsonParseStats()
+    monkeypatch.setenv("LLM_STRUCTURED_OUTPUT", "JSON")
+    assert s.stats() == {"structured_output": "json"}
+
+
+@pytest.mark.parametrize("mode, expected", [("schema", "schema"), ("json", "json"), ("off", None), (None, "schema")])
+def test_structured_format_modes(monkeypatch, mode, expected):
+    schema = {"type": "object"}
+    if mode is None:
+        monkeypatch.delenv("LLM_STRUCTURED_OUTPUT", raising=False)
+    else:
+        monkeypatch.setenv("LLM_STRUCTURED_OUTPUT", mode)
+    out = structured_format(schema)
+    assert out == (schema if expected == "schema" else expected)
+
+
+def test_module_stats_are_served_by_metrics():
+    from app.services.metrics import metrics
+
+    llm_service.json_parse_stats.record("metrics_probe", "parsed")
+    assert metrics.snapshot()["llm_json"]["metrics_probe"]["parsed"] >= 1
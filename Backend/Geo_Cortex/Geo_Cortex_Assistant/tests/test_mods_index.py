@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import random
+import re
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+import pytest
+
+from app.services.mods_index import ModsIndex, normalize_name
+
+MODS_CSV = Path(__file__).resolve().parents[1] / "MODS.csv"
+
+
+def _baseline_mods_number(df: pd.DataFrame, num: int) -> List[int]:
+    # The scan rag_retrieve used before ModsIndex.
+    nums = (
+        df["MODS"].astype(str).str.extract(r"(\d+)", expand=False).fillna("")
+        .apply(lambda x: int(x) if str(x).isdigit() else -1)
+    )
+    return df.index[nums == num].tolist()
+
+
+def _baseline_name(df: pd.DataFrame, phrase: str) -> List[int]:
+    phrase_u = phrase.upper()
+    phrase_n = normalize_name(phrase)
+    col_u = df["English Name"].fillna("").astype(str).str.strip().str.upper()
+    col_n = col_u.apply(normalize_name)
+    hits = df.index[col_u == phrase_u].tolist()
+    if not hits and phrase_n:
+        hits = df.index[col_n == phrase_n].tolist()
+    if not hits:
+        hits = df.index[col_u.str.contains(re.escape(phrase_u), na=False)].tolist()
+    if not hits and phrase_n:
+        hits = df.index[col_n.str.contains(re.escape(phrase_n), na=False)].tolist()
+    return hits
+
+
+@pytest.fixture(scope="module")
+def small_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "MODS": ["MODS 01909", "MODS 0002", "mods 1909", "n/a", "MODS 12"],
+            "English Name": ["Ad Duh Al Kair  (Al Jamoom)", "Mahd adh Dhahab", "AL-AMAR", None, "Jabal Sayid"],
+        }
+    )
+
+
+def test_mods_number(small_df):
+    index = ModsIndex(small_df)
+    for num in (1909, 2, 12, 3):
+        assert index.rows_for_mods_number(num) == _baseline_mods_number(small_df, num)
+    assert index.rows_for_mods_number(1909) == [0, 2]
+
+
+@pytest.mark.parametrize(
+    "phrase",
+    ["Mahd adh Dhahab", "mahd", "AL AMAR", "al-amar", "(al jamoom)", "al", "Ad", "dh", "Sayid", "zzz", "a.l", "  "],
+)
+def test_name_lookup_matches_str_contains(small_df, phrase):
+    assert ModsIndex(small_df).rows_for_name(phrase) == _baseline_name(small_df, phrase)
+
+
+@pytest.mark.skipif(not MODS_CSV.exists(), reason="MODS.csv not present")
+def test_name_lookup_matches_str_contains_on_mods_csv():
+    df = pd.read_csv(MODS_CSV)
+    index = ModsIndex(df)
+    names = [n for n in df["English Name"].dropna().astype(str).tolist() if len(n) > 4]
+    rng = random.Random(7)
+    for name in rng.sample(names, 60):
+        start = rng.randrange(0, len(name) - 3)
+        fragment = name[start : start + rng.randint(3, 12)]
+        assert index.rows_for_name(fragment) == _baseline_name(df, fragment), fragment
+    for num in rng.sample(sorted(index.by_mods_num), 20):
+        assert index.rows_for_mods_number(num) == _baseline_mods_number(df, num)
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from typing import Any, List, Optional
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.models.schemas import OccurrenceInfo
+from app.services.occurrence_store import OccurrenceStore
+
+
+def _float(v: Any, default: Optional[float]) -> Optional[float]:
+    try:
+        f = float(str(v).strip())
+    except Exception:
+        return default
+    return default if f != f else f
+
+
+def _baseline(df: pd.DataFrame, row: int) -> OccurrenceInfo:
+    # The per-row df.iloc hydration OccurrenceStore replaced.
+    r = df.iloc[row]
+
+    def opt(col: str) -> Optional[str]:
+        return str(r.get(col, "")) if pd.notna(r.get(col)) else None
+
+    parts = [
+        f"{label}: {r[col]}"
+        for label, col in (("Major Commodity", "Major Commodity"), ("Type", "Occurrence Type"),
+                           ("Status", "Exploration Status"), ("Region", "Admin Region"))
+        if pd.notna(r.get(col))
+    ]
+    return OccurrenceInfo(
+        mods_id=str(r.get("MODS", "")),
+        english_name=str(r.get("English Name", "")),
+        arabic_name=opt("Arabic Name"),
+        major_commodity=str(r.get("Major Commodity", "")),
+        longitude=_float(r.get("Longitude"), 0.0) or 0.0,
+        latitude=_float(r.get("Latitude"), 0.0) or 0.0,
+        admin_region=opt("Admin Region"),
+        elevation=_float(r.get("Elevation"), None),
+        occurrence_type=opt("Occurrence Type"),
+        exploration_status=opt("Exploration Status"),
+        occurrence_importance=opt("Occurrence Importance"),
+        description="; ".join(parts) if parts else None,
+    )
+
+
+@pytest.fixture(scope="module")
+def df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "MODS": ["MODS 0001", "MODS 0002", "MODS 0003", "MODS 0002"],
+            "English Name": ["Mahd adh Dhahab", "Al Amar", "Jabal Sayid", "Duplicate id"],
+            "Arabic Name": ["مهد الذهب", None, "جبل صايد", None],
+            "Major Commodity": ["Gold", "Gold", None, "Zinc"],
+            "Longitude": [40.85, "45.1", None, 44.0],
+            "Latitude": [23.5, " 24.2 ", 23.9, 22.0],
+            "Elevation": [1000.0, None, "", 500],
+            "Admin Region": ["Al Madinah Region", "Riyadh Region", None, None],
+            "Occurrence Type": ["Metallic", None, "Metallic", None],
+            "Exploration Status": ["Mine", "Prospect", None, None],
+            "Occurrence Importance": ["High", None, "Medium", None],
+        }
+    )
+
+
+def _dump(occs: List[OccurrenceInfo]) -> List[dict]:
+    return [o.model_dump() for o in occs]
+
+
+def test_hydrate_matches_row_lookup(df):
+    store = OccurrenceStore(df)
+    rows = [2, 0, 1, 3]
+    assert _dump(store.hydrate(rows)) == _dump([_baseline(df, r) for r in rows])
+
+
+def test_hydrate_fields(df):
+    occ = OccurrenceStore(df).hydrate([1])[0]
+    assert (occ.mods_id, occ.english_name, occ.major_commodity) == ("MODS 0002", "Al Amar", "Gold")
+    assert (occ.longitude, occ.latitude, occ.elevation) == (45.1, 24.2, None)
+    assert occ.arabic_name is None and occ.admin_region == "Riyadh Region"
+    assert occ.description == "Major Commodity: Gold; Status: Prospect; Region: Riyadh Region"
+
+
+def test_hydrate_keeps_order_and_skips_out_of_range(df):
+    store = OccurrenceStore(df)
+    assert [o.english_name for o in store.hydrate([3, -1, 0, 99, 0])] == ["Duplicate id", "Mahd adh Dhahab", "Mahd adh Dhahab"]
+    assert store.hydrate([]) == []
+
+
+def test_hydrate_mods_ids(df):
+    store = OccurrenceStore(df)
+    # Unknown ids are skipped; a repeated MODS id resolves to its first row.
+    assert [o.english_name for o in store.hydrate_mods_ids(["MODS 0003", "MODS 9999", "MODS 0002"])] == [
+        "Jabal Sayid",
+        "Al Amar",
+    ]
+    assert np.isnan(store.elevation[2])
+
+
+def test_hydrate_matches_row_lookup_on_mods_csv():
+    from pathlib import Path
+
+    path = Path(__file__).resolve().parents[1] / "MODS.csv"
+    if not path.exists():
+        pytest.skip("MODS.csv not present")
+    df = pd.read_csv(path)
+    rows = np.random.default_rng(3).choice(len(df), size=min(200, len(df)), replace=False).tolist()
+    assert _dump(OccurrenceStore(df).hydrate(rows)) == _dump([_baseline(df, r) for r in rows])
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.prompt_builder import (
+    PromptBudget,
+    compact_tool_results,
+    count_tokens,
+    fit_history,
+    fit_rag_context,
+    truncate_to_tokens,
+)
+
+_WORDS = "gold copper Riyadh Makkah prospect occurrence deposit quartz vein granite الذهب النحاس".split()
+
+
+def _text(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(_WORDS) + rng.choice(["", ",", ".", ":"]) for _ in range(n_words))
+
+
+@pytest.mark.parametrize("max_tokens", [1, 5, 20, 100, 1000])
+def test_truncate_to_tokens(max_tokens):
+    rng = random.Random(max_tokens)
+    text = _text(rng, 400)
+    out = truncate_to_tokens(text, max_tokens)
+    assert count_tokens(out) <= max_tokens
+    assert text.startswith(out.rstrip("…").rstrip())
+    assert truncate_to_tokens("ok", max_tokens) == "ok"
+    assert truncate_to_tokens(text, 0) == ""
+
+
+def test_allocate_splits_what_is_left():
+    budget = PromptBudget(total=1000)
+    fixed = "x" * 400  # 100 tokens
+    alloc = budget.allocate(fixed)
+    assert sum(alloc.values()) <= 1000 - count_tokens(fixed)
+    assert alloc["rag"] > alloc["tools"] > alloc["history"]
+    # Fixed parts over the budget still leave each section a readable floor.
+    assert min(PromptBudget(total=100).allocate("x" * 4000).values()) == 64
+
+
+@pytest.mark.parametrize("max_tokens", [16, 40, 150, 600])
+def test_fit_rag_context_stays_within_budget(max_tokens):
+    rng = random.Random(max_tokens)
+    docs = [f"MODS {i:05d}\n{_text(rng, rng.randint(5, 80))}" for i in range(30)]
+    out = fit_rag_context("\n\n".join(docs), max_tokens)
+    assert count_tokens(out) <= max_tokens
+    assert out.startswith("MODS 00000")  # rank order: the best document is kept (truncated if needed)
+
+
+def test_fit_rag_context_keeps_small_context():
+    assert fit_rag_context("one\n\ntwo", 100) == "one\n\ntwo"
+
+
+@pytest.mark.parametrize("max_tokens", [16, 50, 200, 800])
+def test_fit_history_stays_within_budget(max_tokens):
+    rng = random.Random(max_tokens)
+    messages = [
+        SimpleNamespace(role="user" if i % 2 == 0 else "assistant", content=_text(rng, rng.randint(3, 300)))
+        for i in range(20)
+    ]
+    out = fit_history(messages, max_tokens)
+    assert count_tokens(out) <= max_tokens
+    last = messages[-1]
+    assert out.splitlines()[-1].startswith("Muhanned: " + last.content[:5])
+
+
+@pytest.mark.parametrize("max_tokens", [16, 60, 200, 1000])
+def test_compact_tool_results_stays_within_budget(max_tokens):
+    rng = random.Random(max_tokens)
+    entries = [f"- search_mods returned {i} rows: {_text(rng, rng.randint(10, 200))}" for i in range(12)]
+    scratchpad = "\n" + "\n".join(entries) + "\n"
+    out = compact_tool_results(scratchpad, max_tokens)
+    assert count_tokens(out) <= max_tokens
+    assert "returned 11 rows" in out  # the latest result is kept
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import pytest
+
+from app.services.gazetteer import Gazetteer
+from app.services.query_parser import parse_query
+
+
+@pytest.fixture(scope="module")
+def gazetteer() -> Gazetteer:
+    return Gazetteer(
+        {
+            "region": ["Riyadh Region", "Makkah Region"],
+            "commodity": ["Gold", "Copper"],
+            "exploration_status": ["Open pit mine", "Prospect", "Quarry", "Deposit"],
+            "occurrence_type": ["Metallic"],
+            "importance": ["High"],
+        }
+    )
+
+
+def test_count_with_filters(gazetteer):
+    p = parse_query("count gold occurrences in riyadh", gazetteer)
+    assert p is not None
+    assert p.tool == "importance_breakdown"
+    assert p.args == {"commodity": "Gold", "region": "Riyadh Region"}
+    assert p.coverage == 1.0
+
+
+def test_list_and_limit(gazetteer):
+    p = parse_query("show top 10 copper prospects in makkah", gazetteer)
+    assert p is not None
+    assert p.tool == "search_mods"
+    assert p.args == {"commodity": "Copper", "region": "Makkah Region", "exploration_status": "Prospect", "limit": 10}
+
+
+def test_nearest_with_coordinates(gazetteer):
+    p = parse_query("nearest 5 gold sites to 24.7, 46.7", gazetteer)
+    assert p is not None
+    assert p.tool == "nearest_mods"
+    assert p.args == {"lat": 24.7, "lon": 46.7, "limit": 5, "commodity": "Gold"}
+
+
+def test_near_with_radius(gazetteer):
+    p = parse_query("copper within 50 km of lat 24.7 lon 46.7", gazetteer)
+    assert p is not None
+    assert p.tool == "nearby_mods"
+    assert p.args == {"lat": 24.7, "lon": 46.7, "radius_km": 50.0, "limit": 50, "commodity": "Copper"}
+
+
+def test_arabic_count(gazetteer):
+    p = parse_query("كم عدد مواقع الذهب في الرياض", gazetteer)
+    assert p is not None
+    assert p.args == {"commodity": "Gold", "region": "Riyadh Region"}
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "count gold occurrences not in riyadh",
+        "count gold occurrences outside riyadh",
+        "count gold occurrences except riyadh",
+        "list copper sites excluding makkah",
+        "show gold sites without prospects",
+        "gold sites that aren't in riyadh",
+        "كم عدد مواقع الذهب خارج الرياض",
+        "اعرض مواقع الذهب ماعدا الرياض",
+    ],
+)
+def test_negated_filters_go_to_llm(gazetteer, query):
+    assert parse_query(query, gazetteer) is None
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "count gold in riyadh in 2020",
+        "show gold site 1234 in makkah",
+    ],
+)
+def test_unexplained_numbers_go_to_llm(gazetteer, query):
+    assert parse_query(query, gazetteer) is None
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "compare gold and copper potential in riyadh",  # unexplained words
+        "count gold in riyadh and export them",  # two primary actions
+        "count everything",  # no filter
+        "nearest gold sites",  # no coordinates
+        "",
+    ],
+)
+def test_other_queries_go_to_llm(gazetteer, query):
+    assert parse_query(query, gazetteer) is None
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "how many gold quarries or deposits in Makkah",
+        "show gold mines and prospects in Riyadh",
+        "count gold and copper in riyadh",
+    ],
+)
+def test_several_values_of_one_filter_go_to_llm(gazetteer, query):
+    assert parse_query(query, gazetteer) is None
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "how many of those are gold mines",
+        "which of these are copper deposits",
+        "show them in riyadh",
+        "export it as csv",
+        "كم عدد هذه المواقع في الرياض",
+    ],
+)
+def test_follow_ups_go_to_llm(gazetteer, query):
+    assert parse_query(query, gazetteer) is None
+
+
+def test_region_list_is_kept(gazetteer):
+    p = parse_query("count gold in riyadh and makkah", gazetteer)
+    assert p is not None
+    assert p.args == {"commodity": "Gold", "region": "Riyadh Region, Makkah Region"}
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+
+from app.services import router_service
+from app.services.request_context import get_request_memo, request_memo
+
+
+@pytest.fixture
+def calls(monkeypatch) -> List[tuple]:
+    seen: List[tuple] = []
+
+    def fake_retrieve(query: str, k: int = 5):
+        seen.append((query, k))
+        time.sleep(0.05)
+        if query == "boom":
+            raise RuntimeError("retrieval failed")
+        return f"context for {query}", [query]
+
+    monkeypatch.setattr(router_service, "_rag_retrieve", fake_retrieve)
+    return seen
+
+
+def test_without_memo_every_call_retrieves(calls):
+    router_service.rag_retrieve("gold", 5)
+    router_service.rag_retrieve("gold", 5)
+    router_service.prefetch_rag("gold", 5)  # no-op outside a request
+    assert calls == [("gold", 5), ("gold", 5)]
+
+
+def test_memo_retrieves_once_per_query_and_k(calls):
+    with request_memo():
+        a = router_service.rag_retrieve("gold", 5)
+        b = router_service.rag_retrieve(" gold ", 5)
+        router_service.rag_retrieve("gold", 8)
+        assert a == b == ("context for gold", ["gold"])
+        b[1].append("mutated")  # callers get their own occurrence list
+        assert router_service.rag_retrieve("gold", 5)[1] == ["gold"]
+    assert calls == [("gold", 5), ("gold", 8)]
+    assert get_request_memo() is None
+
+
+def test_prefetch_is_joined_not_repeated(calls):
+    with request_memo():
+        t0 = time.monotonic()
+        router_service.prefetch_rag("copper", 6)
+        assert time.monotonic() - t0 < 0.04  # runs in the background
+        assert router_service.rag_retrieve("copper", 6)[0] == "context for copper"
+    assert calls == [("copper", 6)]
+
+
+def test_concurrent_callers_share_one_retrieval(calls):
+    with request_memo():
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, router_service.rag_retrieve, "zinc", 5) for _ in range(4)]
+            results = [f.result() for f in futures]
+    assert calls == [("zinc", 5)]
+    assert all(r[0] == "context for zinc" for r in results)
+
+
+def test_errors_reach_every_caller(calls):
+    with request_memo():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                router_service.rag_retrieve("boom", 5)
+    assert calls == [("boom", 5)]
+
+
+def test_nested_memo_is_reused(calls):
+    with request_memo() as outer:
+        with request_memo() as inner:
+            assert inner is outer
+            router_service.rag_retrieve("gold", 5)
+        router_service.rag_retrieve("gold", 5)
+    assert calls == [("gold", 5)]
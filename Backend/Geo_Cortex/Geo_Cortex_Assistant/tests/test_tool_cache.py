@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+import pytest
+
+from app.services import router_service, tool_cache
+from app.services.tool_cache import ToolResultCache, cached_tool, canonical_args, tool_cache_note
+
+
+@pytest.fixture
+def cache(monkeypatch) -> ToolResultCache:
+    c = ToolResultCache(max_items=8, ttl_sec=60)
+    c.enabled = True
+    monkeypatch.setattr(tool_cache, "tool_result_cache", c)
+    monkeypatch.setattr(router_service, "mods_generation", 0)
+    return c
+
+
+def _search_tool(calls: List[dict]):
+    @cached_tool("search_mods")
+    def search(db, commodity: Optional[str] = None, region: Optional[str] = None, limit: int = 25):
+        calls.append({"commodity": commodity, "region": region, "limit": limit})
+        return [f"{commodity}/{region}/{limit}"]
+
+    return search
+
+
+def test_canonical_args_folds_case_and_drops_defaults():
+    defaults = {"limit": 25, "commodity": None}
+    a = canonical_args({"commodity": " Gold ", "region": "RIYADH", "limit": 25}, defaults)
+    b = canonical_args({"region": "riyadh", "commodity": "gold", "limit": None}, defaults)
+    assert a == b == '{"commodity":"gold","region":"riyadh"}'
+    assert canonical_args({"commodity": "gold", "limit": 10}, defaults) != b
+
+
+def test_case_variants_and_explicit_defaults_share_an_entry(cache):
+    calls: List[dict] = []
+    search = _search_tool(calls)
+
+    first = search(None, commodity="Gold", region="Riyadh")
+    assert tool_cache_note() == {}
+    assert search(None, commodity="gold ", region="RIYADH", limit=25) == first
+    assert tool_cache_note() == {"cached": True}
+    assert len(calls) == 1
+
+    search(None, commodity="gold", region="riyadh", limit=10)
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_new_data_generation_misses(cache, monkeypatch):
+    calls: List[dict] = []
+    search = _search_tool(calls)
+    search(None, commodity="gold")
+    monkeypatch.setattr(router_service, "mods_generation", 1)
+    search(None, commodity="gold")
+    assert len(calls) == 2
+
+
+def test_results_are_copied_in_and_out(cache):
+    search = _search_tool([])
+    out = search(None, commodity="gold")
+    out.append("mutated")
+    assert search(None, commodity="gold") == ["gold/None/25"]
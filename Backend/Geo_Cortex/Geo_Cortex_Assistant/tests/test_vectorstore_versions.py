@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from app.services import vectorstore_versions
+from app.services.vectorstore_versions import (
+    POINTER_FILENAME,
+    clone_live_version,
+    current_store_dir,
+    new_version_dir,
+    publish_version,
+)
+
+
+def test_unversioned_store_is_read_in_place(tmp_path):
+    (tmp_path / "bm25.json").write_text("{}", encoding="utf-8")
+    assert current_store_dir(tmp_path) == tmp_path
+
+
+def test_publish_switches_pointer_and_prunes(tmp_path, monkeypatch):
+    monkeypatch.setenv("VECTORSTORE_KEEP_VERSIONS", "2")
+    (tmp_path / "index.faiss").write_bytes(b"legacy")
+
+    published = []
+    for n in range(3):
+        # new_version_dir names by second + random suffix; rename to keep the test independent of the clock.
+        v = new_version_dir(tmp_path).rename(tmp_path / f"v{n}")
+        (v / "bm25.json").write_text(str(n), encoding="utf-8")
+        assert current_store_dir(tmp_path) != v  # not visible before publishing
+        publish_version(tmp_path, v)
+        assert current_store_dir(tmp_path) == v
+        published.append(v)
+
+    assert (tmp_path / POINTER_FILENAME).read_text(encoding="utf-8") == "v2"
+    assert not (tmp_path / "index.faiss").exists()  # legacy files go once a version is live
+    assert [p.exists() for p in published] == [False, True, True]
+
+
+def test_pointer_to_missing_version_falls_back_to_root(tmp_path):
+    (tmp_path / POINTER_FILENAME).write_text("v-gone", encoding="utf-8")
+    assert current_store_dir(tmp_path) == tmp_path
+
+
+def test_builds_in_the_same_second_get_separate_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(vectorstore_versions.time, "strftime", lambda fmt: "20250101T120000")
+    live = new_version_dir(tmp_path)
+    (live / "index.faiss").write_bytes(b"live")
+    publish_version(tmp_path, live)
+
+    other = new_version_dir(tmp_path)
+    assert other != live
+    assert (live / "index.faiss").read_bytes() == b"live"  # never cleared by a concurrent build
+
+
+def test_clone_live_version_shares_files_without_touching_the_live_one(tmp_path):
+    live = new_version_dir(tmp_path)
+    (live / "index.faiss").write_bytes(b"faiss")
+    (live / "bm25.json").write_text("old", encoding="utf-8")
+    publish_version(tmp_path, live)
+
+    clone = clone_live_version(tmp_path)
+    assert current_store_dir(tmp_path) == live  # not visible before publishing
+    assert (clone / "index.faiss").read_bytes() == b"faiss"
+
+    # Builds replace files (write + os.replace), which leaves the live version's copy alone.
+    tmp = clone / "bm25.json.part"
+    tmp.write_text("new", encoding="utf-8")
+    tmp.replace(clone / "bm25.json")
+    publish_version(tmp_path, clone)
+
+    assert current_store_dir(tmp_path) == clone
+    assert (live / "bm25.json").read_text(encoding="utf-8") == "old"
+    assert (clone / "bm25.json").read_text(encoding="utf-8") == "new"
+
+
+def test_clone_of_unversioned_store_takes_only_index_files(tmp_path):
+    (tmp_path / "index.faiss").write_bytes(b"faiss")
+    (tmp_path / "notes.txt").write_text("not part of the store", encoding="utf-8")
+
+    clone = clone_live_version(tmp_path)
+    assert sorted(p.name for p in clone.iterdir()) == ["index.faiss"]
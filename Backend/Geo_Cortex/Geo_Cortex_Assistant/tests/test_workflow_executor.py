@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.services.workflow_executor import run_steps, step_dependencies
+
+
+def _step(action: str, **args: Any) -> Dict[str, Any]:
+    return {"action": action, "args": args}
+
+
+def test_step_dependencies():
+    steps = [
+        _step("qc_summary"),
+        _step("spatial_buffer", geometry={}, distance_m=100),
+        _step("commodity_stats"),
+        _step("spatial_nearest", geometry_ref="buffer"),
+        _step("search_mods", commodity="Gold"),
+        _step("nearby_mods", lat=24.0, lon=46.0),
+        _step("ogc_items_link"),
+        _step("publish_layer_instructions"),
+        _step("publish_layer_instructions", ogc_items_url="http://example/items"),
+    ]
+    assert step_dependencies(steps) == [
+        set(),
+        set(),
+        set(),
+        {1},  # reads the buffer
+        set(),
+        {4},  # both replace the occurrence list
+        set(),
+        {6},  # needs the items link
+        {7},  # same output as the previous publish step
+    ]
+
+
+def _record(results: Dict[int, Any], errors: Dict[int, Optional[BaseException]], order: List[int]):
+    def on_done(i: int, result: Any, err: Optional[BaseException], _ms: float) -> None:
+        results[i] = result
+        errors[i] = err
+        order.append(i)
+
+    return on_done
+
+
+def test_run_steps_waits_for_dependencies():
+    steps = [
+        _step("spatial_buffer", delay=0.05),
+        _step("qc_summary", delay=0.0),
+        _step("spatial_overlay", geometry_ref="buffer", delay=0.0),
+    ]
+    started: Dict[int, float] = {}
+    finished: Dict[int, float] = {}
+
+    def run(step: Dict[str, Any]) -> str:
+        i = steps.index(step)
+        started[i] = time.monotonic()
+        time.sleep(step["args"]["delay"])
+        finished[i] = time.monotonic()
+        return step["action"]
+
+    results: Dict[int, Any] = {}
+    errors: Dict[int, Optional[BaseException]] = {}
+    order: List[int] = []
+    run_steps(steps, run, _record(results, errors, order), max_parallel=4, timeout_s=5)
+
+    assert results == {0: "spatial_buffer", 1: "qc_summary", 2: "spatial_overlay"}
+    assert all(e is None for e in errors.values())
+    assert started[2] >= finished[0]  # the overlay waited for the buffer
+    assert order.index(1) < order.index(0)  # the independent step did not
+
+
+def test_run_steps_respects_max_parallel():
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def run(step: Dict[str, Any]) -> None:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+
+    steps = [_step(f"stats_{i}") for i in range(6)]
+    order: List[int] = []
+    run_steps(steps, run, _record({}, {}, order), max_parallel=2, timeout_s=5)
+    assert sorted(order) == list(range(6))
+    assert peak == 2
+
+
+def test_run_steps_timeout_does_not_block_later_steps():
+    release = threading.Event()
+
+    def run(step: Dict[str, Any]) -> str:
+        if step["action"] == "stuck":
+            release.wait(5)
+        else:
+            time.sleep(0.05)
+        return step["action"]
+
+    # One worker slot: the stuck step times out, then the queued steps each get a full deadline
+    # (queue time behind the stuck step does not count against them).
+    steps = [_step("stuck"), _step("slow_a"), _step("slow_b")]
+    results: Dict[int, Any] = {}
+    errors: Dict[int, Optional[BaseException]] = {}
+    t0 = time.monotonic()
+    try:
+        run_steps(steps, run, _record(results, errors, []), max_parallel=1, timeout_s=0.2)
+    finally:
+        release.set()
+    assert isinstance(errors[0], TimeoutError)
+    assert results[1] == "slow_a" and errors[1] is None
+    assert results[2] == "slow_b" and errors[2] is None
+    assert time.monotonic() - t0 < 2.0  # did not wait for the stuck thread
+
+
+def test_run_steps_reports_step_errors():
+    def run(step: Dict[str, Any]) -> None:
+        raise ValueError("boom")
+
+    errors: Dict[int, Optional[BaseException]] = {}
+    run_steps([_step("qc_summary")], run, _record({}, errors, []), timeout_s=5)
+    assert isinstance(errors[0], ValueError)
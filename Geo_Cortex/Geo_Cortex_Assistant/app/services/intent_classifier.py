@@ -0,0 +1,166 @@
+"""
+Local intent classifier for the master agent router.
+
+Hashed word / word-bigram / character n-gram features with a multinomial logistic regression, trained by
+`scripts/train_intent_classifier.py` and saved as a small .npz file. Prediction is a handful of CRC32 hashes
+and one (features x intents) sum, well under a millisecond, so the LLM is only needed for queries the model
+is unsure about. The confidence threshold is calibrated on held-out queries at training time and stored in
+the model file (INTENT_MIN_CONFIDENCE overrides it).
+"""
+from __future__ import annotations
+
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_MODEL_PATH = Path(__file__).resolve().parents[2] / "data" / "models" / "intent_classifier.npz"
+N_FEATURES = 1 << 15
+
+_WORD_RE = re.compile(r"\w+", flags=re.UNICODE)
+
+
+def _features(text: str) -> List[str]:
+    words = _WORD_RE.findall((text or "").lower())
+    feats = [f"w:{w}" for w in words]
+    feats += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"<{w}>"
+        for n in (3, 4, 5):
+            feats += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+    return feats
+
+
+def featurize(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Sparse (indices, values) vector: hashed feature counts, L2-normalized."""
+    feats = _features(text)
+    if not feats:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    idx = np.fromiter((zlib.crc32(f.encode("utf-8")) % N_FEATURES for f in feats), dtype=np.int64, count=len(feats))
+    idx, counts = np.unique(idx, return_counts=True)
+    values = counts.astype(np.float32)
+    values /= np.linalg.norm(values)
+    return idx, values
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    e = np.exp(z - z.max())
+    return e / e.sum()
+
+
+class IntentClassifier:
+    def __init__(self, labels: Sequence[str], weights: np.ndarray, bias: np.ndarray, threshold: Optional[float] = None):
+        self.labels = list(labels)
+        self.weights = weights  # (N_FEATURES, n_labels)
+        self.bias = bias  # (n_labels,)
+        self.threshold = threshold  # calibrated minimum confidence (None: not calibrated)
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        *,
+        epochs: int = 30,
+        lr: float = 0.5,
+        l2: float = 1e-5,
+        seed: int = 1337,
+    ) -> "IntentClassifier":
+        """
+        Multinomial logistic regression by SGD over the sparse hashed features. Examples are weighted
+        inversely to their class frequency (the eval sets are mostly lookups and analytics).
+        """
+        classes = sorted(set(labels))
+        y = np.array([classes.index(label) for label in labels])
+        class_weight = len(y) / (len(classes) * np.bincount(y, minlength=len(classes)))
+        xs = [featurize(t) for t in texts]
+        w = np.zeros((N_FEATURES, len(classes)), dtype=np.float32)
+        b = np.zeros(len(classes), dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        for epoch in range(epochs):
+            step = lr / (1.0 + 0.1 * epoch)
+            for i in rng.permutation(len(xs)):
+                idx, val = xs[i]
+                p = _softmax(val @ w[idx] + b)
+                p[y[i]] -= 1.0
+                p *= min(class_weight[y[i]], 5.0)
+                w[idx] -= step * (np.outer(val, p) + l2 * w[idx])
+                b -= step * p
+        return cls(classes, w, b)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """(label, confidence)."""
+        idx, val = featurize(text)
+        p = _softmax(val @ self.weights[idx] + self.bias)
+        i = int(p.argmax())
+        return self.labels[i], float(p[i])
+
+    def accuracy(self, texts: Iterable[str], labels: Iterable[str]) -> float:
+        pairs = list(zip(texts, labels))
+        if not pairs:
+            return 0.0
+        return sum(1 for t, label in pairs if self.predict(t)[0] == label) / len(pairs)
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        extra = {} if self.threshold is None else {"threshold": np.array(self.threshold, dtype=np.float32)}
+        np.savez_compressed(
+            path, labels=np.array(self.labels), weights=self.weights, bias=self.bias, n_features=np.array(N_FEATURES),
+            **extra,
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "IntentClassifier":
+        with np.load(Path(path)) as data:
+            if int(data["n_features"]) != N_FEATURES:
+                raise ValueError(f"{path} was trained with a different feature size; retrain it")
+            threshold = float(data["threshold"]) if "threshold" in data.files else None
+            return cls(
+                [str(x) for x in data["labels"]],
+                data["weights"].astype(np.float32),
+                data["bias"].astype(np.float32),
+                threshold=threshold,
+            )
+
+
+def load_default() -> Optional[IntentClassifier]:
+    """The trained model (INTENT_MODEL_PATH), or None when it has not been trained / is disabled."""
+    if os.getenv("INTENT_CLASSIFIER_DISABLE", "0").lower() in ("1", "true", "yes"):
+        return None
+    path = Path(os.getenv("INTENT_MODEL_PATH", str(DEFAULT_MODEL_PATH)))
+    if not path.exists():
+        return None
+    try:
+        return IntentClassifier.load(path)
+    except Exception as e:
+        print(f"Intent classifier not loaded ({path}): {e}")
+        return None
+
+
+# Loaded once at import (application startup).
+intent_classifier: Optional[IntentClassifier] = load_default()
+
+
+def min_confidence(model: Optional[IntentClassifier] = None) -> float:
+    """INTENT_MIN_CONFIDENCE when set, else the model's calibrated threshold, else 0.6."""
+    env = os.getenv("INTENT_MIN_CONFIDENCE")
+    if env:
+        return float(env)
+    model = model if model is not None else intent_classifier
+    if model is not None and model.threshold is not None:
+        return model.threshold
+    return 0.6
+
+
+def classify_local(query: str) -> Optional[Dict[str, Any]]:
+    """Local prediction when confident enough (see `min_confidence`), else None."""
+    if intent_classifier is None:
+        return None
+    label, confidence = intent_classifier.predict(query)
+    if confidence < min_confidence(intent_classifier):
+        return None
+    return {"tool": label, "confidence": round(confidence, 3), "reason": "local classifier"}
@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 
 from app.models.schemas import OccurrenceInfo
 from app.services.agent_service import run_agent
+from app.services.intent_classifier import classify_local
 from app.services.llm_service import generate_response
 
 
@@ -118,7 +119,12 @@ def classify_intent(query: str) -> Dict[str, Any]:
     if quick:
         return {"tool": quick["tool"], "confidence": quick["confidence"], "reason": quick["reason"]}
 
-    # LLM classification fallback (we embed the "system prompt" into the prompt text)
+    # Local classifier (sub-millisecond; trained by scripts/train_intent_classifier.py)
+    local = classify_local(query)
+    if local and local["tool"] in {t.value for t in ToolType}:
+        return {"tool": ToolType(local["tool"]), "confidence": local["confidence"], "reason": local["reason"]}
+
+    # LLM classification fallback for low-confidence queries (we embed the "system prompt" into the prompt text)
     raw = generate_response(
         ROUTER_SYSTEM_PROMPT
         + "\n\n"
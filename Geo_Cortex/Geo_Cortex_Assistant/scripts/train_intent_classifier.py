@@ -0,0 +1,331 @@
+"""
+Train the local intent classifier used by the master agent router (app/services/intent_classifier.py).
+
+Training queries:
+- the frozen golden evaluation sets (RAG lookups -> sql_query, analytics workflows -> analyze), read from
+  INTENT_EVAL_DIR (default: Backend/Geo_Cortex/Geo_Cortex_Assistant/eval in this repository), capped at
+  INTENT_EVAL_CAP examples per intent (default 40) so they do not swamp the other intents
+- the seed examples below, which cover every intent (including map / 3D / export / general and off-topic chat)
+
+Calibration queries (never trained on): the holdout eval sets plus CALIBRATION_EXAMPLES (off-topic and
+mixed-intent queries). The confidence threshold is the lowest one (from INTENT_THRESHOLD_FLOOR, default 0.5)
+at which the accepted predictions of each calibration group reach INTENT_TARGET_PRECISION (default 0.95);
+it is saved with the model, so queries with little evidence go to the LLM. The saved model (INTENT_MODEL_PATH, default data/models/intent_classifier.npz) is the
+one that was calibrated: holdout stays out of it.
+
+Run:
+    python scripts/train_intent_classifier.py
+"""
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.intent_classifier import DEFAULT_MODEL_PATH, IntentClassifier  # noqa: E402
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_EVAL_DIR = BASE_DIR.parents[1] / "Backend" / "Geo_Cortex" / "Geo_Cortex_Assistant" / "eval"
+
+# (file name, intent) for the eval sets.
+EVAL_SETS = {
+    "golden": [("golden_rag.jsonl", "sql_query"), ("golden_llm_workflow.jsonl", "analyze")],
+    "holdout": [("holdout_rag.jsonl", "sql_query"), ("holdout_llm_workflow.jsonl", "analyze")],
+}
+
+SEED_EXAMPLES = {
+    "sql_query": [
+        "Find gold occurrences in Riyadh region",
+        "How many copper occurrences are there in Makkah?",
+        "List all zinc prospects",
+        "Which occurrences have high importance?",
+        "Search for silver deposits near Jeddah",
+        "Count occurrences by exploration status",
+        "Give me details about Mahd adh Dhahab",
+        "What is the major commodity of MODS 0001?",
+        "ابحث عن مواقع الذهب في منطقة الرياض",
+        "كم عدد مواقع النحاس في مكة",
+        "Where are the tungsten occurrences?",
+        "Show me details of the Sukhaybarat deposit",
+        "Which commodities are found in Tabuk?",
+        "List occurrences with exploration status prospect",
+        "Find occurrences near latitude 24 longitude 45",
+        "Show gold occurrences in Tabuk",
+        "Show me copper deposits in the Eastern Province",
+        "Get all silver prospects",
+        "What occurrences are in Najran?",
+        "Find iron ore deposits",
+        "Which deposits are in Al Madinah?",
+        "Show all mines in Hail",
+        "Lookup the occurrence named Ad Duwayhi",
+        "How many phosphate occurrences exist?",
+        "Tell me about the Jabal Sayid deposit",
+        "What host rocks does the Al Amar occurrence have?",
+        "Are there any uranium occurrences in Jizan?",
+        "Give me the nearest gold sites to Riyadh city",
+        "Which occurrences are low importance?",
+        "What is the exploration status of the Bulghah mine?",
+    ],
+    "visualize_2d": [
+        "Show gold occurrences on a map",
+        "Plot copper prospects on the map",
+        "Display all occurrences in Asir on a map view",
+        "Map the phosphate deposits",
+        "Can you put these results on a map?",
+        "اعرض مواقع الذهب على الخريطة",
+        "Plot them",
+        "Put the copper sites in Asir on the map",
+        "Mark the zinc prospects on a map please",
+        "Draw the gold sites on a map",
+        "Show me where the copper deposits are on the map",
+        "I want to see the silver occurrences plotted",
+        "Visualize the Najran occurrences in 2D",
+        "Pin the phosphate mines on a map",
+    ],
+    "visualize_3d": [
+        "Show the occurrences in 3D",
+        "Open a terrain view of the copper prospects",
+        "Visualize the deposits in three dimensions",
+        "Display the Riyadh occurrences on the 3d globe",
+        "اعرض المواقع بشكل ثلاثي الأبعاد",
+        "Show a 3D view of the gold deposits",
+        "Render the Asir prospects on a 3D terrain",
+        "I want a three dimensional view of the mines",
+        "Fly over the copper occurrences in 3D",
+        "Use the globe to display the deposits",
+    ],
+    "analyze": [
+        "Analyze the distribution of gold occurrences by region",
+        "Is there a spatial pattern in copper prospects?",
+        "Cluster the occurrences and describe the hotspots",
+        "Compute statistics for iron occurrences",
+        "Buffer the AOI by 10 km and count occurrences inside",
+        "Which regions have the highest density of deposits?",
+        "Compare commodities across regions",
+        "حلل توزيع مواقع الذهب حسب المنطقة",
+        "What is the correlation between commodity and region?",
+        "Find hotspots of gold mineralization",
+        "Summarize occurrence importance statistics per region",
+        "Run a kernel density of copper occurrences",
+        "How are the deposits spread spatially across the Arabian Shield?",
+        "Do zinc and lead occurrences co-occur?",
+        "Give me a trend analysis of exploration status by commodity",
+    ],
+    "export": [
+        "Export gold occurrences as GeoJSON",
+        "Download the copper prospects as a shapefile",
+        "Save the results as CSV",
+        "Give me a KML file of the Asir occurrences",
+        "Export these points to GeoPackage",
+        "حمل النتائج كملف",
+        "I need the gold sites as a spreadsheet",
+        "Send me a file with all the silver deposits",
+        "Export the Riyadh occurrences to Excel",
+        "Download all phosphate deposits as KMZ",
+        "Save the gold prospects as a shapefile zip",
+        "Export the results in GeoJSON format",
+    ],
+    "general": [
+        "Hello",
+        "What can you do?",
+        "How do I use this assistant?",
+        "Thanks, that was helpful",
+        "Who built this system?",
+        "Explain what the MODS dataset is",
+        "What commands are available?",
+        "مرحبا",
+        "شكرا لك",
+        "Good morning",
+        "Hi there, how are you?",
+        "Bye",
+        "Can you help me?",
+        "What languages do you speak?",
+        "Write me a poem",
+        "What's the weather like today?",
+        "Who won the football match yesterday?",
+        "Translate this sentence to French",
+        "What is the capital of France?",
+        "Recommend a good restaurant",
+        "Tell me something interesting",
+        "What time is it?",
+        "I'm bored",
+        "كيف حالك",
+        "من أنت",
+        "Tell me a story",
+        "Make me laugh",
+        "How old are you?",
+        "What's your name?",
+        "Play some music",
+        "What is love?",
+        "What is 2 plus 2?",
+        "Who is the president of the United States?",
+        "How tall is Mount Everest?",
+        "Give me a recipe for dinner",
+        "Open YouTube",
+        "What's up?",
+        "How are you doing today?",
+        "Do you like football?",
+        "What is the best phone to buy?",
+        "Can you set an alarm?",
+        "Explain quantum physics to me",
+        "Write an email to my boss",
+        "What's the news today?",
+        "Goodbye, see you later",
+        "صباح الخير",
+        "ما اسمك",
+        "اكتب لي قصيدة",
+    ],
+}
+
+# Calibration only (never trained on). Off-topic chat should not be answered as a data intent; mixed queries
+# should only be answered locally with the intent the user asked for last.
+CALIBRATION_EXAMPLES = {
+    "general": [
+        "tell me a joke",
+        "sing me a song",
+        "what's your favourite movie?",
+        "how do I bake bread?",
+        "what is the meaning of life",
+        "good evening",
+        "thank you so much",
+        "who are you?",
+        "what's the stock price of Aramco today?",
+        "book me a flight to Dubai",
+        "can you write python code for me?",
+        "السلام عليكم",
+        "احكي لي نكتة",
+    ],
+    "visualize_2d": [
+        "where are gold mines in Makkah, plot them",
+        "find copper prospects in Asir and show them on a map",
+    ],
+    "export": [
+        "list the zinc deposits and export them as geojson",
+    ],
+}
+
+
+def _read_queries(path: Path) -> List[str]:
+    out: List[str] = []
+    if not path.exists():
+        print(f"  (missing) {path}")
+        return out
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            q = obj.get("query") or (obj.get("payload") or {}).get("query")
+            if q:
+                out.append(str(q))
+    return out
+
+
+def _labeled(queries: List[str], label: str) -> List[Tuple[str, str]]:
+    return [(q, label) for q in dict.fromkeys(queries)]
+
+
+def _eval_examples(eval_dir: Path, which: str, cap: Optional[int] = None) -> List[Tuple[str, str]]:
+    """Eval-set queries labeled by set; at most `cap` per intent (a fixed random sample)."""
+    out: List[Tuple[str, str]] = []
+    for name, label in EVAL_SETS[which]:
+        examples = _labeled(_read_queries(eval_dir / name), label)
+        if cap is not None and len(examples) > cap:
+            examples = random.Random(f"{which}:{name}").sample(examples, cap)
+        out += examples
+    return out
+
+
+def _lowest_threshold(scored: List[Tuple[float, bool]], target_precision: float, floor: float) -> float:
+    for step in range(int(round(floor * 100)), 100):
+        t = step / 100.0
+        accepted = [ok for conf, ok in scored if conf >= t]
+        if not accepted or sum(accepted) / len(accepted) >= target_precision:
+            return t
+    return 0.99
+
+
+def calibrate_threshold(
+    model: IntentClassifier,
+    groups: Dict[str, List[Tuple[str, str]]],
+    target_precision: float,
+    floor: float = 0.5,
+) -> Tuple[float, Dict[str, Dict[str, float]]]:
+    """
+    Lowest confidence threshold (at least `floor`: below 0.5 the other intents together are more likely) at
+    which the predictions it accepts are at least `target_precision` correct in every group (the rest go to
+    the LLM), so the many easy in-domain holdout queries cannot hide the off-topic ones.
+    Returns (threshold, per-group precision / share answered locally).
+    """
+    scored = {
+        name: [(conf, label == expected) for (label, conf), expected in ((model.predict(t), y) for t, y in examples)]
+        for name, examples in groups.items()
+        if examples
+    }
+    threshold = max((_lowest_threshold(s, target_precision, floor) for s in scored.values()), default=0.6)
+    report: Dict[str, Dict[str, float]] = {}
+    for name, s in scored.items():
+        accepted = [ok for conf, ok in s if conf >= threshold]
+        report[name] = {
+            "precision": sum(accepted) / len(accepted) if accepted else 1.0,
+            "local_share": len(accepted) / len(s),
+        }
+    return threshold, report
+
+
+def main() -> int:
+    eval_dir = Path(os.getenv("INTENT_EVAL_DIR", str(DEFAULT_EVAL_DIR)))
+    model_path = Path(os.getenv("INTENT_MODEL_PATH", str(DEFAULT_MODEL_PATH)))
+
+    eval_cap = int(os.getenv("INTENT_EVAL_CAP", "40"))
+    target_precision = float(os.getenv("INTENT_TARGET_PRECISION", "0.95"))
+    threshold_floor = float(os.getenv("INTENT_THRESHOLD_FLOOR", "0.5"))
+
+    seeds: List[Tuple[str, str]] = []
+    for label, queries in SEED_EXAMPLES.items():
+        seeds += _labeled(queries, label)
+    golden = _eval_examples(eval_dir, "golden", cap=eval_cap)
+    holdout = _eval_examples(eval_dir, "holdout")
+    extra: List[Tuple[str, str]] = []
+    for label, queries in CALIBRATION_EXAMPLES.items():
+        extra += _labeled(queries, label)
+    print(f"Examples: seeds={len(seeds)} golden={len(golden)} (cap {eval_cap}/intent) holdout={len(holdout)}")
+
+    train = seeds + golden
+    model = IntentClassifier.train([t for t, _ in train], [y for _, y in train])
+    print(f"Training accuracy: {model.accuracy([t for t, _ in train], [y for _, y in train]):.3f}")
+    if holdout:
+        acc = model.accuracy([t for t, _ in holdout], [y for _, y in holdout])
+        print(f"Holdout accuracy: {acc:.3f}")
+
+    calibration = holdout + extra
+    model.threshold, report = calibrate_threshold(
+        model, {"holdout": holdout, "off-topic / mixed": extra}, target_precision, floor=threshold_floor
+    )
+    print(f"Calibrated threshold: {model.threshold:.2f} (target precision {target_precision})")
+    for name, r in report.items():
+        print(f"  {name}: precision {r['precision']:.3f}, answered locally {r['local_share']:.1%}")
+    for t, _ in extra:
+        label, conf = model.predict(t)
+        verdict = label if conf >= model.threshold else "-> LLM"
+        print(f"  {conf:.2f} {verdict:<13} {t}")
+
+    t0 = time.perf_counter()
+    for t, _ in calibration:
+        model.predict(t)
+    per_query_ms = (time.perf_counter() - t0) * 1000.0 / max(1, len(calibration))
+    print(f"Prediction latency: {per_query_ms:.3f} ms/query")
+
+    model.save(model_path)
+    print(f"Saved {model_path} ({model_path.stat().st_size / 1024:.0f} KB, labels: {', '.join(model.labels)})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.services import intent_classifier as ic
+from app.services.intent_classifier import IntentClassifier, classify_local, featurize, min_confidence
+
+TEXTS = [
+    "how many gold occurrences in riyadh",
+    "count copper sites in asir",
+    "number of zinc deposits in makkah",
+    "how many mines are there in tabuk",
+    "buffer 10 km around this polygon",
+    "intersect the uploaded layer with occurrences",
+    "dissolve the regions by commodity",
+    "clip occurrences to the uploaded area",
+]
+LABELS = ["analytics"] * 4 + ["spatial"] * 4
+
+
+@pytest.fixture(scope="module")
+def model() -> IntentClassifier:
+    return IntentClassifier.train(TEXTS, LABELS, epochs=20)
+
+
+def test_featurize_is_l2_normalized_and_deterministic():
+    idx, val = featurize("Gold in Riyadh")
+    idx2, val2 = featurize("gold in riyadh")
+    assert np.array_equal(idx, idx2) and np.allclose(val, val2)
+    assert np.isclose(np.linalg.norm(val), 1.0)
+    assert featurize("")[0].size == 0
+
+
+def test_train_and_predict(model):
+    assert model.labels == ["analytics", "spatial"]
+    assert model.accuracy(TEXTS, LABELS) == 1.0
+    label, confidence = model.predict("how many copper occurrences in makkah")
+    assert label == "analytics"
+    assert 0.5 < confidence <= 1.0
+
+
+def test_save_load_roundtrip_keeps_threshold(model, tmp_path):
+    model.threshold = 0.72
+    path = tmp_path / "m.npz"
+    model.save(path)
+    loaded = IntentClassifier.load(path)
+    assert loaded.labels == model.labels
+    assert loaded.threshold == pytest.approx(0.72)
+    assert loaded.predict("clip the layer") == pytest.approx(model.predict("clip the layer"))
+
+    model.threshold = None
+    model.save(path)
+    assert IntentClassifier.load(path).threshold is None
+
+
+def test_load_rejects_other_feature_size(model, tmp_path):
+    path = tmp_path / "m.npz"
+    np.savez_compressed(path, labels=np.array(model.labels), weights=model.weights, bias=model.bias, n_features=np.array(8))
+    with pytest.raises(ValueError):
+        IntentClassifier.load(path)
+
+
+def test_load_default_returns_none_when_missing_disabled_or_broken(tmp_path, monkeypatch):
+    monkeypatch.setenv("INTENT_MODEL_PATH", str(tmp_path / "missing.npz"))
+    assert ic.load_default() is None
+    broken = tmp_path / "broken.npz"
+    broken.write_bytes(b"not a model")
+    monkeypatch.setenv("INTENT_MODEL_PATH", str(broken))
+    assert ic.load_default() is None
+    monkeypatch.setenv("INTENT_CLASSIFIER_DISABLE", "1")
+    assert ic.load_default() is None
+
+
+def test_min_confidence_prefers_env_then_model_then_default(model, monkeypatch):
+    monkeypatch.delenv("INTENT_MIN_CONFIDENCE", raising=False)
+    calibrated = IntentClassifier(model.labels, model.weights, model.bias, threshold=0.8)
+    uncalibrated = IntentClassifier(model.labels, model.weights, model.bias)
+    assert min_confidence(calibrated) == 0.8
+    assert min_confidence(uncalibrated) == 0.6
+    monkeypatch.setenv("INTENT_MIN_CONFIDENCE", "0.9")
+    assert min_confidence(calibrated) == 0.9
+
+
+def test_classify_local_falls_back_below_threshold(model, monkeypatch):
+    monkeypatch.delenv("INTENT_MIN_CONFIDENCE", raising=False)
+    query = "how many gold occurrences in asir"
+    _, confidence = model.predict(query)
+
+    monkeypatch.setattr(ic, "intent_classifier", IntentClassifier(model.labels, model.weights, model.bias, threshold=0.0))
+    out = classify_local(query)
+    assert out == {"tool": "analytics", "confidence": round(confidence, 3), "reason": "local classifier"}
+
+    # Just above the model's confidence: the caller falls back to the LLM router.
+    monkeypatch.setattr(
+        ic, "intent_classifier", IntentClassifier(model.labels, model.weights, model.bias, threshold=confidence + 1e-6)
+    )
+    assert classify_local(query) is None
+
+    monkeypatch.setattr(ic, "intent_classifier", None)
+    assert classify_local(query) is None